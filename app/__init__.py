@@ -2,7 +2,7 @@
 Top level application module containing two main submodules: interface, slicer and utils
 '''
 import logging as log
-import sys
+import sys, os
 
 from .version import VERSION_STR
 
@@ -35,9 +35,16 @@ def run(on_ready=None):
     config = Config()
     config.load()
 
-    # Create slicer instance
+    # Chrome trace of everything measured with PerfTool, saved on exit
+    from .utils import PerfTrace
+    trace_path = os.environ.get('FLATSLICER_TRACE')
+    trace = PerfTrace.start(memory=os.environ.get('FLATSLICER_TRACE_MEMORY') == '1') if trace_path else None
+
+    # Create slicer instance, numba kernels are compiled on import
     from .slicer import Slicer
+    from .utils import JitStats
     slicer = Slicer()
+    log.info(f'Compiled numba kernels in {JitStats.total()} ms')
 
     # Create interface instance
     from .interface import Interface
@@ -52,4 +59,8 @@ def run(on_ready=None):
     interface.main()
 
     # Quit
-    config.save()
\ No newline at end of file
+    config.save()
+    if trace is not None:
+        trace.stop()
+        trace.save(trace_path)
+        log.info(f'Saved trace to {trace_path}')
\ No newline at end of file
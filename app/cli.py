@@ -0,0 +1,86 @@
+'''
+Command line slicing, without the interface.
+
+Usage:
+    python -m app.cli image.png [-o image.gcode] [--set infill.passes=2 ...] [--trace trace.json]
+'''
+import sys, argparse
+import logging as log
+from pathlib import Path
+
+from .utils import Config, PerfTrace, JitStats
+from .slicer import RasterImage, VectorImage, is_vector, Gcode, ExportPipeline, format_duration
+
+def _parse_value(config:Config, key:str, value:str):
+    '''Converts value to the type of the default value of the key'''
+    default = config.get_value(key)
+    if isinstance(default, bool): return value.lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int): return int(value)
+    if isinstance(default, float): return float(value)
+    return value
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description='Generates Gcode from raster or vector image')
+    parser.add_argument('image', type=Path)
+    parser.add_argument('-o', '--output', type=Path, help='Gcode file (.gcode, .gcode.gz, .gcode.zst), metrics only if not given')
+    parser.add_argument('--config', type=Path, help='Directory with settings.json and config.json, defaults are used if not given')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help='Overrides config value, for example infill.passes=2')
+    parser.add_argument('--trace', type=Path, help='Saves Chrome trace of slicing to the file')
+    parser.add_argument('--trace-memory', action='store_true', help='Measures peak memory of every span in trace (slower)')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    log.basicConfig(level=log.INFO if args.verbose else log.WARNING, format='[%(levelname)s] %(message)s')
+
+    config = Config()
+    if args.config is not None:
+        config.base_path = args.config
+        config.load()
+    for item in args.set:
+        key, _, value = item.partition('=')
+        try:
+            config.set_value(key, _parse_value(config, key, value))
+        except ValueError:
+            parser.error(f'Invalid value for {key}: {value}')
+
+    trace = PerfTrace.start(memory=args.trace_memory) if args.trace else None
+
+    if is_vector(args.image):
+        img = VectorImage(args.image)
+        loaded = img.load(config.get_value('image.tolerance'))
+    else:
+        img = RasterImage(args.image)
+        loaded = img.load(config.get_value('image.dither'))
+    if not loaded:
+        print(f'Failed to load {args.image}', file=sys.stderr)
+        return 1
+    img.trace(config)
+    gcode = Gcode(img)
+    try:
+        gcode.generate(config)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.output is not None and not ExportPipeline(gcode, args.output).run():
+        print(f'Failed to save {args.output}', file=sys.stderr)
+        return 1
+
+    if trace is not None:
+        trace.stop()
+        trace.save(args.trace)
+
+    m = gcode.metrics
+    print(f'Image:         {img.info_numpolygons} polygons, {img.info_numlines} lines')
+    print(f'Burn:          {m.burn_length:.1f} mm in {format_duration(m.burn_time)}')
+    print(f'Travel:        {m.travel_length:.1f} mm in {format_duration(m.travel_time)}')
+    print(f'Laser toggles: {m.toggles}')
+    if gcode.info_raster_time is not None:
+        full, trimmed = gcode.info_raster_time
+        print(f'Raster sweeps: {format_duration(trimmed)} instead of {format_duration(full)} with full width lines')
+    print(f'Machine time:  {format_duration(m.machine_time)} ({m.machine_time:.1f} s)')
+    print(f'Calc time:     {round(img.info_calctime + gcode.info_calctime, 2)} ms')
+    print(f'JIT compile:   {JitStats.total()} ms ({round(img.info_compiletime + gcode.info_compiletime, 2)} ms while slicing)')
+    if args.verbose: print(JitStats.report(top=10))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,11 @@
+import threading
 import logging as log
 from pathlib import Path
 from tkinter import messagebox
 
-from ..slicer import Slicer, Gcode, RasterImage
-from ..utils import Event, Config, Octoprint, OctoprintResult
+from ..slicer import Slicer, Gcode, RasterImage, ExportPipeline, MotionTable, read_file, to_pixels, origin_pixels
+from ..slicer.dialect import get_dialect
+from ..utils import Event, Config, Octoprint, OctoprintResult, OctoprintUploader, SerialSender
 from .window import Window
 
 
@@ -19,6 +21,8 @@ class Interface:
         self.window = Window()
         self.config:Config = None
         self.slicer:Slicer = None
+        self.uploader:OctoprintUploader = None
+        self.sender:SerialSender = None # Sender that is currently streaming
 
     def init(self, slicer:Slicer, config:Config) -> None:
         '''
@@ -26,12 +30,16 @@ class Interface:
         '''
         self.config = config
         self.slicer = slicer
+        self.uploader = OctoprintUploader(config)
 
         self.window.init()
         self.window.close_pressed += self._close_pressed
         self.window.trace_file += self._trace_file
         self.window.generate_file += self._genereate_file
         self.window.export_file += self._export_file
+        self.window.open_gcode += self._open_gcode
+        self.window.stream_file += self._stream_file
+        self.window.stop_stream += self._stop_stream
         self.window.test_octoprint += self._test_octoprint
 
     def load_config(self) -> None:
@@ -54,6 +62,8 @@ class Interface:
         Window close button pressed. Dump config and close application.
         '''
         self.window.dump_config(self.config)
+        self._stop_stream()
+        self.uploader.close()
         self.window.close()
 
     def _trace_file(self, path:Path=None) -> None:
@@ -85,7 +95,11 @@ class Interface:
         # Generate
         self.window.dump_config(self.config)
         gcode = Gcode(img)
-        gcode.generate(self.config)
+        try:
+            gcode.generate(self.config)
+        except ValueError as e:
+            messagebox.showerror('Failed', f'Failed to generate Gcode.\n\n{e}')
+            return
         img.gcode = gcode
         # Show
         self.window.show_gcode(gcode)
@@ -102,20 +116,100 @@ class Interface:
             log.warn('Tried to save gcode, but no gcode has been generated')
             return
 
-        # Generate output
-        output = img.gcode.get_output()
-        if output is None:
-            log.error('Failed to generate Gcode')
+        # Generate output, save it to file and upload to octoprint at the same time
+        uploader = self.uploader if self.config.get_value('octoprint.enabled') else None
+        pipeline = ExportPipeline(img.gcode, gcode_path, uploader, upload_compression=self.config.get_value('octoprint.compression'))
+
+        # Export in background, result is shown from the main loop
+        def export():
+            try:
+                if pipeline.run(): return
+                message = f'Failed to save Gcode to {gcode_path}'
+            except Exception as e:
+                log.exception(f'Export failed: {e}')
+                message = f'Failed to generate Gcode, nothing was saved or uploaded.\n\n{e}'
+            self.window.call_soon(messagebox.showerror, 'Export failed', message)
+        threading.Thread(target=export, daemon=True).start()
+
+    def _open_gcode(self, path:Path, gcode_path:Path) -> None:
+        '''
+        Shows exported (possibly compressed) gcode over the image it was generated from
+        '''
+        # Get image, its size and dpi are needed to go back from machine coordinates
+        img = self.slicer.get_image(file_path=path, load=True)
+        if img is None: return
+        if not img.traced: self._trace_file(path)
+        self.window.dump_config(self.config)
+        mm2pix = img.info_mm2pix
+        offset = [self.config.get_value('image.offset.x'), self.config.get_value('image.offset.y'), self.config.get_value('image.offset.z')]
+
+        # Read in background, file is decompressed while reading
+        def read():
+            try:
+                commands = to_pixels(read_file(gcode_path), img.info_height, mm2pix, offset)
+            except Exception as e:
+                log.error(f'Failed to read {gcode_path}: {e}')
+                self.window.call_soon(messagebox.showerror, 'Failed', f'Failed to read {gcode_path}.\n\n{e}')
+                return
+            motion = MotionTable.from_commands(commands, 1 / mm2pix, start=origin_pixels(img.info_height, mm2pix, offset))
+            log.info(f'Read {len(commands)} commands from {gcode_path}')
+            self.window.call_soon(self.window.show_commands, commands, motion)
+        threading.Thread(target=read, daemon=True).start()
+
+    def _stream_file(self, path:Path) -> None:
+        # Get image
+        img = self.slicer.get_image(file_path=path, load=True)
+        if img is None: return
+        if img.gcode is None:
+            messagebox.showwarning('No Gcode found', 'Generate Gcode first by pressing "Generate Gcode".')
+            return
+
+        if self.sender is not None:
+            messagebox.showwarning('Already streaming', 'Another file is being sent to the laser. Stop it first.')
             return
 
-        # Save to file
-        with gcode_path.open('w+') as f:
-            f.write(output)
-            log.info(f'Saved Gcode to {path}')
+        # Open port
+        self.window.dump_config(self.config)
+        try:
+            dialect = get_dialect(self.config.get_value('machine.dialect'))
+            off_lines = dialect.footer() if dialect.inline else [self.config.get_value('machine.laser_off')]
+            sender = SerialSender.open(self.config, marlin=dialect.marlin, off_lines=off_lines)
+        except Exception as e:
+            messagebox.showerror('Failed', f'Failed to open serial port.\n\n{e}')
+            return
+
+        # Stream in background, statistics and result are shown from the main loop
+        def stream():
+            sender.progress += lambda stats: self.window.call_soon(self.window.show_status, f'Streaming: {stats}')
+            error = None
+            try:
+                if not sender.stream(img.gcode.iter_lines()): error = 'Streaming was cancelled or controller stopped responding.'
+            except Exception as e:
+                log.exception(f'Streaming failed: {e}')
+                error = str(e)
+            try:
+                # Controller would finish buffered moves and keep the laser at its last power
+                if error is not None: sender.halt()
+                sender.close()
+            except Exception as e:
+                log.error(f'Failed to stop controller: {e}')
+            self.window.call_soon(self._stream_finished, sender, error)
+        self.sender = sender
+        self.window.show_status('Streaming started')
+        threading.Thread(target=stream, daemon=True).start()
+
+    def _stream_finished(self, sender:SerialSender, error:str) -> None:
+        if self.sender is sender: self.sender = None
+        if error is None:
+            self.window.show_status(f'Finished: {sender.stats}')
+            return
+        self.window.show_status('Stopped, burn is not complete')
+        messagebox.showerror('Streaming stopped', f'Laser was stopped before the end of the file.\n\n{error}')
 
-        # Upload to octoprint
-        if self.config.get_value('octoprint.enabled'):
-            Octoprint.upload(self.config, gcode_path.name, output)
+    def _stop_stream(self) -> None:
+        if self.sender is None: return
+        log.info('Streaming cancelled')
+        self.sender.cancel()
 
     def _test_octoprint(self):
         self.window.dump_config(self.config)
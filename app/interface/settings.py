@@ -30,6 +30,7 @@ class SettingsWindow:
         self.notebook.pack(expand=True, fill=tk.BOTH)
         self._add_machine_tab()
         self._add_octoprint_tab()
+        self._add_serial_tab()
         self._add_about_tab()
 
     def open(self):
@@ -65,6 +66,7 @@ class SettingsWindow:
 
         # Laser settings
         title_row(frame, r, 'Laser') ; r += 1
+        self.items['machine.dialect'] = entry_row(frame, r, 'Dialect', desc='marlin_fan, marlin_inline (M3 I) or grbl (M4, $32=1)') ; r += 1
         self.items['machine.laser_on'] = entry_row(frame, r, 'Laser ON', desc='Used to turn on and set the laser power') ; r += 1
         self.items['machine.laser_off'] = entry_row(frame, r, 'Laser OFF', desc='Used to turn off the laser at the end') ; r += 1
         self.items['machine.min_power:float'] = entry_row(frame, r, 'Min Power [%]', desc='Minimum laser power used when travelling', validate=validate_float) ; r += 1
@@ -74,6 +76,10 @@ class SettingsWindow:
         self.items['machine.burn_accel:float'] = entry_row(frame, r, 'Burn acceleration [mm/s²]', desc='Setting this too low will result in accidential gradients') ; r += 1
         self.items['machine.travel_accel:float'] = entry_row(frame, r, 'Travel acceleration [mm/s²]', desc='Acceleration for travelling') ; r += 1
         self.items['machine.travel_speed:float'] = entry_row(frame, r, 'Travel speed [mm/s]', desc='Speed used when not burning, can be set as high as your machine can handle.') ; r += 1
+        self.items['machine.output'] = entry_row(frame, r, 'Output', desc='plain, compact (snapped to resolution, feed rate on moves) or relative (compact with G91 infill)') ; r += 1
+        self.items['machine.order_time:float'] = entry_row(frame, r, 'Ordering time [s]', desc='Time spent on ordering paths to shorten travel. 0 uses nearest neighbour only', validate=validate_float) ; r += 1
+        self.items['machine.threads:int'] = entry_row(frame, r, 'Threads', desc='Threads used for slicing. 0 uses all cores, 1 disables parallel slicing', validate=validate_int) ; r += 1
+        self.items['machine.resolution:float'] = entry_row(frame, r, 'Resolution [mm]', desc='Shorter moves and smaller deviations from straight line are merged. 0 disables merging', validate=validate_float) ; r += 1
 
 
     def _add_octoprint_tab(self):
@@ -86,8 +92,25 @@ class SettingsWindow:
         title_row(frame, r, 'Connection') ; r += 1
         self.items['octoprint.url'] = entry_row(frame, r, 'Hostname, IP or URL') ; r += 1
         self.items['octoprint.key'] = entry_row(frame, r, 'API Key') ; r += 1
+        self.items['octoprint.timeout:float'] = entry_row(frame, r, 'Timeout [s]', desc='Time to wait for the server before retrying', validate=validate_float) ; r += 1
+        self.items['octoprint.retries:int'] = entry_row(frame, r, 'Retries', desc='How many times failed upload is repeated', validate=validate_int) ; r += 1
+        self.items['octoprint.compression'] = entry_row(frame, r, 'Compression', desc='none, gzip or zstd. Only if server accepts compressed files') ; r += 1
         make_button(frame, r, 0, 'Test Connection', col_span=2, width=20, sticky=None, callback=self.octoprint_test_pressed) ; r += 1
 
+    def _add_serial_tab(self):
+        # Create frame
+        frame = make_frame(self.notebook)
+        self.notebook.add(frame, text='Serial')
+        r = 0
+
+        # Connection settings
+        title_row(frame, r, 'Connection') ; r += 1
+        self.items['serial.port'] = entry_row(frame, r, 'Port', desc='Serial port of the controller, e.g. COM3 or /dev/ttyUSB0') ; r += 1
+        self.items['serial.baudrate:int'] = entry_row(frame, r, 'Baudrate', validate=validate_int) ; r += 1
+        self.items['serial.rx_buffer:int'] = entry_row(frame, r, 'RX buffer [bytes]', desc='Size of controller serial receive buffer. 128 for GRBL and Marlin', validate=validate_int) ; r += 1
+        self.items['serial.encoding'] = entry_row(frame, r, 'Encoding', desc='plain or meatpack (requires Marlin with MEATPACK enabled)') ; r += 1
+        self.items['serial.startup_delay:float'] = entry_row(frame, r, 'Startup delay [s]', desc='Time to wait for controller after opening port', validate=validate_float) ; r += 1
+
     def _add_about_tab(self):
         # Create frame
         frame = make_frame(self.notebook)
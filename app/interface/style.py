@@ -44,7 +44,10 @@ CANVAS_LINE_INFILL = '#45B0E5'
 CANVAS_LINE_INFILL_TRAVEL = '#7D8995'
 CANVAS_LINE_OUTLINE = '#D64545'
 CANVAS_LINE_OUTLINE_TRAVEL = '#8B98A6'
+CANVAS_LINE_PLAYBACK = '#FFC44D'
 CANVAS_FILL = '#666'
+PLAYBACK_STEPS = 1000
+PLAYBACK_MAX_POINTS = 100_000
 
 # Global colors
 
@@ -17,7 +17,11 @@ class SidebarView(View):
         self.trace_pressed = Event()
         self.generate_pressed = Event()
         self.export_pressed = Event()
+        self.open_pressed = Event()
+        self.stream_pressed = Event()
+        self.stop_pressed = Event()
         self.settings_pressed = Event()
+        self.status:ttk.Label = None
 
     def init(self):
         header = SidebarHeader(self.frame)
@@ -31,6 +35,8 @@ class SidebarView(View):
 
         widget = SidebarWidget(self.frame, 'Import')
         widget.add_entry('Image DPI', 'image.dpi:float')
+        widget.add_entry('Dither (none, floyd, jarvis, ordered)', 'image.dither')
+        widget.add_entry('Curve tolerance [mm]', 'image.tolerance:float', validate=self.validate_float)
         widget.add_entries('Offset [mm]', ['X', 'Y', 'Z'], ['image.offset.x:float', 'image.offset.y:float', 'image.offset.z:float'])
         self.items.update(widget.items)
 
@@ -38,19 +44,44 @@ class SidebarView(View):
         widget.add_entry('Passes', 'outline.passes:int', validate=self.validate_int)
         widget.add_entry('Power [%]', 'outline.power:float', validate=self.validate_float)
         widget.add_entry('Speed [mm/s]', 'outline.speed:float', validate=self.validate_float)
+        widget.add_entry('Power step [%/pass]', 'outline.power_step:float', validate=self.validate_float)
+        widget.add_entry('Z step [mm/pass]', 'outline.z_step:float', validate=self.validate_float)
+        widget.add_entry('Arc tolerance [mm]', 'outline.arc_tolerance:float', validate=self.validate_float)
         self.items.update(widget.items)
 
         widget = SidebarWidget(self.frame, 'Infill')
         widget.add_entry('Passes', 'infill.passes:int', validate=self.validate_int)
         widget.add_entry('Power [%]', 'infill.power:float', validate=self.validate_float)
         widget.add_entry('Speed [mm/s]', 'infill.speed:float', validate=self.validate_float)
+        widget.add_entry('Power step [%/pass]', 'infill.power_step:float', validate=self.validate_float)
+        widget.add_entry('Z step [mm/pass]', 'infill.z_step:float', validate=self.validate_float)
         widget.add_entry('Line Spacing [mm]', 'infill.line_spacing:float', validate=self.validate_float)
+        widget.add_entry('Line Angle [°]', 'infill.angle:float', validate=self.validate_float)
+        widget.add_entry('Mode (greedy, islands)', 'infill.mode')
         self.items.update(widget.items)
 
-        buttons = SidebarButtons(self.frame, 'Output', 3)
+        widget = SidebarWidget(self.frame, 'Raster')
+        widget.add_entry('Passes', 'raster.passes:int', validate=self.validate_int)
+        widget.add_entry('Min power [%]', 'raster.power_min:float', validate=self.validate_float)
+        widget.add_entry('Max power [%]', 'raster.power_max:float', validate=self.validate_float)
+        widget.add_entry('Speed [mm/s]', 'raster.speed:float', validate=self.validate_float)
+        widget.add_entry('Line Spacing [mm]', 'raster.line_spacing:float', validate=self.validate_float)
+        widget.add_entry('Overscan [mm]', 'raster.overscan:float', validate=self.validate_float)
+        widget.add_entry('Gamma', 'raster.gamma:float', validate=self.validate_float)
+        widget.add_entry('Power levels', 'raster.levels:int', validate=self.validate_int)
+        self.items.update(widget.items)
+
+        buttons = SidebarButtons(self.frame, 'Output', 6)
         buttons.add_button('Trace image', callback=self.trace_pressed)
         buttons.add_button('Generate Gcode', callback=self.generate_pressed)
         buttons.add_button('Export Gcode', callback=self.export_pressed)
+        buttons.add_button('Open Gcode', callback=self.open_pressed)
+        buttons.add_button('Send to laser', callback=self.stream_pressed)
+        buttons.add_button('Stop', callback=self.stop_pressed)
+        self.status = buttons.add_status()
+
+    def show_status(self, text:str):
+        self.status.configure(text=text)
 
     def load_config(self, cfg):
         for path, item in self.items.items():
@@ -150,6 +181,12 @@ class SidebarButtons(Widget):
         self.col += 1
         make_button(self.frame, 1, self.col, button_text, callback=callback)
 
+    def add_status(self) -> ttk.Label:
+        '''Adds label for status text below the buttons'''
+        label = ttk.Label(self.frame, text='', anchor=tk.W, wraplength=300)
+        label.grid(row=2, column=0, columnspan=self.col + 1, padx=5, pady=(0, 5), sticky=tk.NSEW)
+        return label
+
 class SidebarListbox(Widget):
     def __init__(self, parent, title_text:str, config_name:str):
         super().__init__(parent, title_text)
@@ -6,7 +6,7 @@ from PIL import Image, ImageTk
 
 
 from ...utils import PerfTool
-from ...slicer import RasterImage, Gcode, LaserMove
+from ...slicer import RasterImage, Gcode, LaserMove, LaserArc, MotionTable, JobMetrics, format_duration
 from ..style import *
 from .view import View
 
@@ -19,13 +19,19 @@ class WorkspaceView(View):
         self._anchor_id = None
         self._raster_img = None # Raster image
         self._img = None # Original image
-        self._img_scaled = None # Scaled image
+        self._img_scale = 1.0 # Size of original image relative to image pixels (previews of large drawings are smaller)
+        self._img_scaled_size = None # Size of the whole image on canvas, only visible part is scaled
         self._img_cropped = None # Cropped image
         self._img_id = None
         self._tkimg = None
         self._line_ids = []
         self._motion_pos = None
         self._gcode_calctime = None
+        self._gcode_compiletime = None
+        self._playback:MotionTable = None
+        self._metrics:JobMetrics = None
+        self._playback_time = 0.0
+        self._playback_scale:tk.Scale = None
 
     def init(self):
         '''
@@ -40,6 +46,10 @@ class WorkspaceView(View):
         self.canvas.bind('<ButtonRelease-1>', self._motion_end)
         self.canvas.bind("<B1-Motion>", self._motion)
 
+        # Playback slider, shown after gcode is generated
+        self._playback_scale = tk.Scale(self.frame, from_=0, to=PLAYBACK_STEPS, orient=tk.HORIZONTAL, showvalue=False,
+            relief='flat', highlightthickness=0, troughcolor=COLOR_BG1, command=self._playback_scrub)
+
         self._anchor_id = self.canvas.create_text(0, 0, anchor='nw', text='', fill='gray', font=FONT_CANVAS)
 
         _ = (0,0,0,0)
@@ -50,6 +60,11 @@ class WorkspaceView(View):
             self.canvas.create_text(0, 0, anchor='n', text='', fill='gray', font=FONT_CANVAS_UI),
             self.canvas.create_text(0, 0, anchor='ne', text='', fill='gray', font=FONT_CANVAS_UI)
         ]
+        # Playback items are created once and only moved around
+        self._playback_ids = [
+            self.canvas.create_line(_, width=2, fill=CANVAS_LINE_PLAYBACK, state=tk.HIDDEN),
+            self.canvas.create_oval(_, outline=CANVAS_LINE_PLAYBACK, width=2, state=tk.HIDDEN)
+        ]
         self._update_ui()
 
     def _update_ui(self):
@@ -75,14 +90,21 @@ class WorkspaceView(View):
             self.canvas.coords(self._ui_ids[3], x0+(width/2), y-17)
             
             # Info text
-            size = self._img.size
+            size = self._img.size[0] / self._img_scale, self._img.size[1] / self._img_scale
             mpix = round(size[0] * size[1] / 10**6, 1)
             mm2pix = self._raster_img.info_mm2pix
             size = size[0]/mm2pix, size[1]/mm2pix
             img = self._raster_img
             info = f'{size[0]}mm x {size[1]}mm, {img.info_numlines} lines, {img.info_numpolygons} polygons, {mpix} Mpix in {img.info_calctime} ms'
+            if img.info_compiletime: info += f' (+{img.info_compiletime} ms compile)'
             if self._gcode_calctime is not None:
                 info += f', gcode: {self._gcode_calctime} ms'
+                if self._gcode_compiletime: info += f' (+{self._gcode_compiletime} ms compile)'
+            if self._playback is not None:
+                info += f', time: {round(self._playback_time, 1)}/{round(self._playback.duration, 1)} s'
+            if self._metrics is not None:
+                m = self._metrics
+                info += f', burn: {round(m.burn_length)} mm, travel: {round(m.travel_length)} mm, {m.toggles} laser toggles, machine time: {format_duration(m.machine_time)}'
             self.canvas.itemconfig(self._ui_ids[4], text=info)
             x = self.canvas.canvasx(self.canvas.winfo_width()-10)
             self.canvas.coords(self._ui_ids[4], x, y-10)
@@ -116,6 +138,7 @@ class WorkspaceView(View):
             self._update_image()
         # Update text
         self.canvas.itemconfig(self._anchor_id, text=f'x{round(self._scale,1)}')
+        self._update_playback()
         self._update_ui()
 
     def _motion(self, event):
@@ -138,9 +161,8 @@ class WorkspaceView(View):
 
     def _scale_image(self):
         # Calculate new size
-        new_size = int(self._scale * self._img.size[0]), int(self._scale * self._img.size[1])
-        # Scale image
-        self._img_scaled = self._img.resize(new_size, Image.NEAREST)
+        scale = self._scale / self._img_scale
+        self._img_scaled_size = int(scale * self._img.size[0]), int(scale * self._img.size[1])
 
     def _crop_image(self):
         # View box in canvas space
@@ -154,7 +176,7 @@ class WorkspaceView(View):
         )
 
         # Image box visible in view box
-        new_size = self._img_scaled.size
+        new_size = self._img_scaled_size
         padding = 50
         crop = (
             min(new_size[0], max(view_box[0] - padding, 0)), # Left
@@ -162,6 +184,7 @@ class WorkspaceView(View):
             new_size[0] - min(new_size[0], max(new_size[0]-view_box[2]-padding, 0)), # Right
             new_size[1] - min(new_size[1], max(new_size[1]-view_box[3]-padding, 0)), # Bottom
         )
+        crop = [int(c) for c in crop]
 
         # Save image position
         self._img_pos = (
@@ -169,8 +192,10 @@ class WorkspaceView(View):
             crop[1] + pos[1],
         )
 
-        # Crop image
-        self._img_cropped = self._img_scaled.crop(box=crop)
+        # Scale only the cropped part of the image
+        sx, sy = max(new_size[0], 1) / self._img.size[0], max(new_size[1], 1) / self._img.size[1]
+        box = (crop[0] / sx, crop[1] / sy, crop[2] / sx, crop[3] / sy)
+        self._img_cropped = self._img.resize((max(crop[2] - crop[0], 1), max(crop[3] - crop[1], 1)), Image.NEAREST, box=box)
 
     def _update_image(self):
         # Convert PIL image to TK image
@@ -200,11 +225,16 @@ class WorkspaceView(View):
         '''
         # Save dpi
         self._img = image.image
+        self._img_scale = image.image_scale
         self._raster_img = image
         self._update_ui()
 
-        # Remove previous lines
+        # Remove previous lines and playback
         self._clear_lines()
+        self._playback = None
+        self._metrics = None
+        self._playback_scale.pack_forget()
+        self._update_playback()
 
         # Display raster image
         self._scale_image()
@@ -245,7 +275,10 @@ class WorkspaceView(View):
                     self._add_polyline(points, prev_cmd, line_color, travel_color, width)
                     points.clear()
                     points += [px * self._scale + offset[0], py * self._scale + offset[1]]
-                # Add current point
+                # Add current point (arcs as multiple points)
+                if isinstance(cmd, LaserArc):
+                    for ax, ay in cmd.interpolate(px, py)[:-1]:
+                        points += [ax * self._scale + offset[0], ay * self._scale + offset[1]]
                 points += [tx * self._scale + offset[0], ty * self._scale + offset[1]]
                 prev_cmd = cmd
                 px, py = tx, ty
@@ -266,13 +299,73 @@ class WorkspaceView(View):
         line_id = self.canvas.create_line(*points, fill=fill, arrow=arrow, width=int(width*self._scale))
         self._line_ids.append((line_id, width))
 
+    def _playback_scrub(self, value):
+        '''
+        Playback slider moved
+        '''
+        if self._playback is None: return
+        self._playback_time = float(value) / PLAYBACK_STEPS * self._playback.duration
+        self._update_playback()
+        self._update_ui()
+
+    def _update_playback(self):
+        '''
+        Moves playback items to show progress at current time. Does not create any canvas items.
+        '''
+        if self._playback is None or len(self._playback) == 0:
+            for item_id in self._playback_ids: self.canvas.itemconfig(item_id, state=tk.HIDDEN)
+            return
+
+        # Points visited so far (decimated, tkinter does not handle millions of coords well)
+        idx = max(self._playback.index(self._playback_time), 0)
+        step = max(1, idx // PLAYBACK_MAX_POINTS)
+        head = self._playback.position(self._playback_time)
+        points = np.vstack([self._playback.points[:idx+1:step], head])
+
+        # Convert to canvas space
+        offset = self.canvas.coords(self._anchor_id)
+        points = (points + 0.5) * self._scale + offset
+        if len(points) < 2: points = np.vstack([points, points])
+        self.canvas.coords(self._playback_ids[0], *points.ravel().tolist())
+        x, y = points[-1]
+        self.canvas.coords(self._playback_ids[1], x-5, y-5, x+5, y+5)
+
+        # Show
+        for item_id in self._playback_ids:
+            self.canvas.itemconfig(item_id, state=tk.NORMAL)
+            self.canvas.lift(item_id)
+
+    def _show_playback(self, motion:MotionTable, metrics:JobMetrics):
+        # Prepare playback, starts at the end of the job
+        self._playback = motion
+        self._metrics = metrics
+        self._playback_time = self._playback.duration
+        self._playback_scale.set(PLAYBACK_STEPS)
+        self._playback_scale.pack(side=tk.BOTTOM, fill=tk.X, before=self.canvas)
+        self._update_playback()
+
     def show_gcode(self, gcode:Gcode):
         # Remove previous lines
         self._clear_lines() 
+        # Draw raster lines
+        self._draw_gcode(gcode.job.raster.commands, CANVAS_LINE_INFILL, CANVAS_LINE_INFILL_TRAVEL, width=0.01)
         # Draw outline lines
-        self._draw_gcode(gcode.job.cmd_outline, CANVAS_LINE_OUTLINE, CANVAS_LINE_OUTLINE_TRAVEL)
+        self._draw_gcode(gcode.job.outline.commands, CANVAS_LINE_OUTLINE, CANVAS_LINE_OUTLINE_TRAVEL)
         # Draw infill lines
-        self._draw_gcode(gcode.job.cmd_infill, CANVAS_LINE_INFILL, CANVAS_LINE_INFILL_TRAVEL, width=0.01)
+        self._draw_gcode(gcode.job.infill.commands, CANVAS_LINE_INFILL, CANVAS_LINE_INFILL_TRAVEL, width=0.01)
+        self._show_playback(gcode.motion, gcode.metrics)
         # Save calctime
         self._gcode_calctime = gcode.info_calctime
-        self._update_ui()
\ No newline at end of file
+        self._gcode_compiletime = gcode.info_compiletime
+        self._update_ui()
+
+    def show_commands(self, commands, motion:MotionTable):
+        '''
+        Displays commands read from exported file (in image pixels), over currently displayed image
+        '''
+        self._clear_lines()
+        self._draw_gcode(commands, CANVAS_LINE_OUTLINE, CANVAS_LINE_OUTLINE_TRAVEL, width=0.5)
+        self._show_playback(motion, JobMetrics.from_table(motion))
+        self._gcode_calctime = None
+        self._gcode_compiletime = None
+        self._update_ui()
@@ -1,4 +1,4 @@
-import sys, platform
+import sys, platform, queue
 import logging as log
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
@@ -49,11 +49,15 @@ class Window:
         self._sidebar:SidebarView = None
         self._workspace:WorkspaceView = None
         self._settings = None
+        self._calls = queue.Queue() # Callbacks from worker threads, run by main loop
         # Events
         self.close_pressed = Event()
         self.trace_file = Event()
         self.generate_file = Event()
         self.export_file = Event()
+        self.open_gcode = Event()
+        self.stream_file = Event()
+        self.stop_stream = Event()
         self.test_octoprint = Event()
 
     def init(self):
@@ -90,6 +94,9 @@ class Window:
         self._sidebar.trace_pressed += self._trace_pressed
         self._sidebar.generate_pressed += self._generate_pressed
         self._sidebar.export_pressed += self._export_pressed
+        self._sidebar.open_pressed += self._open_pressed
+        self._sidebar.stream_pressed += self._stream_pressed
+        self._sidebar.stop_pressed += self.stop_stream
         self._sidebar.settings_pressed += self._settings_pressed
         self._sidebar.init()
         window.add(self._sidebar.frame)
@@ -99,13 +106,26 @@ class Window:
         self._workspace.init()
         window.add(self._workspace.frame)
 
+        self._root.after(50, self._poll_calls)
         log.info('Window spawned')
 
+    def _poll_calls(self) -> None:
+        while not self._calls.empty():
+            fn, args = self._calls.get_nowait()
+            fn(*args)
+        self._root.after(50, self._poll_calls)
+
+    def call_soon(self, fn, *args) -> None:
+        '''
+        Runs function on the tkinter thread, safe to call from any thread
+        '''
+        self._calls.put((fn, args))
+
     def _settings_pressed(self):
         self._settings.open()
 
     def _addfile_pressed(self) -> None:
-        filetypes = [('Image files', ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.webp'))]
+        filetypes = [('Image files', ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.webp', '.svg', '.dxf'))]
         filepath = filedialog.askopenfilename(parent=self._root, title='Select file to add', filetypes=filetypes)
         if len(filepath) != 0: 
             listbox = self._sidebar.items['files']
@@ -139,7 +159,7 @@ class Window:
     def _export_pressed(self) -> None:
         path = self._get_selected_path()
         filename = path.name.rsplit('.', 1)[0] + '.gcode'
-        filetypes = [('Gcode', '*.gcode')]
+        filetypes = [('Gcode', '*.gcode'), ('Gcode (gzip)', '*.gcode.gz'), ('Gcode (zstd)', '*.gcode.zst')]
         gcode_path = filedialog.asksaveasfilename(parent=self._root, title='Select filename', initialfile=filename, filetypes=filetypes)
         if len(gcode_path) > 0:
             gcode_path = Path(gcode_path)
@@ -147,6 +167,17 @@ class Window:
         else:
             log.warn('Exporting cancelled, no output path specified')
 
+    def _open_pressed(self) -> None:
+        path = self._get_selected_path()
+        if path is None: return
+        filetypes = [('Gcode', ('.gcode', '.gz', '.zst'))]
+        gcode_path = filedialog.askopenfilename(parent=self._root, title='Select exported Gcode', filetypes=filetypes)
+        if len(gcode_path) > 0: self.open_gcode(path, Path(gcode_path))
+
+    def _stream_pressed(self) -> None:
+        path = self._get_selected_path()
+        self.stream_file(path)
+
     def show_image(self, image:RasterImage):
         '''
         Changes or refreshes currently displayed image
@@ -159,6 +190,18 @@ class Window:
         '''
         self._workspace.show_gcode(gcode)
 
+    def show_status(self, text:str):
+        '''
+        Shows short status text (streaming progress) below output buttons
+        '''
+        self._sidebar.show_status(text)
+
+    def show_commands(self, commands, motion):
+        '''
+        Displays commands read from exported file over currently displayed image
+        '''
+        self._workspace.show_commands(commands, motion)
+
     def load_config(self, cfg):
         '''
         Loads config values to sidebar
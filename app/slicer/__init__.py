@@ -6,5 +6,10 @@ Including loading mages and processing them.
 
 from .slicer import Slicer
 from .raster import RasterImage
+from .vector import VectorImage, is_vector
 from .gcode import Gcode
-from .job import LaserMove
\ No newline at end of file
+from .reader import read_commands, read_file, to_pixels, origin_pixels
+from .job import LaserMove, LaserArc
+from .motion import MotionTable
+from .metrics import JobMetrics, format_duration
+from .export import ExportPipeline
\ No newline at end of file
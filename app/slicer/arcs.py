@@ -0,0 +1,92 @@
+import math
+import numpy as np
+import numba as nb
+
+from .math import *
+
+_circle_t = nb.types.UniTuple(float_t, 3)
+
+@nb.njit(_circle_t(floatarray_t, floatarray_t, floatarray_t))
+def _circle(a, b, c):
+    '''
+    Returns center x, y and radius of circle passing through 3 points. Radius is -1 if points are collinear.
+    '''
+    d = 2.0 * (a[0]*(b[1]-c[1]) + b[0]*(c[1]-a[1]) + c[0]*(a[1]-b[1]))
+    if abs(d) < 1e-9: return 0.0, 0.0, -1.0
+    a2 = a[0]**2 + a[1]**2
+    b2 = b[0]**2 + b[1]**2
+    c2 = c[0]**2 + c[1]**2
+    cx = (a2*(b[1]-c[1]) + b2*(c[1]-a[1]) + c2*(a[1]-b[1])) / d
+    cy = (a2*(c[0]-b[0]) + b2*(a[0]-c[0]) + c2*(b[0]-a[0])) / d
+    return cx, cy, math.sqrt((a[0]-cx)**2 + (a[1]-cy)**2)
+
+@nb.njit(float_t(floatarray2d_t, int_t, int_t, float_t, float_t, float_t, float_t))
+def _arc_sweep(points, start, end, cx, cy, r, tolerance):
+    '''
+    Checks if points from start to end lie on the circle and go around it in one direction.
+    Returns signed sweep angle (positive is counter clockwise), zero if points do not fit.
+    '''
+    sweep = 0.0
+    prev = math.atan2(points[start, 1]-cy, points[start, 0]-cx)
+    for k in range(start+1, end+1):
+        # Vertex must be close to the circle
+        dist = math.sqrt((points[k, 0]-cx)**2 + (points[k, 1]-cy)**2)
+        if abs(dist - r) > tolerance: return 0.0
+        # Middle of the segment too
+        half = 0.5 * math.sqrt((points[k, 0]-points[k-1, 0])**2 + (points[k, 1]-points[k-1, 1])**2)
+        if half >= r or r - math.sqrt(r*r - half*half) > tolerance: return 0.0
+        # Direction must not change
+        angle = math.atan2(points[k, 1]-cy, points[k, 0]-cx)
+        delta = angle - prev
+        if delta > math.pi: delta -= 2.0 * math.pi
+        elif delta <= -math.pi: delta += 2.0 * math.pi
+        if delta == 0.0 or delta * sweep < 0.0: return 0.0
+        sweep += delta
+        prev = angle
+    # Full circles are left to lines
+    if abs(sweep) >= 2.0 * math.pi - 1e-3: return 0.0
+    return sweep
+
+@nb.njit(floatarray2d_t(floatarray2d_t, float_t, float_t, int_t))
+def _fit_arcs(points, tolerance, max_radius, min_points):
+    n = len(points)
+    result = np.zeros((max(n-1, 0), 6), dtype=float_t)
+    count = 0
+    i = 0
+    while i < n - 1:
+        # Grow arc for as long as points fit
+        best_end, best_cx, best_cy, best_r, best_sweep = -1, 0.0, 0.0, 0.0, 0.0
+        j = i + min_points - 1
+        while j < n:
+            cx, cy, r = _circle(points[i], points[(i+j)//2], points[j])
+            if r < 0.0 or r > max_radius: break
+            sweep = _arc_sweep(points, i, j, cx, cy, r, tolerance)
+            if sweep == 0.0: break
+            best_end, best_cx, best_cy, best_r, best_sweep = j, cx, cy, r, sweep
+            j += 1
+
+        if best_end > 0:
+            # Arc
+            result[count, 0] = points[best_end, 0]
+            result[count, 1] = points[best_end, 1]
+            result[count, 2] = best_cx
+            result[count, 3] = best_cy
+            result[count, 4] = 1.0 if best_sweep > 0 else -1.0
+            result[count, 5] = best_r * abs(best_sweep)
+            i = best_end
+        else:
+            # Line
+            result[count, 0] = points[i+1, 0]
+            result[count, 1] = points[i+1, 1]
+            result[count, 5] = math.sqrt((points[i+1, 0]-points[i, 0])**2 + (points[i+1, 1]-points[i, 1])**2)
+            i += 1
+        count += 1
+    return result[:count]
+
+def fit_arcs(polygon:np.ndarray, tolerance:float, max_radius:float, min_points:int=4) -> np.ndarray:
+    '''
+    Replaces runs of at least min_points vertices that fit a circle within tolerance with arcs.
+    Returns array of segments following polygon[0], each row is: x, y, center x, center y, direction, length.
+    Direction is 0 for lines, 1 for counter clockwise and -1 for clockwise arcs (in polygon coordinates).
+    '''
+    return _fit_arcs(np.ascontiguousarray(polygon, dtype=np.float64), tolerance, max_radius, min_points)
@@ -0,0 +1,91 @@
+import math
+from enum import IntEnum
+
+class LaserUnit(IntEnum):
+    Pixels = 0
+    Milimeters = 1
+
+class LaserCmd:
+    def valid(self):
+        return True
+
+class LaserMove(LaserCmd):
+    def __init__(self, x, y, z, unit:LaserUnit, rapid:bool):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.rapid = rapid
+        self.unit = unit
+        self.applied = False
+        self.power = None # S value for dialects with inline power
+    def valid(self):
+        return (self.x is not None) or (self.y is not None) or (self.z is not None)
+    def __str__(self):
+        if not self.valid(): return ''
+        args = []
+        if self.x is not None: args.append(f"X{round(self.x,3)}")
+        if self.y is not None: args.append(f"Y{round(self.y,3)}")
+        if self.z is not None: args.append(f"Z{round(self.z,3)}")
+        if self.power is not None: args.append(f"S{self.power}")
+        args.insert(0, 'G0' if self.rapid else 'G1')
+        return ' '.join(args)
+
+class LaserArc(LaserMove):
+    '''
+    Arc move (G2/G3) around center at offset i, j from the starting point
+    '''
+    def __init__(self, x, y, i, j, clockwise:bool, unit:LaserUnit):
+        super().__init__(x, y, None, unit=unit, rapid=False)
+        self.i = i
+        self.j = j
+        self.clockwise = clockwise
+    def __str__(self):
+        code = 'G2' if self.clockwise else 'G3'
+        power = '' if self.power is None else f' S{self.power}'
+        return f'{code} X{round(self.x,3)} Y{round(self.y,3)} I{round(self.i,3)} J{round(self.j,3)}{power}'
+    def interpolate(self, x0, y0, step=math.pi/16):
+        '''Returns points along the arc (excluding start), used for previews'''
+        cx, cy = x0 + self.i, y0 + self.j
+        a0 = math.atan2(y0 - cy, x0 - cx)
+        a1 = math.atan2(self.y - cy, self.x - cx)
+        sweep = (a1 - a0) % (2*math.pi)
+        if self.clockwise: sweep -= 2*math.pi
+        r = math.hypot(self.i, self.j)
+        n = max(1, int(abs(sweep) / step))
+        points = [(cx + r*math.cos(a0 + sweep*k/n), cy + r*math.sin(a0 + sweep*k/n)) for k in range(1, n)]
+        return points + [(self.x, self.y)]
+    def length(self, x0, y0):
+        '''Returns length of the arc starting at given point'''
+        cx, cy = x0 + self.i, y0 + self.j
+        sweep = (math.atan2(self.y - cy, self.x - cx) - math.atan2(y0 - cy, x0 - cx)) % (2*math.pi)
+        if self.clockwise: sweep = 2*math.pi - sweep
+        return math.hypot(self.i, self.j) * sweep
+
+class LaserSpeed(LaserCmd):
+    def __init__(self, speed):
+        self.speed = speed
+    def __str__(self):
+        return f'G1 F{round(float(self.speed) * 60, 3)}' # Convert mm/s to mm/min
+
+class LaserAccel(LaserCmd):
+    def __init__(self, accel):
+        self.accel = accel
+    def __str__(self):
+        return f'M204 P{self.accel} T{self.accel}'
+
+class LaserRaw(LaserCmd):
+    def __init__(self, code):
+        self.code = code
+    def __str__(self):
+        return self.code
+
+class LaserPower(LaserCmd):
+    '''
+    Power change written with configured laser_on command. Keeps power in %, so it can be changed per pass.
+    '''
+    def __init__(self, command:str, power:float, value:int):
+        self.command = command
+        self.power = power
+        self.value = value
+    def __str__(self):
+        return self.command.replace("{power}", str(self.value))
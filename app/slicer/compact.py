@@ -0,0 +1,116 @@
+from typing import Iterable
+
+from .commands import LaserCmd, LaserMove, LaserArc, LaserSpeed, LaserAccel
+
+OUTPUT_MODES = ['plain', 'compact', 'relative']
+
+def _decimals(resolution:float) -> int:
+    '''Returns number of decimals needed to write multiples of resolution'''
+    if resolution <= 0: return 3
+    for d in range(7):
+        if abs(round(resolution * 10**d) - resolution * 10**d) < 1e-6: return d
+    return 6
+
+def _fmt(value:float, decimals:int) -> str:
+    '''Formats number without trailing zeros'''
+    s = f'{value:.{decimals}f}'
+    if '.' in s: s = s.rstrip('0').rstrip('.')
+    return '0' if s == '-0' else s
+
+class CompactEncoder:
+    '''
+    Writes commands with as few bytes as possible:
+    - coordinates snapped to machine resolution, without trailing zeros
+    - feed rate folded into the next move instead of separate G1 F line
+    - optionally relative coordinates (G91) inside infill blocks
+    Works on applied commands (in mm). Counts bytes of plain and compact output.
+    '''
+
+    def __init__(self, resolution:float, relative:bool=False):
+        self.resolution = resolution
+        self.relative = relative
+        self.decimals = _decimals(resolution)
+        self.bytes_plain = 0
+        self.bytes_compact = 0
+        self._pos = [0.0, 0.0, 0.0] # Snapped absolute position
+        self._feed = None # Feed rate waiting for next move
+
+    @property
+    def savings(self) -> float:
+        '''Fraction of bytes saved (0.0 - 1.0)'''
+        return 1.0 - self.bytes_compact / self.bytes_plain if self.bytes_plain > 0 else 0.0
+
+    def _snap(self, value:float) -> float:
+        if self.resolution <= 0: return round(value, 3)
+        return round(round(value / self.resolution) * self.resolution, self.decimals)
+
+    def _move(self, cmd:LaserMove, first:bool, relative:bool) -> str:
+        arc = isinstance(cmd, LaserArc)
+        args = []
+        for axis, name in enumerate('XYZ'):
+            value = getattr(cmd, name.lower())
+            if value is None and not (first and axis < 2): continue
+            if value is None: value = self._pos[axis]
+            # Arcs keep full precision, snapped end point would not lie on the circle
+            value = round(value, 3) if arc else self._snap(value)
+            delta = round(value - self._pos[axis], 3)
+            if delta == 0 and not first and not arc: continue
+            decimals = 3 if arc else self.decimals
+            args.append(name + _fmt(delta if relative else value, max(decimals, 3) if relative else decimals))
+            self._pos[axis] = value
+        if arc:
+            code = 'G2' if cmd.clockwise else 'G3'
+            args.append('I' + _fmt(cmd.i, 3))
+            args.append('J' + _fmt(cmd.j, 3))
+        else:
+            code = 'G0' if cmd.rapid else 'G1'
+        if cmd.power is not None: args.append(f'S{cmd.power}')
+        # Move got shorter than resolution, skip it
+        if len(args) == 0: return None
+        if self._feed is not None:
+            args.append('F' + _fmt(self._feed * 60, 1))
+            self._feed = None
+        return code + ' ' + ' '.join(args)
+
+    def encode(self, commands:Iterable[LaserCmd], relative:bool=False) -> Iterable[str]:
+        '''
+        Yields compact lines of a single pass of commands.
+        First move of the pass has absolute X and Y, so passes do not depend on where previous one ended.
+        With relative set, rest of the moves are relative (G91).
+        '''
+        relative = relative and self.relative
+        first = True
+        for cmd in commands:
+            if not cmd.valid(): continue
+            plain = str(cmd)
+            self.bytes_plain += len(plain) + 1
+
+            if isinstance(cmd, LaserSpeed):
+                self._feed = cmd.speed
+                continue
+            if isinstance(cmd, LaserAccel):
+                line = f'M204 S{_fmt(cmd.accel, 1)}'
+            elif isinstance(cmd, LaserMove):
+                line = self._move(cmd, first, relative and not first)
+                if line is None: continue
+                if first and relative:
+                    # First move is absolute, the rest of the pass is relative to it
+                    self.bytes_compact += len(line) + 1
+                    yield line
+                    line = 'G91'
+                first = False
+            else:
+                line = plain
+            self.bytes_compact += len(line) + 1
+            yield line
+
+        if relative and not first:
+            self.bytes_compact += 4
+            yield 'G90'
+
+        # Pass ended without move, feed rate can not be folded
+        if self._feed is not None:
+            line = 'G1 F' + _fmt(self._feed * 60, 1)
+            self._feed = None
+            self.bytes_compact += len(line) + 1
+            yield line
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+from typing import List
+
+def _segments(length:float, tolerance:float) -> int:
+    return max(1, int(math.ceil(math.sqrt(max(length, 0.0) / max(tolerance, 1e-9)))))
+
+def flatten_cubic(p0, p1, p2, p3, tolerance:float) -> np.ndarray:
+    '''
+    Returns points of cubic bezier curve (without the first one), no further than tolerance from the curve.
+    Number of segments comes from Wang's formula.
+    '''
+    p0, p1, p2, p3 = (np.asarray(p, dtype=np.float64) for p in (p0, p1, p2, p3))
+    m = max(np.hypot(*(p0 - 2*p1 + p2)), np.hypot(*(p1 - 2*p2 + p3)))
+    t = np.linspace(0.0, 1.0, _segments(0.75 * m, tolerance) + 1)[1:, None]
+    s = 1.0 - t
+    return s**3 * p0 + 3 * s**2 * t * p1 + 3 * s * t**2 * p2 + t**3 * p3
+
+def flatten_quad(p0, p1, p2, tolerance:float) -> np.ndarray:
+    '''Returns points of quadratic bezier curve (without the first one), no further than tolerance from the curve'''
+    p0, p1, p2 = (np.asarray(p, dtype=np.float64) for p in (p0, p1, p2))
+    m = np.hypot(*(p0 - 2*p1 + p2))
+    t = np.linspace(0.0, 1.0, _segments(0.25 * m, tolerance) + 1)[1:, None]
+    s = 1.0 - t
+    return s**2 * p0 + 2 * s * t * p1 + t**2 * p2
+
+def flatten_arc(center, rx:float, ry:float, rotation:float, start:float, sweep:float, tolerance:float) -> np.ndarray:
+    '''
+    Returns points of elliptical arc (without the first one), no further than tolerance from the arc.
+    Angles are in radians, sweep is positive counter clockwise (in y up coordinates).
+    '''
+    r = max(abs(rx), abs(ry))
+    step = 2.0 * math.acos(max(1.0 - tolerance / r, -1.0)) if r > tolerance else math.pi / 2
+    n = max(1, int(math.ceil(abs(sweep) / max(step, 1e-6))))
+    angles = start + sweep * np.arange(1, n + 1) / n
+    x, y = rx * np.cos(angles), ry * np.sin(angles)
+    c, s = math.cos(rotation), math.sin(rotation)
+    return np.column_stack([center[0] + x*c - y*s, center[1] + x*s + y*c])
+
+def join_paths(paths:List[np.ndarray], tolerance:float) -> List[np.ndarray]:
+    '''
+    Chains open paths with touching ends into longer ones (CAD outlines are often drawn line by line).
+    Paths that end where they start are closed by repeating the first point.
+    '''
+    result, pending = [], []
+    for path in paths:
+        if len(path) < 2: continue
+        if np.hypot(*(path[-1] - path[0])) <= tolerance: result.append(np.vstack([path[:-1], path[:1]]))
+        else: pending.append(path)
+
+    # Index ends of open paths on a grid, ends within tolerance are in the same or neighbouring cell
+    cell = max(tolerance, 1e-9)
+    grid = {}
+    def key(p): return int(math.floor(p[0] / cell)), int(math.floor(p[1] / cell))
+    for idx, path in enumerate(pending):
+        for end in (0, -1): grid.setdefault(key(path[end]), []).append(idx)
+    used = [False] * len(pending)
+
+    def take(point):
+        # Returns unused path starting at point, reversed if it ends there
+        kx, ky = key(point)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for idx in grid.get((kx + dx, ky + dy), []):
+                    if used[idx]: continue
+                    path = pending[idx]
+                    if np.hypot(*(path[0] - point)) <= tolerance: reverse = False
+                    elif np.hypot(*(path[-1] - point)) <= tolerance: reverse = True
+                    else: continue
+                    used[idx] = True
+                    return path[::-1] if reverse else path
+        return None
+
+    for idx, path in enumerate(pending):
+        if used[idx]: continue
+        used[idx] = True
+        chain = [path]
+        # Grow forward, then backward
+        for _ in range(2):
+            while np.hypot(*(chain[-1][-1] - chain[0][0])) > tolerance:
+                following = take(chain[-1][-1])
+                if following is None: break
+                chain.append(following[1:])
+            chain = [p[::-1] for p in reversed(chain)]
+        joined = np.vstack(chain)
+        if np.hypot(*(joined[-1] - joined[0])) <= tolerance: joined[-1] = joined[0]
+        result.append(joined)
+    return result
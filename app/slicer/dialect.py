@@ -0,0 +1,65 @@
+from typing import List
+
+class LaserDialect:
+    '''
+    Describes how laser power is controlled by the firmware
+    '''
+    name = ''
+    inline = False # Power is set with S word on move lines instead of separate commands
+    sync = False # Power change drains planner (M400) before taking effect
+    marlin = True # Supports Marlin commands (M18, M201, M204, M400)
+    max_value = 255 # S value at 100% power
+
+    def header(self) -> List[str]:
+        return []
+
+    def footer(self) -> List[str]:
+        return []
+
+    def value(self, power:float) -> int:
+        '''Converts power in % to S value'''
+        return int(float(power) / 100.0 * self.max_value)
+
+class MarlinFanDialect(LaserDialect):
+    '''
+    Laser connected to fan PWM output. Power is changed with configured laser_on command
+    and planner has to be drained before every change.
+    '''
+    name = 'marlin_fan'
+    sync = True
+
+class MarlinInlineDialect(LaserDialect):
+    '''
+    Marlin LASER_FEATURE with LASER_POWER_INLINE. Power is set with S word on moves,
+    changes are synchronized with planner blocks.
+    '''
+    name = 'marlin_inline'
+    inline = True
+
+    def header(self):
+        return ['M3 I S0'] # Enable inline mode
+
+    def footer(self):
+        return ['M5 I'] # Disable inline mode
+
+class GrblDialect(LaserDialect):
+    '''
+    GRBL 1.1 in laser mode ($32=1). M4 scales power with actual speed, G0 moves turn laser off.
+    '''
+    name = 'grbl'
+    inline = True
+    marlin = False
+    max_value = 1000 # Default $30
+
+    def header(self):
+        return ['; Requires laser mode ($32=1)', 'M4 S0']
+
+    def footer(self):
+        return ['M5']
+
+DIALECTS = {d.name: d for d in [MarlinFanDialect, MarlinInlineDialect, GrblDialect]}
+
+def get_dialect(name:str) -> LaserDialect:
+    if name not in DIALECTS:
+        raise ValueError(f'Unknown dialect {name}, available: {", ".join(DIALECTS)}')
+    return DIALECTS[name]()
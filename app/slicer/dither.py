@@ -0,0 +1,80 @@
+import numpy as np
+import numba as nb
+
+from .math import *
+
+DITHER_MODES = ['none', 'floyd', 'jarvis', 'ordered']
+
+# Error diffusion kernels, centered on the current pixel (row 0, middle column)
+_KERNELS = {
+    'floyd': np.array([
+        [0, 0, 0, 7, 0],
+        [0, 3, 5, 1, 0],
+        [0, 0, 0, 0, 0]], dtype=np.float64) / 16,
+    'jarvis': np.array([
+        [0, 0, 0, 7, 5],
+        [3, 5, 7, 5, 3],
+        [1, 3, 5, 3, 1]], dtype=np.float64) / 48,
+}
+
+def _bayer(n:int) -> np.ndarray:
+    '''Returns n x n Bayer threshold matrix (n is power of two) with values 0..n*n-1'''
+    m = np.zeros((1, 1), dtype=np.float64)
+    while len(m) < n:
+        m = np.block([[4*m, 4*m + 2], [4*m + 3, 4*m + 1]])
+    return m
+
+# Thresholds of ordered dithering in luminance units
+_BAYER = (_bayer(8) + 0.5) / 64 * 255
+
+@nb.njit(bytearray2d_t(bytearray2d_t, floatarray2d_t), nogil=True)
+def _error_diffusion(pixels, kernel):
+    '''
+    Dithers image in place, row by row in serpentine order. Only errors of the rows
+    covered by kernel are held in memory, so the whole image is streamed once.
+    '''
+    h, w = pixels.shape
+    kh, kw = kernel.shape
+    r = kw // 2
+    errors = np.zeros((kh, w + 2*r), dtype=np.float64) # Padded, kernel never goes out of bounds
+    for y in range(h):
+        reverse = y % 2 == 1
+        current = errors[y % kh]
+        for i in range(w):
+            x = w - 1 - i if reverse else i
+            value = pixels[y, x] + current[x + r]
+            out = 255 if value > 127 else 0
+            pixels[y, x] = out
+            error = value - out
+            for ky in range(kh):
+                row = errors[(y + ky) % kh]
+                for kx in range(kw):
+                    weight = kernel[ky, kx]
+                    if weight == 0.0: continue
+                    # Kernel is mirrored when going right to left
+                    dx = r - kx if reverse else kx - r
+                    row[x + r + dx] += error * weight
+        # Current row becomes the last one covered by kernel
+        current[:] = 0.0
+    return pixels
+
+@nb.njit(bytearray2d_t(bytearray2d_t, floatarray2d_t), parallel=True, nogil=True)
+def _ordered(pixels, thresholds):
+    h, w = pixels.shape
+    n = thresholds.shape[0]
+    for y in nb.prange(h):
+        for x in range(w):
+            pixels[y, x] = 255 if pixels[y, x] > thresholds[y % n, x % n] else 0
+    return pixels
+
+def dither_image(pixels:np.ndarray, mode:str) -> np.ndarray:
+    '''
+    Converts 8-bit luminance to black (0) and white (255) pixels in place
+    '''
+    if mode not in DITHER_MODES:
+        raise ValueError(f'Unknown dither mode {mode}, available: {", ".join(DITHER_MODES)}')
+    if mode == 'none':
+        pixels[:] = (pixels > 127) * np.uint8(255)
+        return pixels
+    if mode == 'ordered': return _ordered(pixels, _BAYER)
+    return _error_diffusion(pixels, _KERNELS[mode])
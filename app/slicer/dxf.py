@@ -0,0 +1,165 @@
+import math
+import logging as log
+import numpy as np
+from pathlib import Path
+from typing import List, Tuple
+
+from .curves import flatten_arc
+
+# $INSUNITS values to mm, unitless drawings are assumed to be in mm
+UNITS = {0: 1.0, 1: 25.4, 2: 304.8, 4: 1.0, 5: 10.0, 6: 1000.0, 8: 0.0000254, 9: 0.0254, 10: 914.4, 13: 0.001, 14: 100.0}
+
+def _pairs(path:Path):
+    '''Yields group code and value pairs of ASCII DXF file'''
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        lines = f.read().splitlines()
+    for i in range(0, len(lines) - 1, 2):
+        yield int(lines[i].strip()), lines[i + 1].strip()
+
+def _entities(path:Path):
+    '''
+    Returns header variables and entities of ENTITIES section, as (type, list of code/value pairs).
+    Blocks are not expanded.
+    '''
+    header, entities = {}, []
+    section, variable, current = None, None, None
+    for code, value in _pairs(path):
+        if code == 0:
+            if current is not None: entities.append(current)
+            current = None
+            if value == 'ENDSEC': section = None
+            elif section == 'ENTITIES': current = (value, [])
+            continue
+        if code == 2 and section is None:
+            section = value
+        elif section == 'HEADER':
+            if code == 9: variable = value
+            elif variable is not None: header.setdefault(variable, value)
+        elif current is not None:
+            current[1].append((code, value))
+    return header, entities
+
+def _values(tags, code:int) -> List[float]:
+    return [float(v) for c, v in tags if c == code]
+
+def _value(tags, code:int, default:float=0.0) -> float:
+    for c, v in tags:
+        if c == code: return float(v)
+    return default
+
+def _bulge_points(vertices:np.ndarray, bulges:List[float], closed:bool, tolerance:float) -> np.ndarray:
+    '''Returns points of polyline, segments with bulge are arcs (bulge is tangent of quarter of the sweep angle)'''
+    points = [vertices[0]]
+    count = len(vertices) if closed else len(vertices) - 1
+    for i in range(count):
+        a, b = vertices[i], vertices[(i + 1) % len(vertices)]
+        bulge = bulges[i] if i < len(bulges) else 0.0
+        chord = np.hypot(*(b - a))
+        if bulge == 0.0 or chord == 0.0:
+            points.append(b)
+            continue
+        sweep = 4.0 * math.atan(bulge)
+        # Center is on the left of the chord for counter clockwise arcs
+        u = (b - a) / chord
+        offset = chord / 2 / math.tan(sweep / 2)
+        center = (a + b) / 2 + np.array([-u[1], u[0]]) * offset
+        radius = np.hypot(*(a - center))
+        start = math.atan2(a[1] - center[1], a[0] - center[0])
+        arc = flatten_arc(center, radius, radius, 0.0, start, sweep, tolerance)
+        points.extend(arc[:-1])
+        points.append(b)
+    return np.array(points)
+
+def _spline(tags, tolerance:float) -> np.ndarray:
+    '''Returns points of (rational) B-spline, evaluated with de Boor's algorithm'''
+    degree = int(_value(tags, 71, 3))
+    knots = np.array(_values(tags, 40))
+    control = np.column_stack([_values(tags, 10), _values(tags, 20)])
+    weights = np.array(_values(tags, 41)) if len(_values(tags, 41)) == len(control) else np.ones(len(control))
+    if len(control) == 0:
+        fit = np.column_stack([_values(tags, 11), _values(tags, 21)])
+        return fit if len(fit) > 1 else None # Fit points only, drawn as polyline
+    if len(knots) != len(control) + degree + 1: return control
+    # Segments per knot span from the bend of the control polygon
+    bend = np.hypot(*np.diff(control, 2, axis=0).T).max() if len(control) > 2 else 0.0
+    per_span = max(1, int(math.ceil(math.sqrt(degree * (degree - 1) / 8 * bend / max(tolerance, 1e-9)))))
+    spans = [(knots[i], knots[i + 1]) for i in range(degree, len(control)) if knots[i + 1] > knots[i]]
+    ts = [spans[0][0]] + [a + (b - a) * k / per_span for a, b in spans for k in range(1, per_span + 1)]
+    homogeneous = np.column_stack([control * weights[:, None], weights])
+    points = []
+    for t in ts:
+        # Knot span that contains t
+        k = min(max(np.searchsorted(knots, t, side='right') - 1, degree), len(control) - 1)
+        d = homogeneous[k - degree:k + 1].copy()
+        for r in range(1, degree + 1):
+            for j in range(degree, r - 1, -1):
+                i = k - degree + j
+                den = knots[i + degree - r + 1] - knots[i]
+                alpha = (t - knots[i]) / den if den != 0 else 0.0
+                d[j] = (1.0 - alpha) * d[j - 1] + alpha * d[j]
+        points.append(d[degree, :2] / d[degree, 2])
+    return np.array(points)
+
+def parse_dxf(path:Path, tolerance:float) -> List[Tuple[np.ndarray, bool]]:
+    '''
+    Returns polylines (in mm, y axis pointing up) and closed flag of every entity in ASCII DXF file.
+    Curves are flattened so they are no further than tolerance (in mm) from the original.
+    '''
+    header, entities = _entities(path)
+    unit = UNITS.get(int(float(header.get('$INSUNITS', 0))), 1.0)
+    tolerance /= unit
+
+    result = []
+    skipped = set()
+    polyline = None # Vertices of old style POLYLINE
+    for kind, tags in entities:
+        if kind == 'LINE':
+            result.append((np.array([[_value(tags, 10), _value(tags, 20)], [_value(tags, 11), _value(tags, 21)]]), False))
+        elif kind == 'LWPOLYLINE':
+            vertices = np.column_stack([_values(tags, 10), _values(tags, 20)])
+            # Bulge belongs to the vertex it follows
+            bulges, index = [0.0] * len(vertices), -1
+            for code, value in tags:
+                if code == 10: index += 1
+                elif code == 42 and index >= 0: bulges[index] = float(value)
+            closed = int(_value(tags, 70)) & 1 == 1
+            if len(vertices) > 1: result.append((_bulge_points(vertices, bulges, closed, tolerance), closed))
+        elif kind == 'POLYLINE':
+            polyline = (int(_value(tags, 70)) & 1 == 1, [], [])
+        elif kind == 'VERTEX' and polyline is not None:
+            polyline[1].append((_value(tags, 10), _value(tags, 20)))
+            polyline[2].append(_value(tags, 42))
+        elif kind == 'SEQEND' and polyline is not None:
+            closed, vertices, bulges = polyline
+            if len(vertices) > 1: result.append((_bulge_points(np.array(vertices), bulges, closed, tolerance), closed))
+            polyline = None
+        elif kind in ('CIRCLE', 'ARC'):
+            center, radius = (_value(tags, 10), _value(tags, 20)), _value(tags, 40)
+            if radius <= 0: continue
+            start = math.radians(_value(tags, 50)) if kind == 'ARC' else 0.0
+            end = math.radians(_value(tags, 51)) if kind == 'ARC' else 2 * math.pi
+            sweep = (end - start) % (2 * math.pi) or 2 * math.pi
+            first = np.array([[center[0] + radius * math.cos(start), center[1] + radius * math.sin(start)]])
+            points = np.vstack([first, flatten_arc(center, radius, radius, 0.0, start, sweep, tolerance)])
+            result.append((points, kind == 'CIRCLE'))
+        elif kind == 'ELLIPSE':
+            center = (_value(tags, 10), _value(tags, 20))
+            major = np.array([_value(tags, 11), _value(tags, 21)])
+            rx = np.hypot(*major)
+            ry = rx * _value(tags, 40, 1.0)
+            rotation = math.atan2(major[1], major[0])
+            start, end = _value(tags, 41), _value(tags, 42, 2 * math.pi)
+            sweep = (end - start) % (2 * math.pi) or 2 * math.pi
+            first = flatten_arc(center, rx, ry, rotation, start, 0.0, tolerance)[:1]
+            points = np.vstack([first, flatten_arc(center, rx, ry, rotation, start, sweep, tolerance)])
+            result.append((points, abs(sweep - 2 * math.pi) < 1e-9))
+        elif kind == 'SPLINE':
+            points = _spline(tags, tolerance)
+            if points is not None and len(points) > 1:
+                closed = int(_value(tags, 70)) & 1 == 1 or np.hypot(*(points[-1] - points[0])) <= tolerance
+                if closed and np.any(points[-1] != points[0]): points = np.vstack([points, points[:1]])
+                result.append((points, closed))
+        else:
+            skipped.add(kind)
+    if skipped: log.warning(f'Unsupported DXF entities skipped: {", ".join(sorted(skipped))}')
+    return [(points * unit, closed) for points, closed in result]
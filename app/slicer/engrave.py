@@ -0,0 +1,61 @@
+import numpy as np
+import numba as nb
+
+from .math import *
+
+_extents_t = nb.types.UniTuple(intarray_t, 2)
+
+def power_lut(power_min:float, power_max:float, gamma:float=1.0, levels:int=64) -> np.ndarray:
+    '''
+    Returns burn power (in %) for every 8-bit luminance. Darker pixels burn with more power,
+    white ones are not burned at all. Power is quantized to levels, so similar shades share one value.
+    '''
+    levels = max(int(levels), 2)
+    darkness = 1.0 - np.arange(256, dtype=np.float64) / 255.0
+    level = np.round(darkness ** gamma * (levels - 1))
+    lut = power_min + (power_max - power_min) * level / (levels - 1)
+    lut[level == 0] = 0.0
+    return lut
+
+def power_runs(gray:np.ndarray, rows:np.ndarray, lut:np.ndarray):
+    '''
+    Splits sampled rows of grayscale image into runs of pixels with equal power.
+    Returns (row index, first column, column after the last one, power) of every run, ordered by row and column.
+    '''
+    power = lut[gray[rows]]
+    # Run starts where power changes and at the start of every row
+    starts = np.ones(power.shape, dtype=bool)
+    starts[:, 1:] = power[:, 1:] != power[:, :-1]
+    row, x0 = np.nonzero(starts)
+    # Run ends where the next one starts, or at the end of its row
+    x1 = np.empty_like(x0)
+    x1[:-1] = x0[1:]
+    last = np.ones(len(x0), dtype=bool)
+    last[:-1] = row[1:] != row[:-1]
+    x1[last] = power.shape[1]
+    return row, x0, x1, power[row, x0]
+
+@nb.njit(_extents_t(bytearray2d_t, int_t), parallel=True, nogil=True)
+def _row_extents(gray, limit):
+    h, w = gray.shape
+    first = np.full(h, -1, dtype=np.int64)
+    last = np.full(h, -1, dtype=np.int64)
+    for y in nb.prange(h):
+        for x in range(w):
+            if gray[y, x] < limit:
+                first[y] = x
+                break
+        if first[y] < 0: continue
+        for x in range(w - 1, -1, -1):
+            if gray[y, x] < limit:
+                last[y] = x
+                break
+    return first, last
+
+def row_extents(gray:np.ndarray, lut:np.ndarray):
+    '''
+    Returns occupancy index of the image: first and last column burned in every row, -1 for blank rows.
+    Power falls with luminance, so pixels are burned when they are darker than the first unburned shade (white is never burned).
+    '''
+    limit = int(np.argmax(lut == 0))
+    return _row_extents(gray, limit)
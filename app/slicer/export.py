@@ -0,0 +1,126 @@
+import queue, threading
+import logging as log
+from pathlib import Path
+
+from .gcode import Gcode
+from ..utils import PerfTool, OctoprintUploader, OctoprintResult
+from ..utils.compression import Compressor, from_path, with_extension, open_text
+
+_END = None # Marks end of the stream in queues
+_ABORT = object() # Marks failed generation, consumers drop what they have
+
+class ExportAborted(Exception):
+    pass
+
+class ExportPipeline:
+    '''
+    Exports Gcode to file and uploads it to OctoPrint while it is being generated.
+    Generated blocks are passed through bounded queues to writer and uploader threads,
+    so time to printer is close to generation time instead of generation + write + upload.
+    File is compressed when its name ends with .gz or .zst, upload can be compressed separately.
+    Compression is done by consumer threads, blocks are compressed as they come.
+    '''
+
+    def __init__(self, gcode:Gcode, file_path:Path, uploader:OctoprintUploader=None, queue_size:int=64, upload_compression:str='none'):
+        self.gcode = gcode
+        self.file_path = file_path
+        self.uploader = uploader
+        self.compression = from_path(file_path)
+        self.upload_compression = upload_compression
+        self.upload_name = with_extension(Path(file_path.name), upload_compression).name
+        self.upload_result:OctoprintResult = None
+        self.info_bytes:int = 0
+        self.info_bytes_written:int = 0
+        self.info_failed:bool = False
+        self._queues = [queue.Queue(queue_size)]
+        if uploader is not None: self._queues.append(queue.Queue(queue_size))
+
+    def _drain(self, q:queue.Queue):
+        while True:
+            block = q.get()
+            if block is _END: return
+            if block is _ABORT: raise ExportAborted()
+            yield block
+
+    def _write(self, q:queue.Queue):
+        blocks = self._drain(q)
+        try:
+            compressor = Compressor(self.compression)
+            with self.file_path.open('wb') as f:
+                for data in compressor.stream(blocks):
+                    f.write(data)
+            self.info_bytes_written = compressor.info_bytes_out
+        except ExportAborted:
+            # Partial file would look like a finished job
+            self.file_path.unlink(missing_ok=True)
+            self.info_failed = True
+            return
+        except Exception as e:
+            log.error(f'Failed to write {self.file_path}: {e}')
+            self.info_failed = True
+        # Consume the rest, so generator is never blocked
+        self._discard(blocks)
+
+    def _upload(self, q:queue.Queue):
+        # Streamed upload can not be repeated, retry is done from file after export
+        blocks = self._drain(q)
+        try:
+            compressor = Compressor(self.upload_compression)
+            self.upload_result = self.uploader.upload_stream(self.upload_name, lambda: compressor.stream(blocks), retries=0)
+        except Exception as e:
+            log.error(f'Failed to upload {self.upload_name}: {e}')
+            self.upload_result = OctoprintResult.GenericError
+        self._discard(blocks)
+
+    def _discard(self, blocks):
+        try:
+            for _ in blocks: pass
+        except ExportAborted:
+            pass
+
+    def run(self) -> bool:
+        '''
+        Generates output on the calling thread, blocks until file is written and streamed upload is finished.
+        Returns False if file could not be written. If generation fails, partial file is removed,
+        streamed upload is dropped before it is finished and the exception is raised again.
+        '''
+        perf = PerfTool()
+        threads = [threading.Thread(target=self._write, args=(self._queues[0],), daemon=True)]
+        if self.uploader is not None:
+            threads.append(threading.Thread(target=self._upload, args=(self._queues[1],), daemon=True))
+        for thread in threads: thread.start()
+
+        # Generate and pass to consumers
+        try:
+            for block in self.gcode.iter_output():
+                data = block.encode()
+                self.info_bytes += len(data)
+                for q in self._queues: q.put(data)
+        except BaseException:
+            for q in self._queues: q.put(_ABORT)
+            for thread in threads: thread.join()
+            log.error(f'Gcode generation failed, {self.file_path} removed')
+            raise
+        for q in self._queues: q.put(_END)
+        perf.tick('generate')
+
+        for thread in threads: thread.join()
+        perf.tick('finish')
+        compressed = f' ({self.compression}: {self.info_bytes_written} bytes)' if self.compression != 'none' else ''
+        log.info(f'Saved Gcode to {self.file_path}, {self.info_bytes} bytes{compressed}, ' + str(perf))
+
+        # Streamed upload failed because of connection, try again with the file (in background)
+        if not self.info_failed and self.upload_result == OctoprintResult.ConnectionFailed:
+            self._retry_upload()
+        return not self.info_failed
+
+    def _retry_upload(self):
+        if self.compression == self.upload_compression:
+            self.uploader.upload_async(self.file_path, self.upload_name)
+            return
+        # File has different compression than upload, convert it while uploading
+        def content():
+            with open_text(self.file_path) as f:
+                lines = (line.encode() for line in f)
+                yield from Compressor(self.upload_compression).stream(lines)
+        threading.Thread(target=self.uploader.upload_stream, args=(self.upload_name, content), daemon=True).start()
@@ -5,7 +5,15 @@ from pathlib import Path
 
 from .math import *
 from .job import LaserJob, LaserUnit
+from .dialect import DIALECTS
 from .raster import RasterImage
+from .arcs import fit_arcs
+from .optimize import merge_moves
+from .motion import trapezoid_time, MotionTable
+from .metrics import JobMetrics
+from .ordering import order_polygons, order_paths, travel_distance
+from .infill import scan_segments, rotate, InfillCells, INFILL_MODES
+from .engrave import power_lut, power_runs, row_extents
 from ..utils import PerfTool, Octoprint
 
 
@@ -13,28 +21,6 @@ from ..utils import PerfTool, Octoprint
 def sqdist(a, b):
     return (b[0]-a[0])**2 + (b[1]-a[1])**2
 
-@nb.njit(float_t(floatarray_t, floatarray_t, float_t))
-def get_x(a, b, y):
-    # Check if ba is not zero
-    ba = b[1] - a[1]
-    if ba == 0: return -1.0
-    ya = y - a[1]
-
-    # Find t
-    t = ya / ba
-    if t > 1.0 or t < 0.0: return -1.0
-    return (1.0 - t) * a[0] + t * b[0]
-
-@nb.njit(floatlist_t(floatarray2d_t, float_t))
-def intersect(points, y):
-    intersections = [] # X coords
-    for idx in nb.prange(len(points)-1):
-        p1 = points[idx]
-        p2 = points[idx+1]
-        x = get_x(p1, p2, y)
-        if x != -1: intersections.append(x)
-    return intersections
-
 @nb.njit(nb.int32(floatarray2d_t, floatarray_t, float_t, float_t))
 def closest(lines, prev, float_max, max_dist):
     lines_len = len(lines)
@@ -52,6 +38,8 @@ def closest(lines, prev, float_max, max_dist):
             if dist < max_dist: break # Good enough
     return closest_idx
 
+ARC_MAX_RADIUS = 200.0 # mm, larger arcs are nearly straight lines
+
 class Gcode:
     '''
     Generates Gcode from RasterImage 
@@ -60,17 +48,77 @@ class Gcode:
         self._img = img
         self.job = None
         self.output = None
-        self.info_calctime = None
+        self.info_calctime = None # ms, without numba compilation
+        self.info_compiletime = None
+        self.info_arc_reduction = None
+        self.info_bytes_saved = None
+        self.info_travel = None # Outline travel before and after ordering, in mm
+        self.info_raster_time = None # Raster sweep time with full width lines and trimmed ones, in s
+        self.motion:MotionTable = None # Moves of raster, outline and infill, used for preview
+        self.metrics:JobMetrics = None
+
+    def _order_outline(self, config):
+        '''
+        Returns polygons in order that minimizes travel between them
+        '''
+        polygons = self._img.polygons
+        start = (0.0, float(self._img.info_height_px)) # Machine origin is in bottom left corner
+        pix2mm = 1 / self._img.info_mm2pix
+        before = travel_distance(polygons, start) * pix2mm
+        polygons = order_polygons(polygons, start, budget=config.get_value('machine.order_time'))
+        after = travel_distance(polygons, start) * pix2mm
+        self.info_travel = (before, after)
+        self.perf.tick('order')
+        log.info(f'Outline travel: {round(before)} mm -> {round(after)} mm ({round((1 - after / max(before, 1e-9))*100, 1)}% less)')
+        return polygons
 
     def _generate_outline(self, config):
-        for polygon in self._img.polygons:
+        polygons = self._order_outline(config)
+
+        # Arcs are used only when tolerance is set
+        tolerance = config.get_value('outline.arc_tolerance') * self._img.info_mm2pix
+        if tolerance > 0:
+            self._generate_outline_arcs(config, polygons, tolerance)
+            return
+
+        for polygon in polygons:
             # Move to start
             self.job.travel(polygon[0])
             # Burn lines
             for point in polygon[1:]:
                 self.job.burn(point)
         self.job.power_off()
-        self.perf.tick('outline')
+        self.perf.tick('burn')
+
+    def _generate_outline_arcs(self, config, polygons, tolerance):
+        max_radius = ARC_MAX_RADIUS * self._img.info_mm2pix
+        pix2mm = 1 / self._img.info_mm2pix
+        num_lines, num_segments = 0, 0
+        lines_len, segments_len = [], []
+        for polygon in polygons:
+            # Move to start
+            self.job.travel(polygon[0])
+            # Burn lines and arcs
+            segments = fit_arcs(polygon, tolerance, max_radius)
+            for x, y, cx, cy, direction, _ in segments:
+                if direction == 0: self.job.burn((x, y))
+                else: self.job.burn_arc((x, y), (cx, cy), clockwise=direction < 0)
+            # Stats
+            num_lines += len(polygon) - 1
+            num_segments += len(segments)
+            lines_len.append(np.hypot(*np.diff(polygon, axis=0).T))
+            segments_len.append(segments[:, 5])
+        self.job.power_off()
+        self.perf.tick('burn')
+
+        # Estimate machine time, assuming that planner slows down to stop at every vertex
+        if num_lines > 0:
+            speed, accel = config.get_value('outline.speed'), config.get_value('machine.burn_accel')
+            lines_time = trapezoid_time(np.concatenate(lines_len) * pix2mm, speed, accel).sum()
+            segments_time = trapezoid_time(np.concatenate(segments_len) * pix2mm, speed, accel).sum()
+            self.info_arc_reduction = 1.0 - num_segments / num_lines
+            log.info(f'Arc fitting: {num_lines} -> {num_segments} segments ({round(self.info_arc_reduction*100, 1)}% less), '\
+                f'outline time: {round(lines_time, 1)} s -> {round(segments_time, 1)} s (x{round(lines_time / max(segments_time, 1e-9), 2)})')
 
     def _generate_infill(self, config):
         # No polygons?
@@ -78,64 +126,94 @@ class Gcode:
             log.error(f'No polygons')
             return
 
-        # Calculate bounding boxes
-        polygons = self._img.polygons
-        float_max = np.finfo(np.float64).max
-        template = np.array([float_max, -float_max, float_max, -float_max]) # min_x, max_x, min_y, max_y
-
-        global_bbox = template.copy()
-        polygon_bbox = np.zeros((len(polygons), 4), dtype=np.float64)
-        for i, polygon in enumerate(polygons):
-            # Calculate polygon bounding box
-            bbox = template.copy()
-            for p in polygon:
-                if p[0] < bbox[0]: bbox[0] = p[0]
-                if p[0] > bbox[1]: bbox[1] = p[0]
-                if p[1] < bbox[2]: bbox[2] = p[1]
-                if p[1] > bbox[3]: bbox[3] = p[1]
-            polygon_bbox[i] = bbox
-            # Update global bounding box
-            if bbox[0] < global_bbox[0]: global_bbox[0] = bbox[0]
-            if bbox[1] > global_bbox[1]: global_bbox[1] = bbox[1]
-            if bbox[2] < global_bbox[2]: global_bbox[2] = bbox[2]
-            if bbox[3] > global_bbox[3]: global_bbox[3] = bbox[3]
-        self.perf.tick('bbox')
-
-        # Find infill intersecting points
-        infill_lines = []
-        drawing_height = global_bbox[3] - global_bbox[2]
-        infill_spacing = config.get_value('infill.line_spacing')
-        infill_spacing *= self._img.info_mm2pix # Convert mm to pixels
-        sn = int(drawing_height / infill_spacing)
-        for s in range(sn):
-            # Current y coord
-            y = global_bbox[2] + (s/float(sn)) * drawing_height
-            
-            # Intersect with polygons
-            points = []
-            for i, polygon in enumerate(polygons):
-                # Check if point is in bounding box
-                if y < polygon_bbox[i][2] or y > polygon_bbox[i][3]: continue
-                # Get all x intersection points
-                x = intersect(polygon, y + 0.01)
-                points += x
-            if len(points) == 0: continue
-
-            # Add lines
-            points = sorted(points, reverse=s%2==0)
-            for i in range(0, len(points)-1, 2):
-                p1 = np.array([points[i], y])
-                p2 = np.array([points[i+1], y])
-                infill_lines += [p1, p2]
-
-            self.job.power_off()
-        self.perf.tick('infill')
+        mode = config.get_value('infill.mode')
+        if mode not in INFILL_MODES:
+            raise ValueError(f'Unknown infill mode {mode}, available: {", ".join(INFILL_MODES)}')
+        if mode == 'islands': self._generate_infill_islands(config)
+        else: self._generate_infill_greedy(config)
+
+        # Estimate how much time is spent on travel
+        start = (0.0, float(self._img.info_height_px)) # Machine origin is in bottom left corner
+        table = MotionTable.from_commands(self.job.infill.commands, 1 / self._img.info_mm2pix, self.job.travel_speed, self.job.travel_accel, start)
+        travel = table.dist[table.rapid].sum()
+        log.info(f'Infill ({mode}): travel {round(travel)} mm, time {round(table.duration, 1)} s per pass')
+
+    def _infill_angle(self, config) -> float:
+        '''
+        Returns angle (in radians) by which drawing is rotated, so infill lines become horizontal.
+        Angle in config is counter clockwise in machine coordinates, image y axis points down.
+        '''
+        return np.radians(config.get_value('infill.angle') % 180.0)
+
+    def _scanlines(self, config, angle:float) -> np.ndarray:
+        '''
+        Returns y coordinates of infill lines, spread evenly over height of the rotated drawing
+        '''
+        ys = [rotate(p, angle)[:, 1] for p in self._img.polygons]
+        y_min = min(y.min() for y in ys)
+        y_max = max(y.max() for y in ys)
+        spacing = config.get_value('infill.line_spacing') * self._img.info_mm2pix # Convert mm to pixels
+        sn = int((y_max - y_min) / spacing)
+        return y_min + np.arange(sn, dtype=np.float64) / max(sn, 1) * (y_max - y_min)
+
+    def _generate_infill_islands(self, config):
+        '''
+        Burns infill island by island. Each island (outer polygon without its holes) is finished
+        with serpentine lines before moving to the next one, islands are ordered by nearest neighbour.
+        Everything is done with lines horizontal, points are rotated back when burning.
+        '''
+        angle = self._infill_angle(config)
+        ys = self._scanlines(config, angle)
+
+        # Find segments and split them into cells that can be burned with single serpentine
+        cells = InfillCells(*scan_segments(self._img.polygons, ys, threads=config.get_value('machine.threads'), angle=angle))
+        self.perf.tick('scan')
+        if len(cells) == 0: return
+
+        # Order cells, island by island. Infill starts at the machine origin.
+        entries, exits = cells.variants(ys)
+        start = rotate(np.array([[0.0, float(self._img.info_height_px)]]), angle)[0]
+        order, variant = order_paths(entries, exits, start, groups=cells.islands)
+        self.perf.tick('order')
+
+        # Burn
+        min_travel = pow(self._img.info_mm2pix * config.get_value('machine.min_travel'), 2)
+        c, s = np.cos(angle), np.sin(angle)
+        prev = None
+        for idx, var in zip(order, variant):
+            for xa, xb, row in cells.segments(idx, var):
+                y = ys[row]
+                a, b = (xa*c + y*s, y*c - xa*s), (xb*c + y*s, y*c - xb*s) # Rotate back
+                # Short moves between lines are burned
+                if prev is None or (a[0]-prev[0])**2 + (a[1]-prev[1])**2 > min_travel: self.job.travel(a)
+                else: self.job.burn(a)
+                self.job.burn(b)
+                prev = b
+        self.job.power_off()
+        self.perf.tick('burn')
+        log.info(f'Infill: {cells.num_islands} islands, {len(cells)} cells')
+
+    def _generate_infill_greedy(self, config):
+        # Find infill lines, direction changes every scanline
+        angle = self._infill_angle(config)
+        ys = self._scanlines(config, angle)
+        x0, x1, rows, _ = scan_segments(self._img.polygons, ys, threads=config.get_value('machine.threads'), angle=angle)
+        reverse = rows % 2 == 0
+        order = np.lexsort((np.where(reverse, -x0, x0), rows))
+        starts = np.where(reverse, x1, x0)[order]
+        ends = np.where(reverse, x0, x1)[order]
+        infill_lines = np.empty((len(order) * 2, 2), dtype=np.float64)
+        infill_lines[0::2, 0], infill_lines[1::2, 0] = starts, ends
+        infill_lines[0::2, 1] = infill_lines[1::2, 1] = ys[rows[order]]
+        infill_lines = np.ascontiguousarray(rotate(infill_lines, -angle))
+        self.job.power_off()
+        self.perf.tick('scan')
 
         # Burn lines
         min_travel = pow(self._img.info_mm2pix * config.get_value('machine.min_travel'), 2)
         prev_a = np.zeros(1, dtype=np.float64)
         prev_b = np.zeros(1, dtype=np.float64)
-        infill_lines = np.array(infill_lines)
+        float_max = np.finfo(np.float64).max
         lines_left = len(infill_lines) // 2
         while lines_left > 0:
 
@@ -161,37 +239,169 @@ class Gcode:
             
         self.perf.tick('burn')
 
+    def _generate_raster(self, config):
+        '''
+        Engraves grayscale image with serpentine lines. Power follows luminance of the pixels,
+        neighbouring pixels with equal power are burned with a single move.
+        Blank rows are skipped and every line only covers its burned pixels, plus overscan on both sides.
+        Image is processed tile by tile, only runs of the lines are kept.
+        '''
+        spacing = config.get_value('raster.line_spacing') * self._img.info_mm2pix # Convert mm to pixels
+        overscan = config.get_value('raster.overscan') * self._img.info_mm2pix
+        lut = power_lut(config.get_value('raster.power_min'), config.get_value('raster.power_max'),
+            config.get_value('raster.gamma'), config.get_value('raster.levels'))
+        num_sampled, width = 0, 0
+        lines, runs = [], []
+        for y0, tile in self._img.tiles():
+            # Lines sampled in this tile
+            k = np.arange(np.ceil((y0 - spacing / 2) / spacing), np.ceil((y0 + len(tile) - spacing / 2) / spacing))
+            sampled = (spacing / 2 + k * spacing).astype(np.int64) - y0
+            num_sampled, width = num_sampled + len(sampled), tile.shape[1]
+            first, last = row_extents(tile, lut)
+            rows = sampled[first[sampled] >= 0]
+            row, x0, x1, power = power_runs(tile, rows, lut)
+            # Trim white margins, runs outside of the burned pixels
+            inside = (x1 > first[rows[row]]) & (x0 <= last[rows[row]])
+            runs.append((row[inside] + sum(len(l[0]) for l in lines), x0[inside], x1[inside], power[inside]))
+            lines.append((rows + y0, first[rows], last[rows]))
+        rows, first, last = (np.concatenate(arrays) for arrays in zip(*lines))
+        row, x0, x1, power = (np.concatenate(arrays) for arrays in zip(*runs))
+        # Every other row is burned right to left, pixel edges are half a pixel from centers
+        reverse = row % 2 == 1
+        order = np.lexsort((np.where(reverse, -x0, x0), row))
+        starts = (np.where(reverse, x1, x0)[order] - 0.5).tolist()
+        ends = (np.where(reverse, x0, x1)[order] - 0.5).tolist()
+        ys = rows[row[order]].tolist()
+        directions = np.where(reverse, -overscan, overscan)[order].tolist()
+        power = power[order].tolist()
+        self.perf.tick('scan')
+
+        # Overscan never goes past machine X 0, it is shortened there
+        x_min = -config.get_value('image.offset.x') * self._img.info_mm2pix
+        clamped = 0
+        def overscan_x(x, d):
+            nonlocal clamped
+            if x + d >= min(x, x_min): return x + d
+            clamped += 1
+            return min(x, x_min)
+
+        prev_y, prev_end, prev_dir = None, 0.0, 0.0
+        for start, end, y, direction, p in zip(starts, ends, ys, directions, power):
+            if y != prev_y:
+                # Leave previous line and get up to speed before the next one
+                if prev_y is not None and prev_dir != 0: self.job.engrave((overscan_x(prev_end, prev_dir), prev_y), 0.0)
+                self.job.travel((overscan_x(start, -direction), y))
+                if direction != 0: self.job.engrave((start, y), 0.0)
+            self.job.engrave((end, y), p)
+            prev_y, prev_end, prev_dir = y, end, direction
+        if prev_y is not None and prev_dir != 0: self.job.engrave((overscan_x(prev_end, prev_dir), prev_y), 0.0)
+        self.job.power_off()
+        if clamped > 0: log.warning(f'Raster overscan shortened on {clamped} lines to stay at X >= 0, increase image offset X to keep it')
+        self.perf.tick('burn')
+
+        # Compare with sweeping the whole width of every line, both with overscan
+        pix2mm = 1 / self._img.info_mm2pix
+        speed, accel = config.get_value('raster.speed'), config.get_value('machine.burn_accel')
+        full = trapezoid_time(np.full(num_sampled, (width + 2 * overscan) * pix2mm), speed, accel).sum()
+        trimmed = trapezoid_time((last - first + 1 + 2 * overscan) * pix2mm, speed, accel).sum()
+        self.info_raster_time = (full, trimmed)
+        log.info(f'Raster: {len(rows)} lines ({num_sampled - len(rows)} blank skipped), {len(power)} runs, '\
+            f'sweep time {round(full, 1)} s -> {round(trimmed, 1)} s ({round((1 - trimmed / max(full, 1e-9))*100, 1)}% less)')
+
     def generate(self, config):
         # Prepare job
         self.job = LaserJob(config)
+        if config.get_value('raster.passes') > 0 and not self.job.dialect.inline:
+            # Every run changes power, separate power commands would drain the planner before each of them
+            inline = [name for name, dialect in DIALECTS.items() if dialect.inline]
+            raise ValueError(f'Raster engraving needs inline power, dialect {self.job.dialect.name} stops at every power change. Use one of: {", ".join(inline)}')
         self.job.begin_header()
         self.job.move([0,0,0], unit=LaserUnit.Milimeters)
         self.perf = PerfTool()
 
+        # Raster
+        if config.get_value('raster.passes') > 0:
+            self.job.begin_raster()
+            with self.perf.span('raster'):
+                self._generate_raster(config)
+
         # Outline
         if config.get_value('outline.passes') > 0:
             self.job.begin_outline()
-            self._generate_outline(config)
+            with self.perf.span('outline'):
+                self._generate_outline(config)
 
         # Infill
         if config.get_value('infill.passes') > 0:
             self.job.begin_infill()
-            self._generate_infill(config)
+            with self.perf.span('infill'):
+                self._generate_infill(config)
+
+        # Merge collinear and sub-resolution moves
+        tolerance = config.get_value('machine.resolution') * self._img.info_mm2pix
+        if tolerance > 0:
+            self.job.outline.commands, removed_outline = merge_moves(self.job.outline.commands, tolerance)
+            self.job.infill.commands, removed_infill = merge_moves(self.job.infill.commands, tolerance)
+            log.info(f'Merged moves, removed per pass: outline {removed_outline}, infill {removed_infill}')
+            self.perf.tick('merge')
+
+        # Toolpath metrics
+        self.motion = MotionTable.from_job(self.job, 1 / self._img.info_mm2pix, (0.0, float(self._img.info_height_px)))
+        self.metrics = JobMetrics.from_table(self.motion)
+        self.perf.tick('metrics')
+        log.info(f'Toolpath: {self.metrics}')
 
         # Done
         self.job.end()
+        savings = ', '.join(f'{name}: {round(t, 1)} s' for name, t in self.job.sync_savings().items())
+        log.info(f'{self.job.info_syncs} power changes, time lost to planner syncs: {savings}')
         
-        self.info_calctime = self.perf.total()
+        self.info_compiletime = self.perf.compile_time()
+        self.info_calctime = round(self.perf.total() - self.info_compiletime, 2)
         log.info(f'Gcode for {self._img.image_path.name}, ' + str(self.perf))
+        log.debug('Gcode spans:\n' + self.perf.report())
+
+    def _apply(self):
+        height = self._img.info_height
+        pix2mm = 1 / self._img.info_mm2pix
+        self.job.apply(height, pix2mm)
+        log.info(f'Gcode applied, flipped y and converted pix2mm')
 
     def get_output(self):
         if self.job is not None:
             # Apply
-            height = self._img.info_height
-            pix2mm = 1 / self._img.info_mm2pix
-            self.job.apply(height, pix2mm)
-            log.info(f'Gcode applied, flipped y and converted pix2mm')
+            self._apply()
 
             # Generate output
-            return str(self.job)
-        return None
\ No newline at end of file
+            output = str(self.job)
+            self._log_output()
+            return output
+        return None
+
+    def _log_output(self):
+        encoder = self.job.encoder
+        if encoder is None: return
+        self.info_bytes_saved = encoder.bytes_plain - encoder.bytes_compact
+        log.info(f'Compact output: {encoder.bytes_compact} B instead of {encoder.bytes_plain} B, saved {round(encoder.savings*100, 1)}%')
+
+    def iter_lines(self):
+        '''
+        Yields output line by line, as it is being generated
+        '''
+        if self.job is None: return
+        self._apply()
+        yield from self.job.lines()
+        self._log_output()
+
+    def iter_output(self, block_lines=10_000):
+        '''
+        Yields output in blocks of lines, as it is being generated
+        '''
+        block = []
+        for line in self.iter_lines():
+            block.append(line)
+            if len(block) >= block_lines:
+                yield '\n'.join(block) + '\n'
+                block.clear()
+        if len(block) > 0:
+            yield '\n'.join(block) + '\n'
\ No newline at end of file
@@ -0,0 +1,251 @@
+import os
+import numpy as np
+import numba as nb
+from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .math import *
+
+INFILL_MODES = ['greedy', 'islands']
+BAND_MIN_LINES = 64 # Smaller bands are not worth a thread
+
+_segments_t = nb.types.Tuple((floatarray_t, floatarray_t, intarray_t, intarray_t))
+
+@nb.njit(floatarray_t(floatarray_t, int_t), nogil=True)
+def _grow(array, size):
+    result = np.empty(size, dtype=array.dtype)
+    result[:len(array)] = array
+    return result
+
+@nb.njit(intarray_t(intarray_t, int_t), nogil=True)
+def _grow_int(array, size):
+    result = np.empty(size, dtype=array.dtype)
+    result[:len(array)] = array
+    return result
+
+@nb.njit(_segments_t(floatarray2d_t, intarray_t, floatarray_t, float_t), nogil=True)
+def _scan_segments(edges, owner, ys, offset):
+    '''
+    Sweeps scanlines over edges sorted by lower y (x0, y0, x1, y1 with y0 < y1).
+    Crossings of every scanline are walked from left to right with a stack of polygons the line is inside of,
+    so each filled segment knows its island: the outer polygon it lies in (holes are odd levels of the stack).
+    Returns x start, x end, scanline index and island of every segment.
+    '''
+    n = len(edges)
+    active = np.empty(n, dtype=np.int64)
+    xs = np.empty(n, dtype=np.float64)
+    polys = np.empty(n, dtype=np.int64)
+    stack = np.empty(n, dtype=np.int64)
+    capacity = max(n, 16)
+    out_x0 = np.empty(capacity, dtype=np.float64)
+    out_x1 = np.empty(capacity, dtype=np.float64)
+    out_row = np.empty(capacity, dtype=np.int64)
+    out_island = np.empty(capacity, dtype=np.int64)
+    count = 0
+    num_active, next_edge = 0, 0
+
+    for s in range(len(ys)):
+        y = ys[s] + offset
+        # Add edges starting below the line
+        while next_edge < n and edges[next_edge, 1] <= y:
+            active[num_active] = next_edge
+            num_active += 1
+            next_edge += 1
+        # Drop edges ending below the line, intersect the rest
+        kept, m = 0, 0
+        for a in range(num_active):
+            e = active[a]
+            if edges[e, 3] <= y: continue
+            active[kept] = e
+            kept += 1
+            t = (y - edges[e, 1]) / (edges[e, 3] - edges[e, 1])
+            xs[m] = edges[e, 0] + t * (edges[e, 2] - edges[e, 0])
+            polys[m] = owner[e]
+            m += 1
+        num_active = kept
+        if m < 2: continue
+
+        # Walk crossings, line is inside material at odd depth
+        order = np.argsort(xs[:m])
+        depth = 0
+        for q in range(m - 1):
+            i = order[q]
+            if depth > 0 and stack[depth-1] == polys[i]: depth -= 1
+            else:
+                stack[depth] = polys[i]
+                depth += 1
+            if depth % 2 == 0: continue
+            x0, x1 = xs[i], xs[order[q+1]]
+            if x1 <= x0: continue
+            if count == capacity:
+                capacity *= 2
+                out_x0 = _grow(out_x0, capacity)
+                out_x1 = _grow(out_x1, capacity)
+                out_row = _grow_int(out_row, capacity)
+                out_island = _grow_int(out_island, capacity)
+            out_x0[count] = x0
+            out_x1[count] = x1
+            out_row[count] = s
+            out_island[count] = stack[depth-1]
+            count += 1
+    return out_x0[:count].copy(), out_x1[:count].copy(), out_row[:count].copy(), out_island[:count].copy()
+
+def rotate(points:np.ndarray, angle:float) -> np.ndarray:
+    '''Rotates points (n, 2) around origin by angle in radians'''
+    if angle == 0: return points
+    c, s = np.cos(angle), np.sin(angle)
+    return points @ np.array([[c, s], [-s, c]])
+
+def polygon_edges(polygons:List[np.ndarray], angle:float=0.0) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Returns non horizontal edges of all polygons rotated by angle (x0, y0, x1, y1 with y0 < y1) sorted by y0,
+    and polygon index of each edge
+    '''
+    if len(polygons) == 0: return np.zeros((0, 4)), np.zeros(0, dtype=np.int64)
+    vertices = rotate(np.concatenate(polygons), angle)
+    ends = np.cumsum([len(p) for p in polygons])
+    last = np.zeros(len(vertices), dtype=bool)
+    last[ends - 1] = True
+    a = vertices[~last] # Every vertex except the last one of each polygon starts an edge
+    b = vertices[np.roll(~last, 1)]
+    owner = np.repeat(np.arange(len(polygons), dtype=np.int64), [len(p) - 1 for p in polygons])
+    # Lower point first
+    swap = b[:, 1] < a[:, 1]
+    lo = np.where(swap[:, None], b, a)
+    hi = np.where(swap[:, None], a, b)
+    edges = np.concatenate([lo, hi], axis=1)
+    keep = edges[:, 1] != edges[:, 3]
+    edges, owner = edges[keep], owner[keep]
+    order = np.argsort(edges[:, 1], kind='stable')
+    return np.ascontiguousarray(edges[order], dtype=np.float64), np.ascontiguousarray(owner[order])
+
+def scan_band(edges:np.ndarray, owner:np.ndarray, ys:np.ndarray, offset:float=0.01) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Intersects edges (from polygon_edges) with a band of sorted scanlines, only edges crossing the band are swept.
+    Returns the same as scan_segments, scanline index is relative to the band.
+    '''
+    last = np.searchsorted(edges[:, 1], ys[-1] + offset, side='right')
+    mask = edges[:last, 3] > ys[0] + offset
+    return _scan_segments(np.ascontiguousarray(edges[:last][mask]), np.ascontiguousarray(owner[:last][mask]), ys, offset)
+
+def scan_segments(polygons:List[np.ndarray], ys:np.ndarray, offset:float=0.01, threads:int=0, angle:float=0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Intersects polygons with horizontal lines at ys (moved by offset, so lines do not hit vertices).
+    Returns x start, x end, scanline index and island (index of outer polygon) of every filled segment.
+    Height is split into bands that are swept in parallel, threads set to 0 uses all cores, 1 sweeps on the calling thread.
+    With angle set, polygons are rotated by it first and segments are in the rotated frame.
+    '''
+    edges, owner = polygon_edges(polygons, angle)
+    ys = np.ascontiguousarray(ys, dtype=np.float64)
+    threads = (os.cpu_count() or 1) if threads <= 0 else threads
+    if threads == 1 or len(ys) < BAND_MIN_LINES * 2:
+        return _scan_segments(edges, owner, ys, offset)
+
+    # More bands than threads, so uneven bands are balanced
+    num_bands = min(threads * 4, len(ys) // BAND_MIN_LINES)
+    bands = [(band[0], band[-1] + 1) for band in np.array_split(np.arange(len(ys)), num_bands)]
+    def sweep(band):
+        start, end = band
+        x0, x1, rows, islands = scan_band(edges, owner, ys[start:end], offset)
+        return x0, x1, rows + start, islands
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(sweep, bands))
+    return tuple(np.concatenate(arrays) for arrays in zip(*results))
+
+@nb.njit(intarray_t(floatarray_t, floatarray_t, intarray_t, intarray_t))
+def _split_cells(x0, x1, rows, islands):
+    '''
+    Splits islands into cells that can be burned with single serpentine: segment continues cell
+    of the segment above if they overlap only with each other. Segments must be sorted by island, row and x.
+    Returns cell index of every segment, cells are numbered in order of segments.
+    '''
+    n = len(x0)
+    down_count = np.zeros(n, dtype=np.int64)
+    up_count = np.zeros(n, dtype=np.int64)
+    up = np.full(n, -1, dtype=np.int64)
+
+    # Find overlaps between neighbouring rows of the same island
+    a = 0
+    while a < n:
+        a_end = a
+        while a_end < n and rows[a_end] == rows[a] and islands[a_end] == islands[a]: a_end += 1
+        b, b_end = a_end, a_end
+        while b_end < n and rows[b_end] == rows[b] and islands[b_end] == islands[b]: b_end += 1
+        if b < n and islands[b] == islands[a] and rows[b] == rows[a] + 1:
+            i, j = a, b
+            while i < a_end and j < b_end:
+                if x0[i] < x1[j] and x0[j] < x1[i]:
+                    down_count[i] += 1
+                    up[j] = i
+                    up_count[j] += 1
+                if x1[i] < x1[j]: i += 1
+                else: j += 1
+        a = a_end
+
+    # Assign cells, rows are processed from top to bottom so cell above is already known
+    cells = np.empty(n, dtype=np.int64)
+    count = 0
+    for s in range(n):
+        u = up[s]
+        if up_count[s] == 1 and down_count[u] == 1:
+            cells[s] = cells[u]
+        else:
+            cells[s] = count
+            count += 1
+    return cells
+
+class InfillCells:
+    '''
+    Infill segments split into cells. Every cell is a stack of single segments in consecutive rows,
+    burned with serpentine ordering. Cells belong to islands (outer polygon without its holes).
+    '''
+
+    def __init__(self, x0:np.ndarray, x1:np.ndarray, rows:np.ndarray, islands:np.ndarray):
+        order = np.lexsort((x0, rows, islands))
+        x0, x1, rows, islands = x0[order], x1[order], rows[order], islands[order]
+        cells = _split_cells(x0, x1, rows, islands)
+        # Segments of each cell next to each other, in row order
+        order = np.argsort(cells, kind='stable')
+        self.x0, self.x1, self.rows, cells = x0[order], x1[order], rows[order], cells[order]
+        self.starts = np.flatnonzero(np.diff(cells, prepend=-1))
+        self.ends = np.append(self.starts[1:], len(cells))
+        # Dense island index of every cell, cells are sorted by island
+        self.islands = np.unique(islands[order][self.starts], return_inverse=True)[1]
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def num_islands(self) -> int:
+        return int(self.islands.max()) + 1 if len(self.islands) else 0
+
+    def variants(self, ys:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Returns entry and exit points of the four ways every cell can be burned:
+        from the first or last row, starting left to right or right to left. Arrays have shape (cells, 4, 2).
+        '''
+        first, last = self.starts, self.ends - 1
+        flip = (self.ends - self.starts) % 2 == 0 # Direction of the last row is different than the first one
+        entries = np.zeros((len(self), 4, 2))
+        exits = np.zeros((len(self), 4, 2))
+        for variant in range(4):
+            reverse, ltr = variant >= 2, variant % 2 == 0
+            a, b = (last, first) if reverse else (first, last)
+            end_ltr = ltr != flip
+            entries[:, variant, 0] = self.x0[a] if ltr else self.x1[a]
+            entries[:, variant, 1] = ys[self.rows[a]]
+            exits[:, variant, 0] = np.where(end_ltr, self.x1[b], self.x0[b])
+            exits[:, variant, 1] = ys[self.rows[b]]
+        return entries, exits
+
+    def segments(self, cell:int, variant:int):
+        '''
+        Yields start x, end x and row index of segments of cell in order of given variant
+        '''
+        reverse, ltr = variant >= 2, variant % 2 == 0
+        start, end = self.starts[cell], self.ends[cell]
+        indices = range(end - 1, start - 1, -1) if reverse else range(start, end)
+        for i in indices:
+            if ltr: yield self.x0[i], self.x1[i], self.rows[i]
+            else: yield self.x1[i], self.x0[i], self.rows[i]
+            ltr = not ltr
@@ -1,49 +1,33 @@
+import copy
 from enum import IntEnum
+from typing import Iterable, List
+
+from .dialect import DIALECTS, get_dialect
+from .commands import LaserUnit, LaserCmd, LaserMove, LaserArc, LaserSpeed, LaserAccel, LaserRaw, LaserPower
+from .compact import CompactEncoder, OUTPUT_MODES
 
 class LaserJobTarget(IntEnum):
     Header = 0
     Outline = 1
     Infill = 2
     Footer = 3
-
-class LaserUnit(IntEnum):
-    Pixels = 0
-    Milimeters = 1
-
-class LaserCmd:
-    def valid(self):
-        return True
-
-class LaserMove(LaserCmd):
-    def __init__(self, x, y, z, unit:LaserUnit, rapid:bool):
-        self.x = x
-        self.y = y
-        self.z = z
-        self.rapid = rapid
-        self.unit = unit
-        self.applied = False
-    def valid(self):
-        return (self.x is not None) or (self.y is not None) or (self.z is not None)
-    def __str__(self):
-        if not self.valid(): return ''
-        args = []
-        if self.x is not None: args.append(f"X{round(self.x,3)}")
-        if self.y is not None: args.append(f"Y{round(self.y,3)}")
-        if self.z is not None: args.append(f"Z{round(self.z,3)}")
-        args.insert(0, 'G0' if self.rapid else 'G1')
-        return ' '.join(args)
-
-class LaserAccel(LaserCmd):
-    def __init__(self, accel):
-        self.accel = accel
-    def __str__(self):
-        return f'M204 P{self.accel} T{self.accel}'
-
-class LaserRaw(LaserCmd):
-    def __init__(self, code):
-        self.code = code
-    def __str__(self):
-        return self.code
+    Raster = 4
+
+class LaserBlock:
+    '''
+    Commands of a single pass. Passes are repeated lazily when written, commands are never copied.
+    Every next pass can change burn power by power_step (in %) and lower the head by z_step (in mm).
+    '''
+    def __init__(self, power:float=0.0, passes:int=1, power_step:float=0.0, z_step:float=0.0):
+        self.commands:List[LaserCmd] = []
+        self.power = power # Burn power of the first pass
+        self.passes = passes
+        self.power_step = power_step
+        self.z_step = z_step
+
+    def pass_power(self, n:int) -> float:
+        '''Returns burn power of n-th pass'''
+        return min(max(self.power + n * self.power_step, 0.0), 100.0)
 
 class LaserJob:
     def __init__(self, config):
@@ -54,6 +38,9 @@ class LaserJob:
         self.travel_speed = config.get_value('machine.travel_speed')
         self.travel_accel = config.get_value('machine.travel_accel')
         self.burn_accel = config.get_value('machine.burn_accel')
+        self.dialect = get_dialect(config.get_value('machine.dialect'))
+        self.output = config.get_value('machine.output')
+        self.resolution = config.get_value('machine.resolution')
 
         self.offset = [config.get_value('image.offset.x'), config.get_value('image.offset.y'), config.get_value('image.offset.z')]
 
@@ -63,19 +50,29 @@ class LaserJob:
         self.infill_power = config.get_value('infill.power')
         self.infill_speed = config.get_value('infill.speed')
         self.infill_passes = config.get_value('infill.passes')
+        self.raster_power = config.get_value('raster.power_max')
+        self.raster_speed = config.get_value('raster.speed')
+        self.raster_passes = config.get_value('raster.passes')
 
         # Commands
         self.cmd_target = None
-        self.cmd_header = []
-        self.cmd_outline = []
-        self.cmd_infill = []
-        self.cmd_footer = []
+        self.header = LaserBlock()
+        self.outline = LaserBlock(self.outline_power, self.outline_passes, config.get_value('outline.power_step'), config.get_value('outline.z_step'))
+        self.infill = LaserBlock(self.infill_power, self.infill_passes, config.get_value('infill.power_step'), config.get_value('infill.z_step'))
+        self.raster = LaserBlock(self.raster_power, self.raster_passes)
+        self.footer = LaserBlock()
 
         # Current state
         self._power = 0
         self._speed = 0
         self._accel = 0
         self._pos = [-1, -1, -1]
+        self._inline_power = None # Last S value sent with a move
+
+        # Stats
+        self.info_syncs = 0 # Power changes that drain the planner
+        self.info_sync_time = 0.0 # Estimated time lost by stopping at every sync, in seconds
+        self.encoder = None # CompactEncoder used by last lines() call
 
     def _apply(self, commands, height_mm, pix2mm):
         for cmd in commands:
@@ -92,6 +89,11 @@ class LaserJob:
                 cmd.unit = LaserUnit.Milimeters
                 # Flip y
                 if cmd.y is not None: cmd.y = height_mm - cmd.y
+                # Arc center is relative, flipping changes direction
+                if isinstance(cmd, LaserArc):
+                    cmd.i *= pix2mm
+                    cmd.j *= -pix2mm
+                    cmd.clockwise = not cmd.clockwise
             # Add offset
             if cmd.x is not None: cmd.x += self.offset[0]
             if cmd.y is not None: cmd.y += self.offset[1]
@@ -102,15 +104,67 @@ class LaserJob:
         Goes over all commands, flips Y coordinate and converts pixels to mm
         This is done here, at the end, because all other libs have 0,0 in top left corner.
         '''
-        self._apply(self.cmd_header, height, pix2mm)
-        self._apply(self.cmd_outline, height, pix2mm)
-        self._apply(self.cmd_infill, height, pix2mm)
-        self._apply(self.cmd_footer, height, pix2mm)
+        for block in self.blocks:
+            self._apply(block.commands, height, pix2mm)
 
     def __str__(self):
-        all_commands = self.cmd_header + (self.cmd_infill * self.infill_passes) + (self.cmd_outline * self.outline_passes) + self.cmd_footer
-        all_commands = [str(cmd) for cmd in all_commands if cmd.valid()]
-        return "\n".join(all_commands)
+        return "\n".join(self.lines())
+
+    @property
+    def blocks(self) -> List[LaserBlock]:
+        '''Blocks in order they are written to the output'''
+        return [self.header, self.raster, self.infill, self.outline, self.footer]
+
+    def passes(self, block:LaserBlock) -> Iterable[Iterable[LaserCmd]]:
+        '''
+        Yields commands of every pass of the block. Commands are shared between passes,
+        only the ones changed by per pass overrides are copied.
+        '''
+        for n in range(block.passes):
+            yield self._pass(block, n)
+
+    def _pass(self, block:LaserBlock, n:int) -> Iterable[LaserCmd]:
+        if block.z_step != 0:
+            yield self._z_move(self.offset[2] - n * block.z_step)
+        if n == 0 or block.power_step == 0:
+            yield from block.commands
+        else:
+            power = block.pass_power(n)
+            value = self.dialect.value(power)
+            burn_value = self.dialect.value(block.power)
+            for cmd in block.commands:
+                if isinstance(cmd, LaserPower) and cmd.power == block.power:
+                    cmd = LaserPower(cmd.command, power, value)
+                elif isinstance(cmd, LaserMove) and not cmd.rapid and cmd.power == burn_value:
+                    cmd = copy.copy(cmd)
+                    cmd.power = value
+                yield cmd
+        # Head goes back up after the last pass
+        if block.z_step != 0 and n == block.passes - 1:
+            yield self._z_move(self.offset[2])
+
+    def _z_move(self, z:float) -> LaserMove:
+        move = LaserMove(None, None, z, unit=LaserUnit.Milimeters, rapid=True)
+        move.applied = True
+        return move
+
+    def lines(self):
+        '''
+        Yields output lines one by one, so the whole output does not have to be held in memory
+        '''
+        if self.output != 'plain':
+            # Compact output, infill and raster are the only blocks that may be relative
+            if self.output not in OUTPUT_MODES:
+                raise ValueError(f'Unknown output mode {self.output}, available: {", ".join(OUTPUT_MODES)}')
+            self.encoder = CompactEncoder(self.resolution, relative=self.output == 'relative')
+            for block in self.blocks:
+                for commands in self.passes(block):
+                    yield from self.encoder.encode(commands, relative=block is self.infill or block is self.raster)
+            return
+        for block in self.blocks:
+            for commands in self.passes(block):
+                for cmd in commands:
+                    if cmd.valid(): yield str(cmd)
 
     def begin_header(self):
         self.cmd_target = LaserJobTarget.Header
@@ -119,25 +173,35 @@ class LaserJob:
         self.comment(' https://github.com/pbaja/Flatslicer')
         self.comment('')
         self.comment('Header')
-        self.power(self.min_power)
+        self.power(self.travel_power)
         self.speed(self.travel_speed)
         self.gcode("G21") # Use metric system
         self.gcode("G90") # Use absolute positioning (G21->relative)
-        self.gcode("M18 S10") # Disable steppers after 10s of inactivity
-        max_accel = max(self.burn_accel, self.travel_accel)
-        self.gcode(f'M201 X{max_accel} Y{max_accel}') # Set max acceleration. Default is 5000mm/s^2, Prusa uses 9000mm/s^2 for travel
+        if self.dialect.marlin:
+            self.gcode("M18 S10") # Disable steppers after 10s of inactivity
+            max_accel = max(self.burn_accel, self.travel_accel)
+            self.gcode(f'M201 X{max_accel} Y{max_accel}') # Set max acceleration. Default is 5000mm/s^2, Prusa uses 9000mm/s^2 for travel
+        for line in self.dialect.header(): self.gcode(line)
         self.comment('LAYER:0') # Compatibility with some octoprint plugins
 
     def begin_outline(self):
         self.cmd_target = LaserJobTarget.Outline
+        self._inline_power = None # Passes are repeated, first move has to set power
         self.comment('')
         self.comment('Outline pass')
 
     def begin_infill(self):
         self.cmd_target = LaserJobTarget.Infill
+        self._inline_power = None # Passes are repeated, first move has to set power
         self.comment('')
         self.comment('Infill pass')
 
+    def begin_raster(self):
+        self.cmd_target = LaserJobTarget.Raster
+        self._inline_power = None # Passes are repeated, first move has to set power
+        self.comment('')
+        self.comment('Raster pass')
+
     def end(self):
         self.cmd_target = LaserJobTarget.Footer
         self.comment('')
@@ -145,6 +209,18 @@ class LaserJob:
         self.power_off()
         self.speed(self.travel_speed)
         self.move([0, 0, 0], True)
+        for line in self.dialect.footer(): self.gcode(line)
+
+    @property
+    def travel_power(self) -> float:
+        '''Power used when travelling. Laser is off with inline power, G0 moves should not burn.'''
+        return 0.0 if self.dialect.inline else self.min_power
+
+    def sync_savings(self):
+        '''
+        Returns estimated machine time (in seconds) lost to planner syncs, for each dialect
+        '''
+        return {name: self.info_sync_time if dialect.sync else 0.0 for name, dialect in DIALECTS.items()}
 
     # Operations
 
@@ -153,7 +229,7 @@ class LaserJob:
         Turns off laser, changes speed to travelling speed, moves to target
         '''
         self.accel(self.travel_accel)
-        self.power(self.min_power)
+        self.power(self.travel_power)
         self.speed(self.travel_speed)
         self.move(target, rapid=True)
 
@@ -161,6 +237,26 @@ class LaserJob:
         '''
         Changes speed to burn speed, turns on laser, moves to target
         '''
+        self._burn_state()
+        self.move(target)
+
+    def burn_arc(self, target, center, clockwise:bool):
+        '''
+        Changes speed to burn speed, turns on laser, moves to target along arc around center
+        '''
+        self._burn_state()
+        self.arc(target, center, clockwise)
+
+    def engrave(self, target, power:float):
+        '''
+        Changes speed to raster speed, sets given power and moves to target. Zero power moves keep the laser off.
+        '''
+        self.accel(self.burn_accel)
+        self.speed(self.raster_speed)
+        self.power(power)
+        self.move(target)
+
+    def _burn_state(self):
         speed = None
         if self.cmd_target == LaserJobTarget.Outline:  speed = self.outline_speed
         elif self.cmd_target == LaserJobTarget.Infill: speed = self.infill_speed
@@ -174,19 +270,20 @@ class LaserJob:
         self.accel(self.burn_accel)
         self.speed(speed)
         self.power(power)
-        self.move(target)
 
     # Low level functions
 
     def _append(self, line):
         if self.cmd_target == LaserJobTarget.Header:
-            self.cmd_header.append(line)
+            self.header.commands.append(line)
         elif self.cmd_target == LaserJobTarget.Outline:
-            self.cmd_outline.append(line)
+            self.outline.commands.append(line)
         elif self.cmd_target == LaserJobTarget.Infill:
-            self.cmd_infill.append(line)  
+            self.infill.commands.append(line)
+        elif self.cmd_target == LaserJobTarget.Raster:
+            self.raster.commands.append(line)
         elif self.cmd_target == LaserJobTarget.Footer:
-            self.cmd_footer.append(line)
+            self.footer.commands.append(line)
 
     def comment(self, comment):
         '''Adds comment'''
@@ -212,32 +309,54 @@ class LaserJob:
             self._pos[2] = pos[2]
 
         m = LaserMove(x, y, z, unit=unit, rapid=rapid)
-        if m is not None: self._append(m)
+        if m.valid(): self._set_inline_power(m)
+        self._append(m)
+
+    def arc(self, pos, center, clockwise:bool, unit=LaserUnit.Pixels):
+        '''Moves head along arc around center to given x,y coordinates'''
+        i, j = center[0] - self._pos[0], center[1] - self._pos[1]
+        m = LaserArc(pos[0], pos[1], i, j, clockwise, unit=unit)
+        self._set_inline_power(m)
+        self._append(m)
+        self._pos[0] = pos[0]
+        self._pos[1] = pos[1]
+
+    def _set_inline_power(self, m:LaserMove):
+        # Add S word to the move if power changed since last one
+        if not self.dialect.inline: return
+        value = self.dialect.value(self._power)
+        if value != self._inline_power:
+            m.power = value
+            self._inline_power = value
 
     def speed(self, speed:float):
         '''Changes movement speed. In mm/s'''
         if abs(self._speed-speed) > 0.001:
-            speed_mm_min = round(float(speed) * 60, 3)  # Convert mm/s to mm/min
-            self._append(LaserRaw(f"G1 F{speed_mm_min}"))
+            self._append(LaserSpeed(speed))
             self._speed = speed
 
     def power(self, power:float, sync=True):
         '''Sets laser power, range from 0.0 to 100.0'''
         if abs(self._power-power) > 0.001:
-            power_256 = int(float(power)/100.0*255)
-            if sync: self._append(LaserRaw("M400"))
-            self._append(LaserRaw(self.on_command.replace("{power}", str(power_256))))
+            # Planner has to stop before power changes, count time lost by that
+            if self._accel > 0:
+                self.info_syncs += 1
+                self.info_sync_time += self._speed / self._accel
+            # Inline power rides along with the next move
+            if not self.dialect.inline:
+                if sync and self.dialect.sync: self._append(LaserRaw("M400"))
+                self._append(LaserPower(self.on_command, power, self.dialect.value(power)))
             self._power = power
 
     def accel(self, accel:float):
         if abs(self._accel-accel) > 0.001:
-            self._append(LaserAccel(accel))
+            if self.dialect.marlin: self._append(LaserAccel(accel))
             self._accel = accel
 
     def power_off(self):
         '''Powers off the laser'''
         if self._power != 0:
-            self._append(LaserRaw(self.off_command))
+            if not self.dialect.inline: self._append(LaserRaw(self.off_command))
             self._power = 0
 
     def wait(self, ms):
@@ -7,6 +7,7 @@ byte_t = nb.uint8
 list_t = nb.types.List
 
 # Arrays
+intarray_t = nb.types.Array(int_t, 1, 'C')
 floatarray_t = nb.types.Array(float_t, 1, 'C')
 floatarray2d_t = nb.types.Array(float_t, 2, 'C')
 bytearray2d_t = nb.types.Array(byte_t, 2, 'C')
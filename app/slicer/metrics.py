@@ -0,0 +1,50 @@
+import numpy as np
+
+from .job import LaserJob
+from .motion import MotionTable
+
+def format_duration(seconds:float) -> str:
+    '''Formats time as h:mm:ss'''
+    seconds = int(round(seconds))
+    return f'{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
+
+class JobMetrics:
+    '''
+    Toolpath quality metrics of the whole job (every pass of raster, outline and infill).
+    Computed from motion table of a single pass, weighted by number of passes.
+    '''
+
+    def __init__(self):
+        self.burn_length = 0.0 # mm
+        self.travel_length = 0.0 # mm
+        self.toggles = 0 # Laser switched on or off
+        self.burn_time = 0.0 # s
+        self.travel_time = 0.0 # s
+
+    @property
+    def machine_time(self) -> float:
+        '''Estimated machine time in seconds, head stops at the end of every move'''
+        return self.burn_time + self.travel_time
+
+    def __str__(self):
+        return f'burn {round(self.burn_length)} mm, travel {round(self.travel_length)} mm, '\
+            f'{self.toggles} laser toggles, machine time {format_duration(self.machine_time)}'
+
+    @staticmethod
+    def from_table(table:MotionTable) -> 'JobMetrics':
+        metrics = JobMetrics()
+        if len(table) == 0: return metrics
+        weights = table.weights()
+        burn = ~table.rapid
+        metrics.burn_length = float((table.dist * weights)[burn].sum())
+        metrics.travel_length = float((table.dist * weights)[~burn].sum())
+        metrics.burn_time = float((table.time * weights)[burn].sum())
+        metrics.travel_time = float((table.time * weights)[~burn].sum())
+        # Laser turns on at the start of every run of burn moves and off at its end, every pass starts with laser off
+        previous = np.concatenate([[False], burn[:-1]]) & ~table.block_starts()
+        metrics.toggles = int(2 * ((burn & ~previous) * weights).sum())
+        return metrics
+
+    @staticmethod
+    def from_job(job:LaserJob, pix2mm:float, start=(0.0, 0.0)) -> 'JobMetrics':
+        return JobMetrics.from_table(MotionTable.from_job(job, pix2mm, start))
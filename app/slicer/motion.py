@@ -0,0 +1,155 @@
+import numpy as np
+from typing import Iterable
+
+from .job import LaserJob, LaserCmd, LaserMove, LaserArc, LaserSpeed, LaserAccel, LaserUnit
+
+def trapezoid_time(dist, speed, accel):
+    '''
+    Returns time (in seconds) needed to travel given distance (in mm), starting and ending at rest.
+    Uses trapezoidal velocity profile. Works on scalars and numpy arrays.
+    '''
+    dist = np.asarray(dist, dtype=np.float64)
+    speed = np.maximum(np.asarray(speed, dtype=np.float64), 1e-6)
+    accel = np.maximum(np.asarray(accel, dtype=np.float64), 1e-6)
+    # Distance needed to accelerate to full speed and decelerate back to zero
+    ramp = speed * speed / accel
+    cruise = dist / speed + speed / accel
+    triangle = 2.0 * np.sqrt(dist / accel)
+    return np.where(dist >= ramp, cruise, triangle)
+
+def _count_moves(commands:Iterable[LaserCmd]) -> int:
+    '''Returns number of moves that change head position'''
+    return sum(1 for cmd in commands if isinstance(cmd, LaserMove) and (cmd.x is not None or cmd.y is not None))
+
+class MotionTable:
+    '''
+    Flattened representation of moves from list of LaserJob commands.
+    Every move is stored as a row in numpy arrays, which allows fast vectorized queries.
+    '''
+
+    def __init__(self):
+        self.points:np.ndarray = np.zeros((1, 2)) # Head positions, first one is the starting point
+        self.rapid:np.ndarray = np.zeros(0, dtype=bool) # True for travel moves
+        self.speed:np.ndarray = np.zeros(0) # mm/s
+        self.accel:np.ndarray = np.zeros(0) # mm/s^2
+        self.dist:np.ndarray = np.zeros(0) # mm
+        self.time:np.ndarray = np.zeros(0) # s
+        self.cumtime:np.ndarray = np.zeros(1) # s, time at the end of each move (first is 0)
+        self.repeats = [] # (first move, end move, passes) of blocks repeated in time, moves are stored once
+
+    def __len__(self):
+        return len(self.rapid)
+
+    @property
+    def duration(self) -> float:
+        if len(self.repeats) == 0: return float(self.cumtime[-1])
+        return float(sum((self.cumtime[end] - self.cumtime[start]) * passes for start, end, passes in self.repeats))
+
+    def _local(self, t:float) -> float:
+        '''
+        Converts time of the whole job to time within stored moves, passes after the first one replay the same moves
+        '''
+        for start, end, passes in self.repeats:
+            span = self.cumtime[end] - self.cumtime[start]
+            if t < span * passes: return self.cumtime[start] + (t % span if span > 0 else 0.0)
+            t -= span * passes
+        return t if len(self.repeats) == 0 else self.cumtime[-1] + t
+
+    @staticmethod
+    def from_commands(commands:Iterable[LaserCmd], pix2mm:float, speed:float=0.0, accel:float=0.0, start=(0.0, 0.0)) -> 'MotionTable':
+        '''
+        Walks over commands once and collects moves with speed and acceleration that was active at the time.
+        Coordinates are kept in units of commands (pixels), distance is converted to mm.
+        Start is head position before the first command, move from it is counted as well.
+        '''
+        x, y = float(start[0]), float(start[1])
+        xs, ys, rapid, speeds, accels, scales, arcs = [x], [y], [], [], [], [], []
+        for cmd in commands:
+            if isinstance(cmd, LaserMove):
+                if cmd.x is None and cmd.y is None: continue
+                arcs.append(cmd.length(x, y) if isinstance(cmd, LaserArc) else np.nan)
+                x = cmd.x if cmd.x is not None else x
+                y = cmd.y if cmd.y is not None else y
+                xs.append(x)
+                ys.append(y)
+                rapid.append(cmd.rapid)
+                speeds.append(speed)
+                accels.append(accel)
+                scales.append(pix2mm if cmd.unit == LaserUnit.Pixels else 1.0)
+            elif isinstance(cmd, LaserSpeed):
+                speed = cmd.speed
+            elif isinstance(cmd, LaserAccel):
+                accel = cmd.accel
+
+        table = MotionTable()
+        points = np.stack([np.array(xs, dtype=np.float64), np.array(ys, dtype=np.float64)], axis=1)
+        table.points = points
+        if len(rapid) == 0: return table
+
+        table.rapid = np.array(rapid, dtype=bool)
+        table.speed = np.array(speeds, dtype=np.float64)
+        table.accel = np.array(accels, dtype=np.float64)
+        delta = np.diff(points, axis=0)
+        arcs = np.array(arcs, dtype=np.float64)
+        table.dist = np.where(np.isnan(arcs), np.hypot(delta[:, 0], delta[:, 1]), arcs) * np.array(scales)
+        table.time = trapezoid_time(table.dist, table.speed, table.accel)
+        table.cumtime = np.concatenate([[0.0], np.cumsum(table.time)])
+        return table
+
+    @staticmethod
+    def from_job(job:LaserJob, pix2mm:float, start=(0.0, 0.0)) -> 'MotionTable':
+        '''
+        Creates table for burning part of the job, in the same order as it is written to the output.
+        Start is where the header leaves the head (machine origin, in pixels).
+        Moves of every block are stored once, passes only repeat them in time
+        (travel between passes is approximated by travel into the block).
+        '''
+        blocks = [block for block in (job.raster, job.infill, job.outline) if block.passes > 0]
+        table = MotionTable.from_commands((cmd for block in blocks for cmd in block.commands), pix2mm, job.travel_speed, job.travel_accel, start)
+        if len(table) == 0: return table
+        # Acceleration commands are not written for every dialect, machine still uses configured values
+        table.accel = np.where(table.rapid, float(job.travel_accel), float(job.burn_accel))
+        table.time = trapezoid_time(table.dist, table.speed, table.accel)
+        table.cumtime = np.concatenate([[0.0], np.cumsum(table.time)])
+        # Travel from the start belongs to the first block
+        first = 0
+        for block in blocks:
+            end = min(first + _count_moves(block.commands), len(table))
+            table.repeats.append((first, end, block.passes))
+            first = end
+        return table
+
+    def weights(self) -> np.ndarray:
+        '''
+        Returns number of times every move is executed
+        '''
+        weights = np.ones(len(self), dtype=np.int64)
+        for start, end, passes in self.repeats: weights[start:end] = passes
+        return weights
+
+    def block_starts(self) -> np.ndarray:
+        '''
+        Returns mask of moves that start a repeated block
+        '''
+        starts = np.zeros(len(self), dtype=bool)
+        starts[:1] = True
+        for start, end, _ in self.repeats:
+            if start < end: starts[start] = True
+        return starts
+
+    def index(self, t:float) -> int:
+        '''
+        Returns number of moves completed at given time (in seconds)
+        '''
+        return int(np.searchsorted(self.cumtime, self._local(t), side='right')) - 1
+
+    def position(self, t:float) -> np.ndarray:
+        '''
+        Returns head position at given time. Interpolates linearly within the current move.
+        '''
+        t = self._local(t)
+        idx = min(max(int(np.searchsorted(self.cumtime, t, side='right')) - 1, 0), len(self))
+        if idx >= len(self): return self.points[-1]
+        frac = (t - self.cumtime[idx]) / max(self.time[idx], 1e-9)
+        frac = min(max(frac, 0.0), 1.0)
+        return self.points[idx] + (self.points[idx+1] - self.points[idx]) * frac
@@ -0,0 +1,104 @@
+import numpy as np
+from typing import List, Tuple
+
+from .job import LaserCmd, LaserMove, LaserArc
+
+def _collect(commands:List[LaserCmd]):
+    '''
+    Collects all moves that change x or y into arrays
+    '''
+    index, xs, ys, burn, free, contig = [], [], [], [], [], []
+    x, y, last = 0.0, 0.0, -2
+    for i, cmd in enumerate(commands):
+        if not isinstance(cmd, LaserMove): continue
+        if cmd.x is None and cmd.y is None: continue
+        x = cmd.x if cmd.x is not None else x
+        y = cmd.y if cmd.y is not None else y
+        index.append(i)
+        xs.append(x)
+        ys.append(y)
+        burn.append(not cmd.rapid)
+        free.append(cmd.z is None and cmd.power is None and not isinstance(cmd, LaserArc)) # Can be removed or extended
+        contig.append(i == last + 1) # No other commands between this and previous move
+        last = i
+    points = np.stack([np.array(xs, dtype=np.float64), np.array(ys, dtype=np.float64)], axis=1) if index else np.zeros((0, 2))
+    return np.array(index, dtype=np.int64), points, np.array(burn, dtype=bool), np.array(free, dtype=bool), np.array(contig, dtype=bool)
+
+def _span_deviation(original, first, last):
+    '''
+    Returns largest distance of original points first[k]..last[k] from segment between the two end points, for every k
+    '''
+    lengths = last - first + 1
+    rows = np.repeat(np.arange(len(first)), lengths)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    p = original[first[rows] + offsets]
+    a, c = original[first][rows], original[last][rows]
+    ac, ap = c - a, p - a
+    t = np.clip((ap[:, 0]*ac[:, 0] + ap[:, 1]*ac[:, 1]) / np.maximum(ac[:, 0]**2 + ac[:, 1]**2, 1e-18), 0.0, 1.0)
+    distance = np.hypot(ap[:, 0] - t*ac[:, 0], ap[:, 1] - t*ac[:, 1])
+    return np.maximum.reduceat(distance, np.cumsum(lengths) - lengths)
+
+def _merge_pass(points, origin, original, burn, free, contig, tolerance):
+    '''
+    Returns mask of moves to remove. Never removes two neighbouring moves. New chord has to stay within tolerance
+    of every original vertex it replaces (origin is index of every point in original), so error does not add up over passes.
+    '''
+    n = len(points)
+    remove = np.zeros(n, dtype=bool)
+    if n < 3: return remove
+
+    # Vertex b (end of move k) is removed by extending move k+1 to start at a
+    a, b, c = points[:-2], points[1:-1], points[2:]
+    ab, bc = b - a, c - b
+    same_state = burn[1:-1] & burn[2:] & free[1:-1] & free[2:] & contig[2:]
+    forward = (ab[:, 0]*bc[:, 0] + ab[:, 1]*bc[:, 1]) > 0
+    short = np.hypot(ab[:, 0], ab[:, 1]) < tolerance
+    candidate = np.zeros(n, dtype=bool)
+    candidate[1:-1] = same_state & (forward | short)
+    inner = np.flatnonzero(candidate[1:-1])
+    if len(inner) > 0:
+        deviation = _span_deviation(original, origin[inner], origin[inner + 2])
+        candidate[inner[deviation >= tolerance] + 1] = False
+
+    # Remove every second candidate in each run of neighbouring candidates
+    idx = np.arange(n)
+    starts = candidate & ~np.concatenate([[False], candidate[:-1]])
+    run_start = np.maximum.accumulate(np.where(starts, idx, 0))
+    remove[:] = candidate & ((idx - run_start) % 2 == 0)
+    return remove
+
+def merge_moves(commands:List[LaserCmd], tolerance:float, max_passes:int=16) -> Tuple[List[LaserCmd], List[int]]:
+    '''
+    Merges consecutive collinear burn moves and drops burn moves shorter than tolerance.
+    Works on arrays of all moves at once, repeats until nothing changes or max_passes is reached.
+    Merged path never gets further than tolerance from the original one.
+    Returns new list of commands and number of moves removed in each pass.
+    '''
+    index, points, burn, free, contig = _collect(commands)
+    original, origin = points, np.arange(len(points))
+    removed = []
+    for _ in range(max_passes):
+        remove = _merge_pass(points, origin, original, burn, free, contig, tolerance)
+        count = int(remove.sum())
+        if count == 0: break
+        removed.append(count)
+        # Commands in front of removed move are now in front of the next one
+        contig[1:] &= ~remove[:-1] | contig[:-1]
+        keep = ~remove
+        index, points, origin, burn, free, contig = index[keep], points[keep], origin[keep], burn[keep], free[keep], contig[keep]
+
+    if not removed: return commands, removed
+
+    # Coordinates that were skipped as unchanged may differ from the new previous move
+    for k in range(1, len(index)):
+        if not free[k]: continue
+        cmd = commands[index[k]]
+        cmd.x = None if abs(points[k, 0] - points[k-1, 0]) <= 0.001 else points[k, 0]
+        cmd.y = None if abs(points[k, 1] - points[k-1, 1]) <= 0.001 else points[k, 1]
+
+    # Rebuild list without removed moves
+    kept = np.zeros(len(commands), dtype=bool)
+    kept[index] = True
+    for i, cmd in enumerate(commands):
+        if not isinstance(cmd, LaserMove) or (cmd.x is None and cmd.y is None): kept[i] = True
+    return [cmd for cmd, k in zip(commands, kept) if k], removed
@@ -0,0 +1,226 @@
+import math, time
+import numpy as np
+import numba as nb
+from typing import List, Tuple
+
+from .math import *
+
+class SpatialGrid:
+    '''
+    Uniform grid over points. Points of each cell are stored next to each other (CSR layout),
+    so cells can be scanned from compiled code.
+    '''
+
+    def __init__(self, points:np.ndarray, cell:float=None):
+        lo = points.min(axis=0) if len(points) else np.zeros(2)
+        hi = points.max(axis=0) if len(points) else np.ones(2)
+        if cell is None:
+            # About 2 points per cell
+            area = max((hi[0] - lo[0]) * (hi[1] - lo[1]), 1.0)
+            cell = max(math.sqrt(2.0 * area / max(len(points), 1)), 1.0)
+        self.cell = float(cell)
+        self.origin = lo.astype(np.float64)
+        self.shape = (int((hi[0] - lo[0]) / cell) + 1, int((hi[1] - lo[1]) / cell) + 1)
+        cx = ((points[:, 0] - lo[0]) / cell).astype(np.int64)
+        cy = ((points[:, 1] - lo[1]) / cell).astype(np.int64)
+        keys = cx * self.shape[1] + cy
+        self.items = np.argsort(keys, kind='stable').astype(np.int64)
+        counts = np.bincount(keys, minlength=self.shape[0] * self.shape[1])
+        self.start = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+@nb.njit(nb.types.Tuple((intarray_t, intarray_t))(floatarray2d_t, floatarray2d_t, intarray_t, intarray_t, intarray_t, intarray_t, intarray_t, intarray_t, float_t, float_t, float_t, int_t, int_t, float_t, float_t))
+def _nearest_neighbour(vertices, exits, owner, offsets, groups, group_offsets, cell_start, cell_items, origin_x, origin_y, cell, nx, ny, x, y):
+    '''
+    Greedy tour. From current position goes to the closest vertex of any unvisited polygon.
+    Head leaves polygon at exit point of the entry vertex (the same point for closed polygons).
+    Polygons are sorted by group, all polygons of a group are visited before moving to the next group.
+    Returns order of polygons and index of entry vertex of each polygon.
+    '''
+    n = len(offsets) - 1
+    order = np.zeros(n, dtype=np.int64)
+    entry = np.zeros(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=np.bool_)
+    remaining = np.diff(group_offsets)
+    # Unvisited vertices in each cell, allows skipping cells quickly
+    left = np.zeros(nx * ny, dtype=np.int64)
+    for c in range(nx * ny): left[c] = cell_start[c+1] - cell_start[c]
+
+    group = -1
+    for k in range(n):
+        best, best_dist = -1, np.inf
+        if group >= 0 and remaining[group] > 0:
+            # Finish current group first
+            for p in range(group_offsets[group], group_offsets[group+1]):
+                if visited[p]: continue
+                for v in range(offsets[p], offsets[p+1]):
+                    d = (vertices[v, 0] - x)**2 + (vertices[v, 1] - y)**2
+                    if d < best_dist:
+                        best, best_dist = v, d
+        else:
+            px = min(max(int((x - origin_x) / cell), 0), nx - 1)
+            py = min(max(int((y - origin_y) / cell), 0), ny - 1)
+            ring = 0
+            # Look at rings of cells around current position until closer vertex can not exist
+            while ring <= max(nx, ny):
+                if best >= 0:
+                    reach = (ring - 1) * cell
+                    if reach > 0 and reach * reach > best_dist: break
+                for gx in range(px - ring, px + ring + 1):
+                    if gx < 0 or gx >= nx: continue
+                    step = 1 if gx == px - ring or gx == px + ring else 2 * ring
+                    for gy in range(py - ring, py + ring + 1, max(step, 1)):
+                        if gy < 0 or gy >= ny: continue
+                        c = gx * ny + gy
+                        if left[c] == 0: continue
+                        for s in range(cell_start[c], cell_start[c+1]):
+                            v = cell_items[s]
+                            if visited[owner[v]]: continue
+                            d = (vertices[v, 0] - x)**2 + (vertices[v, 1] - y)**2
+                            if d < best_dist:
+                                best, best_dist = v, d
+                ring += 1
+
+        # Visit polygon
+        p = owner[best]
+        order[k] = p
+        entry[k] = best - offsets[p]
+        visited[p] = True
+        group = groups[p]
+        remaining[group] -= 1
+        for v in range(offsets[p], offsets[p+1]):
+            gx = min(max(int((vertices[v, 0] - origin_x) / cell), 0), nx - 1)
+            gy = min(max(int((vertices[v, 1] - origin_y) / cell), 0), ny - 1)
+            left[gx * ny + gy] -= 1
+        x, y = exits[best, 0], exits[best, 1]
+    return order, entry
+
+@nb.njit(float_t(floatarray2d_t, intarray_t, intarray_t, int_t, int_t, int_t))
+def _two_opt(points, order, entry, lo, hi, window):
+    '''
+    2-opt over tour of entry points, only segments shorter than window are reversed.
+    points[0] is the fixed starting position, points[k+1] belongs to order[k].
+    Works in place on positions lo..hi, returns travel saved.
+    '''
+    n = len(points)
+    saved = 0.0
+    for i in range(max(lo, 1), min(hi, n - 1)):
+        a = points[i-1]
+        b = points[i]
+        dab = math.sqrt((b[0]-a[0])**2 + (b[1]-a[1])**2)
+        for j in range(i + 1, min(i + window, n)):
+            c = points[j]
+            dcd, dbd = 0.0, 0.0
+            # Tour is open, last point has no next one
+            if j + 1 < n:
+                d = points[j+1]
+                dcd = math.sqrt((d[0]-c[0])**2 + (d[1]-c[1])**2)
+                dbd = math.sqrt((d[0]-b[0])**2 + (d[1]-b[1])**2)
+            delta = math.sqrt((c[0]-a[0])**2 + (c[1]-a[1])**2) + dbd - dab - dcd
+            if delta < -1e-9:
+                # Reverse i..j
+                u, w = i, j
+                while u < w:
+                    for axis in range(2):
+                        tmp = points[u, axis]
+                        points[u, axis] = points[w, axis]
+                        points[w, axis] = tmp
+                    tmp = order[u-1]; order[u-1] = order[w-1]; order[w-1] = tmp
+                    tmp = entry[u-1]; entry[u-1] = entry[w-1]; entry[w-1] = tmp
+                    u += 1
+                    w -= 1
+                saved -= delta
+                b = points[i]
+                dab = math.sqrt((b[0]-a[0])**2 + (b[1]-a[1])**2)
+    return saved
+
+@nb.njit(float_t(floatarray2d_t, intarray_t, floatarray2d_t, intarray_t, intarray_t))
+def _rotate_entries(vertices, offsets, points, order, entry):
+    '''
+    Moves entry of every polygon to the vertex closest to both neighbours in the tour. Returns travel saved.
+    '''
+    n = len(points)
+    saved = 0.0
+    for k in range(1, n):
+        p = order[k-1]
+        a = points[k-1]
+        has_next = k + 1 < n
+        best = -1
+        best_cost, current = 0.0, 0.0
+        for v in range(offsets[p], offsets[p+1]):
+            cost = math.sqrt((vertices[v, 0]-a[0])**2 + (vertices[v, 1]-a[1])**2)
+            if has_next: cost += math.sqrt((vertices[v, 0]-points[k+1, 0])**2 + (vertices[v, 1]-points[k+1, 1])**2)
+            if best < 0 or cost < best_cost:
+                best, best_cost = v, cost
+            if v - offsets[p] == entry[k-1]: current = cost
+        if best - offsets[p] != entry[k-1] and best_cost < current - 1e-9:
+            saved += current - best_cost
+            entry[k-1] = best - offsets[p]
+            points[k, 0] = vertices[best, 0]
+            points[k, 1] = vertices[best, 1]
+    return saved
+
+def travel_distance(polygons:List[np.ndarray], start:Tuple[float, float]) -> float:
+    '''Returns length of travel moves needed to burn closed polygons in given order'''
+    if len(polygons) == 0: return 0.0
+    points = np.array([start] + [p[0] for p in polygons], dtype=np.float64)
+    return float(np.hypot(*np.diff(points, axis=0).T).sum())
+
+def order_polygons(polygons:List[np.ndarray], start:Tuple[float, float], budget:float=0.5, window:int=64) -> List[np.ndarray]:
+    '''
+    Orders closed polygons (first vertex equal to the last one) to minimize travel between them.
+    Nearest neighbour tour is built first, then improved with 2-opt and by changing entry vertex
+    of every polygon, until nothing improves or time budget (in seconds) runs out.
+    Returns rotated polygons in new order.
+    '''
+    if len(polygons) < 2: return list(polygons)
+    deadline = time.perf_counter() + budget
+
+    # Flatten, last vertex is the same as the first one
+    sizes = np.array([len(p) - 1 for p in polygons], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    vertices = np.ascontiguousarray(np.concatenate([p[:-1] for p in polygons]), dtype=np.float64)
+    owner = np.repeat(np.arange(len(polygons), dtype=np.int64), sizes)
+
+    # Greedy tour
+    grid = SpatialGrid(vertices)
+    groups = np.arange(len(polygons), dtype=np.int64) # Every polygon is its own group
+    order, entry = _nearest_neighbour(vertices, vertices, owner, offsets, groups, np.arange(len(polygons) + 1, dtype=np.int64), grid.start, grid.items, grid.origin[0], grid.origin[1],
+        grid.cell, grid.shape[0], grid.shape[1], float(start[0]), float(start[1]))
+
+    # Refine in chunks, checking time budget between them
+    points = np.ascontiguousarray(np.concatenate([[start], vertices[offsets[order] + entry]]), dtype=np.float64)
+    chunk = max(4096 // window, 16)
+    while time.perf_counter() < deadline:
+        saved = 0.0
+        for lo in range(1, len(points), chunk):
+            saved += _two_opt(points, order, entry, lo, lo + chunk, window)
+            if time.perf_counter() >= deadline: break
+        saved += _rotate_entries(vertices, offsets, points, order, entry)
+        if saved < 1e-6: break
+
+    # Rotate polygons to start at entry vertex
+    result = []
+    for p, e in zip(order, entry):
+        polygon = polygons[p]
+        result.append(polygon if e == 0 else np.concatenate([polygon[e:-1], polygon[:e+1]]))
+    return result
+
+def order_paths(entries:np.ndarray, exits:np.ndarray, start:Tuple[float, float], groups:np.ndarray=None) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Orders open paths with nearest neighbour tour. Every path can be burned in one of several ways (variants),
+    entries and exits are arrays of shape (paths, variants, 2) with start and end point of each variant.
+    If groups (sorted) are given, all paths of a group are burned before moving to another group.
+    Returns order of paths and variant chosen for each of them.
+    '''
+    n, variants = entries.shape[0], entries.shape[1]
+    if n == 0: return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if groups is None: groups = np.arange(n, dtype=np.int64)
+    groups = np.ascontiguousarray(groups, dtype=np.int64)
+    group_offsets = np.concatenate([[0], np.cumsum(np.bincount(groups))]).astype(np.int64)
+    vertices = np.ascontiguousarray(entries.reshape(-1, 2), dtype=np.float64)
+    exits = np.ascontiguousarray(exits.reshape(-1, 2), dtype=np.float64)
+    offsets = np.arange(0, n * variants + 1, variants, dtype=np.int64)
+    owner = np.repeat(np.arange(n, dtype=np.int64), variants)
+    grid = SpatialGrid(vertices)
+    return _nearest_neighbour(vertices, exits, owner, offsets, groups, group_offsets, grid.start, grid.items, grid.origin[0], grid.origin[1],
+        grid.cell, grid.shape[0], grid.shape[1], float(start[0]), float(start[1]))
@@ -1,4 +1,5 @@
 import uuid, time
+from uuid import UUID
 import logging as log
 import numpy as np
 import numba as nb
@@ -10,6 +11,7 @@ from PIL.ExifTags import TAGS as ExifTags
 
 from ..utils import Config, PerfTool, rdp_simplify_all
 from .math import *
+from .dither import dither_image, DITHER_MODES
 
 class Pixel(IntEnum):
     Black = 0
@@ -159,17 +161,22 @@ class RasterImage:
     def __init__(self, image_path:Path) -> None:
         self.unique_id:UUID = uuid.uuid4()
         self.pixels:np.ndarray = None
+        self._gray:np.ndarray = None # Luminance, for raster engraving
         self.traced:bool = False
         self.gcode = None
 
         self.image_path:Path = image_path.resolve()
         self.image:Image = None
+        self.image_scale:float = 1.0 # Size of preview image relative to the pixels
         self.polygons:List = None
 
         self.exif_dpi:float = None
+        self.info_dither:str = None # Dither mode used when loading
         self.info_dpi:float = None
         self.info_numlines:int = None
         self.info_numpolygons:int = None
+        self.info_calctime:float = None # ms, without numba compilation
+        self.info_compiletime:float = None # ms spent compiling numba kernels on first use
         
     def _exif_dpi(self, img):
         exif = { ExifTags[k]: v for k, v in img.getexif().items() if k in ExifTags }
@@ -185,44 +192,83 @@ class RasterImage:
         if unit == 3: res /= 0.3937008
         return round(res, 3)
 
-    def load(self) -> bool:
+    def _open(self) -> Image:
         '''
-        Opens image, converts it to grayscale and then to binary array 
+        Opens image and converts it to grayscale, with transparency replaced by background color
         '''
+        img = Image.open(self.image_path)
+        self.exif_dpi = self._exif_dpi(img)
+        # Find bg color
+        rgb = img.convert('RGBA')
+        pix = rgb.getpixel((0,0))
+        bg = 'black'
+        if pix[3] < 127 or sum(pix[:-1]) / 3 > 127: bg = 'white'
+        # Replace transparency with color
+        if img.mode == 'RGBA':
+            background = Image.new('RGBA', img.size, bg)
+            background.paste(img, (0, 0), img)
+            img = background
+        # Convert to grayscale
+        img = img.convert('L')
+        # Add 1pix border for simpler algorithms (iteration)
+        return ImageOps.expand(img, border=10, fill=bg)
+
+    def load(self, dither:str='none') -> bool:
+        '''
+        Opens image, converts it to grayscale and then to binary array, optionally dithered
+        '''
+        if dither not in DITHER_MODES:
+            raise ValueError(f'Unknown dither mode {dither}, available: {", ".join(DITHER_MODES)}')
+        perf = PerfTool()
         try:
-            # Open image
-            img = Image.open(self.image_path)
-            self.exif_dpi = self._exif_dpi(img)
-            # Find bg color
-            rgb = img.convert('RGBA')
-            pix = rgb.getpixel((0,0))
-            bg = 'black'
-            if pix[3] < 127 or sum(pix[:-1]) / 3 > 127: bg = 'white'
-            # Replace transparency with color
-            if img.mode == 'RGBA':
-                background = Image.new('RGBA', img.size, bg)
-                background.paste(img, (0, 0), img)
-                img = background
-            # Convert to grayscale
-            img = img.convert('L')
-            # Add 1pix border for simpler algorithms (iteration)
-            img = ImageOps.expand(img, border=10, fill=bg)
+            img = self._open()
             # Convert to array
             self.pixels = np.asarray(img).copy()
+            self._gray = None
+            self.info_dither = dither
+            # Dither to black and white pixels
+            if dither != 'none':
+                perf.tick('load')
+                self.pixels = dither_image(self.pixels, dither)
+                perf.tick('dither')
             # Make it binary
             self.pixels[self.pixels <= 127] = Pixel.Black
             self.pixels[self.pixels > 127] = Pixel.White
             # Image has been successfully loaded
             self.info_height_px = img.size[1]
+            perf.tick('load')
             return True
         except Exception as e:
             print(e)
             return False
 
+    def grayscale(self) -> np.ndarray:
+        '''
+        Returns 8-bit luminance of the image, with the same border as pixels. Dithered image has only black and white.
+        Read from disk on first use, binary workflows do not keep it in memory.
+        '''
+        if self._gray is None:
+            gray = np.array(self._open())
+            if self.info_dither not in (None, 'none'): gray = dither_image(gray, self.info_dither)
+            self._gray = gray
+        return self._gray
+
+    def tiles(self, rows:int=256):
+        '''
+        Yields first row and 8-bit luminance of horizontal tiles of the image (views of grayscale(), nothing is copied)
+        '''
+        gray = self.grayscale()
+        for y0 in range(0, gray.shape[0], rows):
+            yield y0, gray[y0:y0 + rows]
+
     def trace(self, config:Config) -> None:
         '''
         Tries to convert binary array with image data to polygons
         '''
+        # Dithering is done when loading, reload if it changed
+        dither = config.get_value('image.dither')
+        if dither != self.info_dither: self.load(dither)
+
         # Update dpi
         self.info_dpi = config.get_value('image.dpi')
         self.info_mm2pix = self.info_dpi / 25.4
@@ -245,7 +291,8 @@ class RasterImage:
         # Print stats
         self.info_numpolygons = len(self.polygons)
         self.info_numlines = sum([len(p) for p in self.polygons])
-        self.info_calctime = perf.total()
+        self.info_compiletime = perf.compile_time()
+        self.info_calctime = round(perf.total() - self.info_compiletime, 2)
 
         log.info(\
             f'Image {self.image_path.name},'\
@@ -0,0 +1,77 @@
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from .job import LaserCmd, LaserMove, LaserArc, LaserSpeed, LaserAccel, LaserUnit
+from ..utils.compression import open_text
+
+def _words(line:str) -> dict:
+    words = {}
+    for word in line.split(';', 1)[0].split():
+        try:
+            words[word[0].upper()] = float(word[1:])
+        except ValueError:
+            continue
+    return words
+
+def read_commands(lines:Iterable[str]) -> List[LaserCmd]:
+    '''
+    Parses gcode written by LaserJob (plain or compact) back into commands, in mm.
+    Relative moves are converted to absolute. Commands other than moves, speed and acceleration are skipped.
+    '''
+    commands = []
+    pos = [0.0, 0.0, 0.0]
+    relative = False
+    for line in lines:
+        code = line.split(None, 1)[0].upper() if line.strip() else ''
+        if code == 'G90': relative = False
+        elif code == 'G91': relative = True
+        elif code == 'M204':
+            words = _words(line)
+            accel = words.get('P', words.get('S'))
+            if accel is not None: commands.append(LaserAccel(accel))
+        elif code in ('G0', 'G1', 'G2', 'G3'):
+            words = _words(line)
+            if 'F' in words: commands.append(LaserSpeed(words['F'] / 60)) # mm/min to mm/s
+            start = list(pos)
+            for axis, name in enumerate('XYZ'):
+                if name in words: pos[axis] = pos[axis] + words[name] if relative else words[name]
+            if pos == start and code in ('G0', 'G1'): continue
+            if code in ('G0', 'G1'):
+                move = LaserMove(*[pos[k] if pos[k] != start[k] else None for k in range(3)], unit=LaserUnit.Milimeters, rapid=code == 'G0')
+            else:
+                move = LaserArc(pos[0], pos[1], words.get('I', 0.0), words.get('J', 0.0), code == 'G2', unit=LaserUnit.Milimeters)
+            move.applied = True
+            if 'S' in words: move.power = int(words['S'])
+            commands.append(move)
+    return commands
+
+def read_file(path:Path) -> List[LaserCmd]:
+    '''
+    Reads exported gcode file for preview. Compressed files (gzip, zstd) are decompressed while reading.
+    '''
+    with open_text(path) as f:
+        return read_commands(f)
+
+def to_pixels(commands:List[LaserCmd], height:float, mm2pix:float, offset) -> List[LaserCmd]:
+    '''
+    Converts commands read from file (machine coordinates in mm) back to image pixels, reverses LaserJob.apply.
+    Height is image height in mm, offset is image offset used when generating. Commands are changed in place.
+    '''
+    for cmd in commands:
+        if not isinstance(cmd, LaserMove) or cmd.unit == LaserUnit.Pixels: continue
+        if cmd.x is not None: cmd.x = (cmd.x - offset[0]) * mm2pix
+        if cmd.y is not None: cmd.y = (height - (cmd.y - offset[1])) * mm2pix
+        if cmd.z is not None: cmd.z = (cmd.z - offset[2]) * mm2pix
+        if isinstance(cmd, LaserArc):
+            cmd.i *= mm2pix
+            cmd.j *= -mm2pix
+            cmd.clockwise = not cmd.clockwise
+        cmd.unit = LaserUnit.Pixels
+        cmd.applied = False
+    return commands
+
+def origin_pixels(height:float, mm2pix:float, offset) -> Tuple[float, float]:
+    '''
+    Returns machine origin (where the head is before the file starts) in image pixels, same conversion as to_pixels
+    '''
+    return -offset[0] * mm2pix, (height + offset[1]) * mm2pix
@@ -5,6 +5,7 @@ from uuid import UUID
 
 from ..utils import Event
 from .raster import RasterImage
+from .vector import VectorImage, is_vector
 
 class Slicer:
     '''
@@ -20,7 +21,7 @@ class Slicer:
 
     def load_image(self, file_path:Path) -> RasterImage:
         # Load image from disk
-        image = RasterImage(file_path)
+        image = VectorImage(file_path) if is_vector(file_path) else RasterImage(file_path)
         if image.load():
             self._images[str(file_path.resolve())] = image
             self.image_loaded(image)
@@ -0,0 +1,241 @@
+import re, math
+import logging as log
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import List, Tuple
+
+from .curves import flatten_cubic, flatten_quad, flatten_arc
+
+SVG_DPI = 96.0 # User units are CSS pixels, unless viewBox says otherwise
+UNITS = {'': 25.4 / SVG_DPI, 'px': 25.4 / SVG_DPI, 'pt': 25.4 / 72, 'pc': 25.4 / 6, 'mm': 1.0, 'cm': 10.0, 'in': 25.4, 'q': 0.25}
+SHAPES = {'path', 'polygon', 'polyline', 'line', 'circle', 'ellipse', 'rect'}
+GROUPS = {'svg', 'g', 'a', 'switch'}
+HIDDEN = {'defs', 'clipPath', 'mask', 'symbol', 'marker', 'pattern', 'metadata', 'title', 'desc', 'style'} # Not drawn directly
+
+_number = re.compile(r'[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?')
+_flag = re.compile(r'[01]')
+_separator = re.compile(r'[\s,]*')
+_command = re.compile(r'[MmLlHhVvCcSsQqTtAaZz]')
+_transform = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+_length = re.compile(r'\s*([-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?)\s*([a-zA-Z%]*)\s*$')
+
+def _length_mm(value:str) -> float:
+    '''Returns length in mm, None for missing or relative (%) lengths'''
+    match = _length.match(value or '')
+    if match is None or match.group(2).lower() not in UNITS: return None
+    return float(match.group(1)) * UNITS[match.group(2).lower()]
+
+def _numbers(value:str) -> List[float]:
+    return [float(x) for x in _number.findall(value or '')]
+
+def _matrix(a, b, c, d, e, f) -> np.ndarray:
+    return np.array([[a, c, e], [b, d, f], [0.0, 0.0, 1.0]])
+
+def parse_transform(value:str) -> np.ndarray:
+    '''Returns 3x3 matrix of SVG transform attribute'''
+    result = np.eye(3)
+    for name, args in _transform.findall(value or ''):
+        v = _numbers(args)
+        if name == 'matrix' and len(v) == 6: m = _matrix(*v)
+        elif name == 'translate' and len(v) > 0: m = _matrix(1, 0, 0, 1, v[0], v[1] if len(v) > 1 else 0.0)
+        elif name == 'scale' and len(v) > 0: m = _matrix(v[0], 0, 0, v[1] if len(v) > 1 else v[0], 0, 0)
+        elif name == 'rotate' and len(v) > 0:
+            a = math.radians(v[0])
+            m = _matrix(math.cos(a), math.sin(a), -math.sin(a), math.cos(a), 0, 0)
+            if len(v) == 3: m = _matrix(1, 0, 0, 1, v[1], v[2]) @ m @ _matrix(1, 0, 0, 1, -v[1], -v[2])
+        elif name == 'skewX' and len(v) > 0: m = _matrix(1, 0, math.tan(math.radians(v[0])), 1, 0, 0)
+        elif name == 'skewY' and len(v) > 0: m = _matrix(1, math.tan(math.radians(v[0])), 0, 1, 0, 0)
+        else: continue
+        result = result @ m
+    return result
+
+def _arc_center(p0, p1, rx, ry, phi, large, sweep):
+    '''
+    Converts SVG arc from endpoint to center parametrization (SVG spec, appendix F.6.5).
+    Returns center, radii, start angle and sweep angle.
+    '''
+    c, s = math.cos(phi), math.sin(phi)
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1, y1 = c*dx + s*dy, -s*dx + c*dy
+    # Radii too small to reach the end point are scaled up
+    scale = (x1 / rx)**2 + (y1 / ry)**2
+    if scale > 1: rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    num = rx*rx*ry*ry - rx*rx*y1*y1 - ry*ry*x1*x1
+    den = rx*rx*y1*y1 + ry*ry*x1*x1
+    k = math.sqrt(max(num, 0.0) / den) if den > 0 else 0.0
+    if large == sweep: k = -k
+    cx1, cy1 = k * rx * y1 / ry, -k * ry * x1 / rx
+    center = (c*cx1 - s*cy1 + (p0[0] + p1[0]) / 2, s*cx1 + c*cy1 + (p0[1] + p1[1]) / 2)
+    start = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    end = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx)
+    delta = end - start
+    if sweep and delta < 0: delta += 2 * math.pi
+    elif not sweep and delta > 0: delta -= 2 * math.pi
+    return center, rx, ry, start, delta
+
+class _PathReader:
+    '''Reads commands and arguments of path data one by one'''
+    def __init__(self, data:str):
+        self.data = data
+        self.pos = 0
+
+    def _skip(self):
+        self.pos = _separator.match(self.data, self.pos).end()
+
+    def done(self) -> bool:
+        self._skip()
+        return self.pos >= len(self.data)
+
+    def command(self) -> str:
+        '''Returns next command, None if arguments follow'''
+        self._skip()
+        match = _command.match(self.data, self.pos)
+        if match is None: return None
+        self.pos = match.end()
+        return match.group()
+
+    def _read(self, pattern) -> float:
+        self._skip()
+        match = pattern.match(self.data, self.pos)
+        if match is None: raise ValueError(f'Invalid path data at {self.pos}: {self.data[self.pos:self.pos+20]}')
+        self.pos = match.end()
+        return float(match.group())
+
+    def number(self) -> float:
+        return self._read(_number)
+
+    def flag(self) -> bool:
+        return self._read(_flag) != 0
+
+    def point(self):
+        return np.array([self.number(), self.number()])
+
+def parse_path(data:str, tolerance:float) -> List[Tuple[np.ndarray, bool]]:
+    '''
+    Flattens SVG path data to polylines, returns points and closed flag of every subpath
+    '''
+    reader = _PathReader(data)
+    result = []
+    points, start = [], np.zeros(2)
+    pos, control = np.zeros(2), None # Current point and last curve kind with its control point (for S and T)
+    cmd = None
+    def finish(closed):
+        if len(points) > 1: result.append((np.array(points), closed))
+    while not reader.done():
+        cmd = reader.command() or cmd
+        if cmd is None: raise ValueError('Path data has to start with a command')
+        relative = cmd.islower()
+        base = pos if relative else np.zeros(2)
+        c = cmd.upper()
+        prev_control, control = control, None
+        if c == 'M':
+            finish(False)
+            pos = base + reader.point()
+            points, start = [pos], pos
+            cmd = 'l' if relative else 'L' # Following pairs are lines
+        elif c == 'Z':
+            if len(points) > 1:
+                points.append(start)
+                finish(True)
+            points, pos = [start], start
+            cmd = None
+        elif c in 'LHV':
+            if c == 'L': pos = base + reader.point()
+            elif c == 'H': pos = np.array([base[0] + reader.number(), pos[1]])
+            else: pos = np.array([pos[0], base[1] + reader.number()])
+            points.append(pos)
+        elif c in 'CS':
+            p1 = 2*pos - prev_control[1] if c == 'S' and prev_control is not None and prev_control[0] == 'C' else pos
+            if c == 'C': p1 = base + reader.point()
+            p2, p3 = base + reader.point(), base + reader.point()
+            points.extend(flatten_cubic(pos, p1, p2, p3, tolerance))
+            pos, control = p3, ('C', p2)
+        elif c in 'QT':
+            p1 = 2*pos - prev_control[1] if c == 'T' and prev_control is not None and prev_control[0] == 'Q' else pos
+            if c == 'Q': p1 = base + reader.point()
+            p2 = base + reader.point()
+            points.extend(flatten_quad(pos, p1, p2, tolerance))
+            pos, control = p2, ('Q', p1)
+        elif c == 'A':
+            rx, ry, phi = abs(reader.number()), abs(reader.number()), math.radians(reader.number())
+            large, sweep = reader.flag(), reader.flag()
+            end = base + reader.point()
+            if rx == 0 or ry == 0: points.append(end)
+            elif np.any(end != pos):
+                center, rx, ry, a0, delta = _arc_center(pos, end, rx, ry, phi, large, sweep)
+                points.extend(flatten_arc(center, rx, ry, phi, a0, delta, tolerance)[:-1])
+                points.append(end)
+            pos = end
+    finish(False)
+    return result
+
+def _shape(el, tag:str, tolerance:float) -> List[Tuple[np.ndarray, bool]]:
+    '''Returns polylines of basic shape or path element, in user units'''
+    def attr(name, default=0.0):
+        value = _numbers(el.get(name))
+        return value[0] if value else default
+    if tag == 'path': return parse_path(el.get('d', ''), tolerance)
+    if tag in ('polygon', 'polyline'):
+        v = _numbers(el.get('points'))
+        points = np.array(v[:len(v) // 2 * 2]).reshape(-1, 2)
+        if tag == 'polygon' and len(points) > 2: return [(np.vstack([points, points[:1]]), True)]
+        return [(points, False)] if len(points) > 1 else []
+    if tag == 'line':
+        return [(np.array([[attr('x1'), attr('y1')], [attr('x2'), attr('y2')]]), False)]
+    if tag in ('circle', 'ellipse'):
+        rx = attr('r') if tag == 'circle' else attr('rx')
+        ry = attr('r') if tag == 'circle' else attr('ry')
+        if rx <= 0 or ry <= 0: return []
+        center = (attr('cx'), attr('cy'))
+        points = flatten_arc(center, rx, ry, 0.0, 0.0, 2 * math.pi, tolerance)
+        return [(np.vstack([points[-1:], points]), True)]
+    if tag == 'rect':
+        x, y, w, h = attr('x'), attr('y'), attr('width'), attr('height')
+        if w <= 0 or h <= 0: return []
+        rx, ry = attr('rx', None), attr('ry', None)
+        if rx is None: rx = ry
+        if ry is None: ry = rx
+        rx, ry = min(rx or 0.0, w / 2), min(ry or 0.0, h / 2)
+        if rx <= 0 or ry <= 0:
+            return [(np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h], [x, y]]), True)]
+        # Rounded corners, clockwise from the top edge
+        d = f'M{x+rx},{y} H{x+w-rx} A{rx},{ry} 0 0 1 {x+w},{y+ry} V{y+h-ry} A{rx},{ry} 0 0 1 {x+w-rx},{y+h} '\
+            f'H{x+rx} A{rx},{ry} 0 0 1 {x},{y+h-ry} V{y+ry} A{rx},{ry} 0 0 1 {x+rx},{y} Z'
+        return parse_path(d, tolerance)
+    return []
+
+def parse_svg(path:Path, tolerance:float) -> List[Tuple[np.ndarray, bool]]:
+    '''
+    Returns polylines (in mm, y axis pointing down) and closed flag of every shape in SVG file.
+    Curves are flattened so they are no further than tolerance (in mm) from the original.
+    '''
+    root = ET.parse(path).getroot()
+    # Document units, viewBox maps user units to width and height
+    width, height = _length_mm(root.get('width')), _length_mm(root.get('height'))
+    box = _numbers(root.get('viewBox'))
+    scale = np.eye(3) * UNITS['px']
+    if len(box) == 4 and box[2] > 0 and box[3] > 0:
+        sx = width / box[2] if width is not None else UNITS['px']
+        sy = height / box[3] if height is not None else sx
+        if width is None and height is not None: sx = sy
+        scale = _matrix(sx, 0, 0, sy, -box[0] * sx, -box[1] * sy)
+    scale[2, 2] = 1.0
+
+    result = []
+    skipped = set()
+    def visit(el, matrix):
+        tag = el.tag.rsplit('}', 1)[-1]
+        if tag in HIDDEN or el.get('display') == 'none' or 'display:none' in el.get('style', '').replace(' ', ''): return
+        if tag not in SHAPES and tag not in GROUPS:
+            skipped.add(tag)
+            return
+        matrix = matrix @ parse_transform(el.get('transform'))
+        # Flatten in user units, with tolerance scaled by the transform
+        unit = math.sqrt(abs(np.linalg.det(matrix[:2, :2]))) or 1.0
+        for points, closed in _shape(el, tag, tolerance / unit):
+            result.append((points @ matrix[:2, :2].T + matrix[:2, 2], closed))
+        for child in el: visit(child, matrix)
+    visit(root, scale)
+    if skipped: log.warning(f'Unsupported SVG elements skipped: {", ".join(sorted(skipped))}')
+    return result
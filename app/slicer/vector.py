@@ -0,0 +1,152 @@
+import uuid, math
+from uuid import UUID
+import logging as log
+import numpy as np
+import numba as nb
+from typing import List
+from pathlib import Path
+from PIL import Image, ImageDraw
+
+from ..utils import Config, PerfTool
+from .math import *
+from .curves import join_paths
+from .infill import polygon_edges, scan_band
+from .svg import parse_svg
+from .dxf import parse_dxf
+
+VECTOR_FORMATS = {'.svg': parse_svg, '.dxf': parse_dxf}
+TILE_ROWS = 256 # Rows rendered at once when rasterizing
+PREVIEW_PIXELS = 4_000_000 # Preview of larger drawings is rendered at lower resolution
+
+def is_vector(path:Path) -> bool:
+    return path.suffix.lower() in VECTOR_FORMATS
+
+@nb.njit(bytearray2d_t(bytearray2d_t, floatarray_t, floatarray_t, intarray_t), nogil=True)
+def _fill_segments(tile, x0, x1, rows):
+    '''Blackens pixels with centers inside of segments'''
+    w = tile.shape[1]
+    for k in range(len(x0)):
+        start = min(max(int(math.ceil(x0[k])), 0), w)
+        end = min(max(int(math.ceil(x1[k])), 0), w)
+        tile[rows[k], start:end] = 0
+    return tile
+
+def rasterize_tiles(polygons:List[np.ndarray], width:int, height:int, rows:int=TILE_ROWS):
+    '''
+    Renders polygons (in pixels, centers at integer coordinates) tile by tile, filled with even-odd rule.
+    Yields first row and luminance (0 inside, 255 outside) of every tile, the whole image is never held in memory.
+    '''
+    edges, owner = polygon_edges(polygons)
+    for y0 in range(0, height, rows):
+        tile = np.full((min(rows, height - y0), width), 255, dtype=np.uint8)
+        if len(edges) > 0:
+            x0, x1, tile_rows, _ = scan_band(edges, owner, np.arange(y0, y0 + len(tile), dtype=np.float64))
+            _fill_segments(tile, x0, x1, tile_rows)
+        yield y0, tile
+
+class VectorImage:
+    '''
+    Allows loading vector images (svg, dxf) from disk. Shapes are flattened straight to polygons,
+    with the same layout as polygons traced by RasterImage (pixels at image dpi, y axis pointing down).
+    '''
+
+    def __init__(self, image_path:Path) -> None:
+        self.unique_id:UUID = uuid.uuid4()
+        self.pixels:np.ndarray = None
+        self.traced:bool = False
+        self.gcode = None
+
+        self.image_path:Path = image_path.resolve()
+        self.image:Image = None
+        self.image_scale:float = 1.0 # Size of preview image relative to the rasterized drawing
+        self.polygons:List = None
+        self.shapes:List = None # Closed polygons in mm, moved so drawing starts at 0,0
+        self.size:tuple = None # Width and height of drawing in mm
+
+        self.exif_dpi:float = None
+        self.info_dpi:float = None
+        self.info_tolerance:float = None # Tolerance used when loading
+        self.info_open_paths:int = None # Paths that could not be closed, they are not sliced
+        self.info_numlines:int = None
+        self.info_numpolygons:int = None
+        self.info_calctime:float = None # ms, without numba compilation
+        self.info_compiletime:float = None
+
+    def load(self, tolerance:float=0.01) -> bool:
+        '''
+        Parses file and flattens curves, so they are no further than tolerance (in mm) from the original
+        '''
+        perf = PerfTool()
+        try:
+            parse = VECTOR_FORMATS[self.image_path.suffix.lower()]
+            paths = parse(self.image_path, tolerance)
+            perf.tick('parse')
+            # Close what can be closed, lines drawn one by one included. Flattened curves may miss start by rounding error.
+            closed = [np.vstack([p[:-1], p[:1]]) for p, c in paths if c]
+            closed += join_paths([p for p, c in paths if not c], tolerance)
+            shapes = [p for p in closed if len(p) > 3 and np.all(p[0] == p[-1])]
+            self.info_open_paths = len(closed) - len(shapes)
+            if self.info_open_paths > 0: log.warning(f'{self.info_open_paths} open paths in {self.image_path.name} are not sliced')
+            if len(shapes) == 0: raise ValueError(f'No closed shapes in {self.image_path.name}')
+            # Drawing starts at the origin, y axis points down like in images
+            vertices = np.concatenate(shapes)
+            lo, hi = vertices.min(axis=0), vertices.max(axis=0)
+            if parse is parse_dxf: self.shapes = [np.column_stack([p[:, 0] - lo[0], hi[1] - p[:, 1]]) for p in shapes]
+            else: self.shapes = [p - lo for p in shapes]
+            self.size = tuple(hi - lo)
+            self.info_tolerance = tolerance
+            perf.tick('join')
+            return True
+        except Exception as e:
+            print(e)
+            return False
+
+    def trace(self, config:Config) -> None:
+        '''
+        Scales polygons to pixels of configured dpi. Nothing has to be traced, name is shared with RasterImage.
+        '''
+        # Flattening is done when loading, reload if tolerance changed
+        tolerance = config.get_value('image.tolerance')
+        if tolerance != self.info_tolerance: self.load(tolerance)
+
+        self.info_dpi = config.get_value('image.dpi')
+        self.info_mm2pix = self.info_dpi / 25.4
+        self.info_height = self.size[1]
+        self.info_height_px = self.size[1] * self.info_mm2pix
+
+        perf = PerfTool()
+        self.polygons = [np.ascontiguousarray(p * self.info_mm2pix) for p in self.shapes]
+        perf.tick('scale')
+        self.traced = True
+
+        self.info_numpolygons = len(self.polygons)
+        self.info_numlines = sum([len(p) for p in self.polygons])
+        self.info_compiletime = perf.compile_time()
+        self.info_calctime = round(perf.total() - self.info_compiletime, 2)
+        log.info(f'Vector {self.image_path.name}, {self.info_numpolygons} polygons, {self.info_numlines} lines')
+
+    @property
+    def raster_size(self) -> tuple:
+        '''Width and height of the drawing rasterized at image dpi, in pixels'''
+        return int(np.ceil(self.size[0] * self.info_mm2pix)) + 1, int(np.ceil(self.size[1] * self.info_mm2pix)) + 1
+
+    def tiles(self, rows:int=TILE_ROWS):
+        '''
+        Yields first row and 8-bit luminance of tiles of the drawing rasterized at image dpi, shapes are black
+        '''
+        yield from rasterize_tiles(self.polygons, *self.raster_size, rows=rows)
+
+    def render(self, max_pixels:int=PREVIEW_PIXELS) -> None:
+        '''
+        Creates PIL image with outlines of polygons, for preview. Rendered at lower resolution if the drawing
+        rasterized at image dpi would have more than max_pixels, shapes themselves are drawn by the workspace.
+        '''
+        width, height = self.raster_size
+        self.image_scale = min(1.0, math.sqrt(max_pixels / (width * height)))
+        self.image = Image.new('L', (max(int(width * self.image_scale), 1), max(int(height * self.image_scale), 1)), 20)
+        draw = ImageDraw.Draw(self.image)
+        for polygon in self.polygons:
+            draw.line((polygon * self.image_scale).ravel().tolist(), fill=0)
+
+    def show(self) -> None:
+        self.image.show()
@@ -5,8 +5,12 @@ Module containing all utilities
 
 from .events import Event
 from .config import Config
-from .perf import PerfTool
-from .octoprint import Octoprint, OctoprintResult
+from .perf import PerfTool, PerfTrace
+from .jit import JitStats
+JitStats.install() # Before any kernel is compiled
+from .octoprint import Octoprint, OctoprintResult, OctoprintUploader
+from .sender import SerialSender, SenderStats
+from .meatpack import MeatPack
 
 from .rdp import rdp_simplify, rdp_simplify_all
 
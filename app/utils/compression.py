@@ -0,0 +1,91 @@
+import io, gzip, zlib
+from pathlib import Path
+from typing import Iterable, TextIO
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = ['none', 'gzip', 'zstd']
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+_MAGIC = {'gzip': b'\x1f\x8b', 'zstd': b'\x28\xb5\x2f\xfd'}
+
+class Compressor:
+    '''
+    Streaming compressor. Data is compressed block by block, so output can be written while it is generated.
+    '''
+
+    def __init__(self, name:str, level:int=None):
+        if name not in COMPRESSIONS:
+            raise ValueError(f'Unknown compression {name}, available: {", ".join(COMPRESSIONS)}')
+        self.name = name
+        self.info_bytes_in = 0
+        self.info_bytes_out = 0
+        if name == 'gzip':
+            # wbits=31 writes gzip header and trailer
+            self._obj = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+        elif name == 'zstd':
+            if zstandard is None:
+                raise RuntimeError('zstandard is required for zstd compression')
+            self._obj = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+        else:
+            self._obj = None
+
+    @property
+    def ratio(self) -> float:
+        '''Output bytes divided by input bytes'''
+        return self.info_bytes_out / self.info_bytes_in if self.info_bytes_in > 0 else 1.0
+
+    def compress(self, data:bytes) -> bytes:
+        self.info_bytes_in += len(data)
+        if self._obj is not None: data = self._obj.compress(data)
+        self.info_bytes_out += len(data)
+        return data
+
+    def flush(self) -> bytes:
+        data = self._obj.flush() if self._obj is not None else b''
+        self.info_bytes_out += len(data)
+        return data
+
+    def stream(self, blocks:Iterable[bytes]) -> Iterable[bytes]:
+        '''Compresses blocks as they come'''
+        for block in blocks:
+            data = self.compress(block)
+            if len(data) > 0: yield data
+        data = self.flush()
+        if len(data) > 0: yield data
+
+def from_path(path:Path) -> str:
+    '''Returns compression matching file extension'''
+    for name, ext in EXTENSIONS.items():
+        if path.suffix == ext: return name
+    return 'none'
+
+def with_extension(path:Path, name:str) -> Path:
+    '''Returns path with compression extension replaced'''
+    if from_path(path) != 'none': path = path.with_suffix('')
+    return path.with_name(path.name + EXTENSIONS[name]) if name in EXTENSIONS else path
+
+def detect(path:Path) -> str:
+    '''Detects compression from the first bytes of the file'''
+    with path.open('rb') as f:
+        head = f.read(4)
+    for name, magic in _MAGIC.items():
+        if head.startswith(magic): return name
+    return 'none'
+
+def open_text(path:Path) -> TextIO:
+    '''
+    Opens plain or compressed text file for reading. Content is decompressed while reading.
+    '''
+    name = detect(path)
+    if name == 'gzip':
+        return gzip.open(path, 'rt')
+    if name == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd compressed files')
+        reader = zstandard.ZstdDecompressor().stream_reader(path.open('rb'), closefd=True)
+        return io.TextIOWrapper(reader)
+    return path.open('r')
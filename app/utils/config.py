@@ -9,14 +9,29 @@ default_data = {
     'octoprint': {
         'enabled': False,
         'url': '',
-        'key': ''
+        'key': '',
+        'timeout': 10.0,
+        'retries': 3,
+        'compression': 'none'
+    },
+    'serial': {
+        'port': '',
+        'baudrate': 115200,
+        'rx_buffer': 128,
+        'encoding': 'plain',
+        'startup_delay': 2.0
     },
     'machine': {
+        'dialect': 'marlin_fan',
+        'output': 'plain',
         'laser_on': 'M106 P1 S{power}',
         'laser_off': 'M107 P1',
         'min_power': 1.0,
         'travel_speed': 100.0,
         'min_travel': 0.5,
+        'resolution': 0.01,
+        'order_time': 0.5,
+        'threads': 0,
         'travel_accel': 2000.0,
         'burn_accel': 5000.0,
     },
@@ -25,18 +40,37 @@ default_data = {
     'files': [],
     'image': {
         'dpi': 508,
+        'dither': 'none',
+        'tolerance': 0.01,
         'offset': {'x': 0, 'y': 0, 'z': 20.0}
     },
     'outline': {
         'passes': 1,
         'power': 100.0,
-        'speed': 20.0
+        'speed': 20.0,
+        'power_step': 0.0,
+        'z_step': 0.0,
+        'arc_tolerance': 0.0
     },
     'infill': {
         'passes': 0,
         'power': 70.0,
         'speed': 15.0,
-        'line_spacing': 0.1
+        'power_step': 0.0,
+        'z_step': 0.0,
+        'line_spacing': 0.1,
+        'angle': 0.0,
+        'mode': 'islands'
+    },
+    'raster': {
+        'passes': 0,
+        'power_min': 5.0,
+        'power_max': 70.0,
+        'speed': 50.0,
+        'line_spacing': 0.1,
+        'overscan': 2.0,
+        'gamma': 1.0,
+        'levels': 64
     }
 }
 
@@ -117,8 +151,8 @@ class Config:
 
     def save(self):
         inflated = self._inflate(self.data)
-        self._write(inflated, self.base_path / 'settings.json', ['machine', 'octoprint'])
-        self._write(inflated, self.base_path / 'config.json', ['files', 'image', 'outline', 'infill'])
+        self._write(inflated, self.base_path / 'settings.json', ['machine', 'octoprint', 'serial'])
+        self._write(inflated, self.base_path / 'config.json', ['files', 'image', 'outline', 'infill', 'raster'])
         log.info('Saved config to files')
 
     def load(self):
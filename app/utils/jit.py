@@ -0,0 +1,78 @@
+import time, threading
+from typing import Dict
+
+from numba.core import event
+
+from .perf import PerfStats, PerfTrace, PerfTool
+
+class _CompileListener(event.Listener):
+
+    def on_start(self, ev):
+        JitStats._stack().append(time.perf_counter())
+
+    def on_end(self, ev):
+        stack = JitStats._stack()
+        if not stack: return
+        start = stack.pop()
+        dispatcher = ev.data.get('dispatcher')
+        func = getattr(dispatcher, 'py_func', None)
+        name = f'{func.__module__}.{func.__qualname__}' if func is not None else str(dispatcher)
+        JitStats._record(name, start, time.perf_counter(), nested=len(stack) > 0)
+
+class JitStats:
+    '''
+    Records time spent compiling numba kernels, separately from time spent running them.
+    Kernels with signatures are compiled when their module is imported, others on first call.
+    Compilation that happens inside PerfTool spans is reported separately by them.
+    '''
+    kernels:Dict[str, PerfStats] = {}
+    _total = 0.0 # ms, top level kernels only
+    _local = threading.local()
+    _lock = threading.Lock()
+    _listener = None
+
+    @staticmethod
+    def install():
+        '''Starts listening to numba compile events, has to be called before kernels are imported'''
+        if JitStats._listener is not None: return
+        JitStats._listener = _CompileListener()
+        event.register('numba:compile', JitStats._listener)
+        PerfTool.compile_clock = staticmethod(JitStats.thread_time)
+
+    @staticmethod
+    def _stack():
+        if not hasattr(JitStats._local, 'stack'): JitStats._local.stack = []
+        return JitStats._local.stack
+
+    @staticmethod
+    def _record(name:str, start:float, end:float, nested:bool):
+        with JitStats._lock:
+            if name not in JitStats.kernels: JitStats.kernels[name] = PerfStats()
+            JitStats.kernels[name].add(start, (end - start) * 1000.0)
+            # Kernels compiled while compiling another one are already part of its time
+            if not nested: JitStats._total += (end - start) * 1000.0
+        if not nested: JitStats._local.time = JitStats.thread_time() + (end - start)
+        trace = PerfTrace.active
+        if trace is not None:
+            trace.add(f'compile {name.rsplit(".", 1)[-1]}', start, end, {'kernel': name})
+
+    @staticmethod
+    def thread_time() -> float:
+        '''Returns time (in seconds) spent compiling on the current thread since start'''
+        return getattr(JitStats._local, 'time', 0.0)
+
+    @staticmethod
+    def total() -> float:
+        '''Returns time (in miliseconds) spent compiling top level kernels on all threads'''
+        return round(JitStats._total, 2)
+
+    @staticmethod
+    def report(top:int=None) -> str:
+        '''Returns table of kernels sorted by compile time'''
+        with JitStats._lock:
+            items = sorted(JitStats.kernels.items(), key=lambda item: -item[1].total)
+        lines = [f'{"kernel":<56} {"compiles":>8} {"total":>10}']
+        for name, v in items[:top]:
+            if len(name) > 56: name = '...' + name[-53:]
+            lines.append(f'{name:<56} {v.count:>8} {v.total:>8.1f}ms')
+        return '\n'.join(lines)
@@ -1,8 +1,13 @@
+import time, uuid, threading
 import requests
 import logging as log
-from typing import Tuple
+from pathlib import Path
+from typing import Tuple, List, Iterable, Callable
 from enum import IntEnum
 from requests.compat import urljoin
+from requests.adapters import HTTPAdapter
+
+from .events import Event
 
 class OctoprintResult(IntEnum):
     Invalid = 0
@@ -15,24 +20,6 @@ class OctoprintResult(IntEnum):
 
 class Octoprint:
 
-    @staticmethod
-    def upload(config, filename, text) -> None:
-        # Get url and key
-        url = config.get_value('octoprint.url')
-        key = config.get_value('octoprint.key')
-
-        # Prepare data
-        url = urljoin(url, '/api/files/local')
-        files = {'file': (filename, text)}
-        data = {'select': 'true','print': 'false' }
-        headers = { 'X-Api-Key': key }
-
-        # Upload
-        response = requests.post(url, files=files, data=data, headers=headers)
-        code = response.status_code
-        if code == 201: log.info(f'File {filename} uploaded to Octoprint')
-        else: log.error(f'Failed to upload file to octoprint. Response code: {code}')
-
     @staticmethod
     def server_version(config) -> Tuple[OctoprintResult, str]:
         # Get url and key
@@ -67,5 +54,154 @@ class Octoprint:
         # Return result
         return (OctoprintResult.Success, data['version'])
 
-        
-        
\ No newline at end of file
+
+class _MultipartBody:
+    '''
+    Lazily generated multipart/form-data body. File content is read (or generated) in chunks,
+    so the whole file is never held in memory. Length is known only if size of the content is known.
+    '''
+
+    def __init__(self, fields:dict, filename:str, content:Callable[[], Iterable[bytes]], size:int=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.sent = 0
+        self.progress = Event()
+        self._content = content
+        self._size = size
+
+        # Prepare everything around the file content
+        head = ''
+        for name, value in fields.items():
+            head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        head += 'Content-Type: application/octet-stream\r\n\r\n'
+        self._head = head.encode()
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode()
+
+    def __len__(self):
+        return len(self._head) + self._size + len(self._tail)
+
+    def __iter__(self):
+        self.sent = 0
+        for chunk in self._chunks():
+            self.sent += len(chunk)
+            self.progress(self.sent)
+            yield chunk
+
+    def _chunks(self):
+        yield self._head
+        for chunk in self._content():
+            if len(chunk) > 0: yield chunk
+        yield self._tail
+
+    @property
+    def sized(self) -> bool:
+        return self._size is not None
+
+class OctoprintUploader:
+    '''
+    Uploads files to OctoPrint. Single session is used, so connections are reused between uploads.
+    Files are streamed in chunks and failed uploads are retried with exponential backoff.
+    '''
+
+    def __init__(self, config, chunk_size:int=64*1024, backoff:float=1.0):
+        self.config = config
+        self.chunk_size = chunk_size
+        self.backoff = backoff
+        # Events
+        self.progress = Event() # filename, sent bytes, total bytes (None if unknown)
+        self.finished = Event() # filename, OctoprintResult
+        # Session with connection pool
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _read_file(self, file_path:Path):
+        with file_path.open('rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk: break
+                yield chunk
+
+    def _post(self, body:_MultipartBody, filename:str) -> OctoprintResult:
+        # Get url and key
+        url = self.config.get_value('octoprint.url')
+        key = self.config.get_value('octoprint.key')
+        timeout = self.config.get_value('octoprint.timeout')
+        if len(url) == 0 or len(key) == 0:
+            return OctoprintResult.InvalidConfig
+
+        # Stream body. Unknown size results in chunked transfer encoding.
+        url = urljoin(url, '/api/files/local')
+        headers = { 'X-Api-Key': key, 'Content-Type': body.content_type }
+        data = body if body.sized else iter(body)
+        total = len(body) if body.sized else None
+        body.progress += lambda sent: self.progress(filename, sent, total)
+        response = self._session.post(url, data=data, headers=headers, timeout=timeout)
+
+        # Check HTTP status code
+        code = response.status_code
+        if code == 201: return OctoprintResult.Success
+        if code in (401, 403): return OctoprintResult.Unauthorized
+        if code >= 500: raise requests.exceptions.RetryError(f'Server error {code}')
+        log.error(f'Failed to upload file to octoprint. Response code: {code}')
+        return OctoprintResult.InvalidResponse
+
+    def upload_stream(self, filename:str, content:Callable[[], Iterable[bytes]], size:int=None, retries:int=None) -> OctoprintResult:
+        '''
+        Uploads content returned by given function. Function is called again for each retry.
+        '''
+        if retries is None: retries = self.config.get_value('octoprint.retries')
+        fields = {'select': 'true', 'print': 'false'}
+        retries = max(retries, 0)
+        result = OctoprintResult.GenericError
+        for attempt in range(retries + 1):
+            try:
+                result = self._post(_MultipartBody(fields, filename, content, size), filename)
+                break
+            except requests.exceptions.MissingSchema:
+                result = OctoprintResult.InvalidConfig
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.RetryError) as e:
+                result = OctoprintResult.ConnectionFailed
+                if attempt < retries:
+                    delay = self.backoff * 2**attempt
+                    log.warning(f'Failed to upload {filename} ({e}), retrying in {delay} s')
+                    time.sleep(delay)
+            except Exception as e:
+                # Finished has to be reported no matter what
+                log.exception(f'Failed to upload {filename}: {e}')
+                result = OctoprintResult.GenericError
+                break
+
+        # Log
+        if result == OctoprintResult.Success: log.info(f'File {filename} uploaded to Octoprint')
+        else: log.error(f'Failed to upload {filename} to Octoprint: {result.name}')
+        self.finished(filename, result)
+        return result
+
+    def upload(self, file_path:Path, filename:str=None) -> OctoprintResult:
+        '''
+        Streams file from disk to OctoPrint
+        '''
+        filename = file_path.name if filename is None else filename
+        size = file_path.stat().st_size
+        return self.upload_stream(filename, lambda: self._read_file(file_path), size)
+
+    def upload_all(self, file_paths:List[Path]) -> List[OctoprintResult]:
+        '''
+        Uploads multiple files, reusing the same connection
+        '''
+        return [self.upload(path) for path in file_paths]
+
+    def upload_async(self, file_path:Path, filename:str=None) -> threading.Thread:
+        '''
+        Uploads file in background thread. Results are reported by finished event (called from that thread).
+        '''
+        thread = threading.Thread(target=self.upload, args=(file_path, filename), daemon=True)
+        thread.start()
+        return thread
@@ -1,42 +1,241 @@
-import time
+import os, json, math, time, threading, tracemalloc, functools
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+class PerfStats:
+    '''
+    Timings of all spans with the same name, in miliseconds
+    '''
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.last = 0.0
+        self.first = None # Start of the first span, used for ordering
+        self.compile = 0.0 # Part of total spent compiling numba kernels
+        self.peak_memory = None # Highest memory allocated above span start, in bytes. None if not measured
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    @property
+    def run(self) -> float:
+        '''Total time without compilation'''
+        return self.total - self.compile
+
+    def add(self, start:float, ms:float, memory:int=None, compile:float=0.0):
+        if self.first is None: self.first = start
+        self.count += 1
+        self.total += ms
+        self.compile += compile
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        self.last = ms
+        if memory is not None: self.peak_memory = max(self.peak_memory or 0, memory)
+
+class PerfTrace:
+    '''
+    Collects spans of all PerfTool instances, from all threads, as Chrome trace events.
+    Saved file can be opened in chrome://tracing or https://ui.perfetto.dev
+    '''
+    active:'PerfTrace' = None
+
+    def __init__(self, memory:bool=False):
+        self.memory = memory
+        self.events:List[dict] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def start(memory:bool=False) -> 'PerfTrace':
+        '''Starts collecting spans. With memory set, peak memory of every span is measured with tracemalloc'''
+        trace = PerfTrace(memory)
+        if memory and not tracemalloc.is_tracing(): tracemalloc.start()
+        PerfTrace.active = trace
+        return trace
+
+    def stop(self):
+        if PerfTrace.active is self: PerfTrace.active = None
+        if self.memory and tracemalloc.is_tracing(): tracemalloc.stop()
+
+    def add(self, name:str, start:float, end:float, args:dict):
+        event = {
+            'name': name,
+            'cat': 'flatslicer',
+            'ph': 'X', # Complete event
+            'ts': round((start - self._origin) * 1e6, 3), # us
+            'dur': round((end - start) * 1e6, 3),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def to_json(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+        # Name threads, so they are easier to find
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid in sorted(set(e['tid'] for e in events)):
+            if tid in names:
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': names[tid]}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path:Path):
+        with Path(path).open('w') as f:
+            json.dump(self.to_json(), f)
+
+class _Frame:
+    def __init__(self, path:str, start:float, compile:float, memory:int):
+        self.path = path
+        self.start = start
+        self.compile = compile # Compile clock at span start
+        self.memory = memory # Memory allocated at span start
+        self.peak = memory # Highest memory seen by finished child spans
 
 class PerfTool:
+    '''
+    Measures time of named spans. Spans can be nested (span context manager, trace decorator)
+    or follow each other (tick). Nested span names are joined with '/'.
+    Keeps call count and total, min, mean and max time of every span, optionally peak memory (tracemalloc).
+    All spans are also sent to active PerfTrace.
+    Time spent compiling numba kernels inside spans is kept separately (see JitStats).
+    '''
+    compile_clock = staticmethod(lambda: 0.0) # Seconds spent compiling on current thread, set by JitStats
 
-    def __init__(self):
+    def __init__(self, memory:bool=False):
+        self.memory = memory
+        self.stats:Dict[str, PerfStats] = {}
         self._timer = time.perf_counter()
-        self._history = {}
+        self._compile = PerfTool.compile_clock()
+        self._local = threading.local()
+        self._lock = threading.Lock()
 
     def __str__(self):
-        return ", ".join(f'{k}: {v} ms' for k, v in self._history.items())
+        return ", ".join(f'{k}: {round(v.total, 2)} ms' + (f' ({v.count}x)' if v.count > 1 else '') + \
+            (f' (compile {round(v.compile, 2)} ms)' if v.compile > 0.005 else '') for k, v in self._sorted())
+
+    def _sorted(self):
+        '''Stats in order spans started, parents before children'''
+        with self._lock:
+            return sorted(self.stats.items(), key=lambda item: (item[1].first, item[0].count('/')))
+
+    def _stack(self) -> List[_Frame]:
+        if not hasattr(self._local, 'stack'): self._local.stack = []
+        return self._local.stack
+
+    def _measure_memory(self) -> bool:
+        trace = PerfTrace.active
+        return (self.memory or (trace is not None and trace.memory)) and tracemalloc.is_tracing()
+
+    def _path(self, name:str) -> str:
+        stack = self._stack()
+        return f'{stack[-1].path}/{name}' if stack else name
+
+    def _record(self, path:str, start:float, end:float, memory:int=None, compile:float=0.0):
+        ms = (end - start) * 1000.0
+        with self._lock:
+            if path not in self.stats: self.stats[path] = PerfStats()
+            self.stats[path].add(start, ms, memory, compile * 1000.0)
+        trace = PerfTrace.active
+        if trace is not None:
+            args = {'path': path}
+            if memory is not None: args['peak_memory'] = memory
+            if compile > 0: args['compile_ms'] = round(compile * 1000.0, 3)
+            trace.add(path.rsplit('/', 1)[-1], start, end, args)
 
     def tick(self, tag=''):
         '''
-        Returns time (in miliseconds, rounded to 2 places) elapsed since previous tick call
+        Returns time (in miliseconds, rounded to 2 places) elapsed since previous tick call (or start/end of a span)
+        and adds it to the span with given tag. Empty tag only restarts the timer.
         '''
-        # Calculate elapsed time
-        elapsed = time.perf_counter() - self._timer
-        result = round(elapsed*1000.0, 2)
+        now = time.perf_counter()
+        elapsed = now - self._timer
+        compile = PerfTool.compile_clock()
+        if tag != '': self._record(self._path(tag), self._timer, now, compile=compile - self._compile)
+        self._compile = compile
+        self._timer = time.perf_counter()
+        return round(elapsed*1000.0, 2)
 
-        # Add to history
-        self._history[tag] = result
+    @contextmanager
+    def span(self, name:str):
+        '''
+        Measures code inside the with block. Spans and ticks inside become its children.
+        '''
+        stack = self._stack()
+        memory = None
+        if self._measure_memory():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack and stack[-1].memory is not None: stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            memory = current
+        frame = _Frame(self._path(name), time.perf_counter(), PerfTool.compile_clock(), memory)
+        stack.append(frame)
+        self._timer = frame.start
+        self._compile = frame.compile
+        try:
+            yield frame
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            peak_memory = None
+            if frame.memory is not None and tracemalloc.is_tracing():
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame.peak)
+                peak_memory = peak - frame.memory
+                # Parent peak includes this span, measuring starts again from here
+                if stack and stack[-1].memory is not None: stack[-1].peak = max(stack[-1].peak, peak)
+                tracemalloc.reset_peak()
+            self._compile = PerfTool.compile_clock()
+            self._record(frame.path, frame.start, end, peak_memory, self._compile - frame.compile)
+            self._timer = time.perf_counter()
 
-        # Update timer
-        self._timer = time.perf_counter()
-        return result
+    def trace(self, name:str=None):
+        '''
+        Decorator measuring every call of the function as a span, named after the function by default
+        '''
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
 
     def history(self, tag):
-        return self._history.get(tag, None)
+        '''Returns total time (in miliseconds, rounded to 2 places) of span with given tag'''
+        stats = self.stats.get(tag, None)
+        return round(stats.total, 2) if stats is not None else None
 
     def total(self):
-        return round(sum(self._history.values()), 2)
+        '''Returns total time of top level spans'''
+        return round(sum(v.total for k, v in self.stats.items() if '/' not in k), 2)
+
+    def compile_time(self):
+        '''Returns time spent compiling numba kernels inside top level spans'''
+        return round(sum(v.compile for k, v in self.stats.items() if '/' not in k), 2)
+
+    def report(self) -> str:
+        '''Returns table with statistics of all spans'''
+        lines = [f'{"span":<32} {"count":>6} {"total":>10} {"compile":>10} {"min":>9} {"mean":>9} {"max":>9} {"memory":>10}']
+        for path, v in self._sorted():
+            depth = path.count('/')
+            name = '  ' * depth + path.rsplit('/', 1)[-1]
+            memory = f'{v.peak_memory / 2**20:.1f} MB' if v.peak_memory is not None else '-'
+            lines.append(f'{name:<32} {v.count:>6} {v.total:>8.2f}ms {v.compile:>8.2f}ms {v.min:>7.2f}ms {v.mean:>7.2f}ms {v.max:>7.2f}ms {memory:>10}')
+        return '\n'.join(lines)
 
     @staticmethod
     def decorate(func):
         tool = PerfTool()
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            tool.tick()
-            result = func(*args, **kwargs)
-            tool.tick()
-            print(f'Function {func.__name__} executed in {tool.history(-1)} ms')
+            with tool.span(func.__name__):
+                result = func(*args, **kwargs)
+            print(f'Function {func.__name__} executed in {round(tool.stats[func.__name__].last, 2)} ms')
             return result
-        return wrapper
\ No newline at end of file
+        return wrapper
@@ -0,0 +1,203 @@
+import time, threading
+import logging as log
+from collections import deque
+from typing import Iterable, List
+
+from .events import Event
+from .meatpack import MeatPack
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+class SenderStats:
+    '''
+    Live statistics of streaming
+    '''
+
+    def __init__(self, rx_buffer:int):
+        self.rx_buffer = rx_buffer
+        self.lines_sent = 0
+        self.lines_acked = 0
+        self.bytes_sent = 0
+        self.raw_bytes = 0 # Before encoding
+        self.errors = 0
+        self.buffer_fill = 0 # Bytes currently sitting in controller receive buffer
+        self.buffer_max = 0
+        self._fill_sum = 0
+        self._start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return f'{self.lines_acked} lines, {round(self.lines_per_sec)} lines/s, {round(self.bytes_per_sec)} B/s, '\
+            f'buffer fill: {round(self.mean_fill*100)}% mean, {self.buffer_max}/{self.rx_buffer} B max, '\
+            f'compression: {round(self.compression*100)}%, {self.errors} errors'
+
+    def _update(self, fill:int):
+        self.buffer_fill = fill
+        self.buffer_max = max(self.buffer_max, fill)
+        self._fill_sum += fill
+        self.elapsed = time.perf_counter() - self._start
+
+    @property
+    def lines_per_sec(self) -> float:
+        return self.lines_acked / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes_sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def compression(self) -> float:
+        '''Sent bytes divided by bytes before encoding'''
+        return self.bytes_sent / self.raw_bytes if self.raw_bytes > 0 else 1.0
+
+    @property
+    def mean_fill(self) -> float:
+        '''Mean receive buffer fill (0.0 - 1.0) sampled at every sent line'''
+        return self._fill_sum / self.lines_sent / self.rx_buffer if self.lines_sent > 0 else 0.0
+
+class SerialSender:
+    '''
+    Streams gcode directly to GRBL or Marlin over serial port.
+    Uses character counting flow control: keeps track of bytes in controller's receive buffer
+    and sends next line as soon as it fits, instead of waiting for "ok" after every line.
+    This keeps controller's planner full on dense moves.
+    '''
+
+    def __init__(self, port, rx_buffer:int=128, stall_timeout:float=30.0, encoder:MeatPack=None, marlin:bool=True, off_lines:List[str]=None):
+        self.port = port # Anything with write, readline (pyserial Serial)
+        self.rx_buffer = rx_buffer
+        self.encoder = encoder # Optional, packs lines before sending
+        self.marlin = marlin # Firmware, decides how motion is stopped
+        self.off_lines = off_lines if off_lines is not None else [] # Turn laser off after stopping
+        self.stall_timeout = stall_timeout
+        self.stats:SenderStats = None
+        self.progress = Event() # SenderStats, called about every 0.5 s
+        self._cancel = threading.Event()
+        self._pending = deque() # Length of lines waiting for response
+
+    @staticmethod
+    def open(config, marlin:bool=True, off_lines:List[str]=None) -> 'SerialSender':
+        '''
+        Opens serial port from config. Requires pyserial.
+        '''
+        if serial is None:
+            raise RuntimeError('pyserial is required for streaming to serial port')
+        port = serial.Serial(config.get_value('serial.port'), config.get_value('serial.baudrate'), timeout=0.1)
+        encoder = MeatPack() if config.get_value('serial.encoding') == 'meatpack' else None
+        sender = SerialSender(port, config.get_value('serial.rx_buffer'), encoder=encoder, marlin=marlin, off_lines=off_lines)
+        sender.wake(config.get_value('serial.startup_delay'))
+        return sender
+
+    def close(self) -> None:
+        if self.encoder is not None: self.port.write(self.encoder.stop())
+        self.port.close()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def halt(self) -> None:
+        '''
+        Stops motion that is already buffered by the controller and turns laser off.
+        GRBL gets feed hold and soft reset (realtime, not buffered), Marlin gets quick stop (M410).
+        '''
+        log.warning('Stopping controller')
+        if self.marlin:
+            self.port.write(self._encode('M410'))
+        else:
+            self.port.write(b'!')
+            time.sleep(0.1) # Decelerate before reset, so position is not lost
+            self.port.write(b'\x18')
+        for line in self.off_lines:
+            if len(self._clean(line)) > 0: self.port.write(self._encode(self._clean(line)))
+        self._pending.clear()
+
+    def wake(self, delay:float) -> None:
+        '''
+        Wakes up controller and drops its startup messages
+        '''
+        self.port.write(b'\r\n\r\n')
+        time.sleep(delay)
+        self.port.reset_input_buffer()
+        if self.encoder is not None: self.port.write(self.encoder.start())
+
+    def _encode(self, line:str) -> bytes:
+        return (line + '\n').encode() if self.encoder is None else self.encoder.encode_line(line)
+
+    @staticmethod
+    def _clean(line:str) -> str:
+        # Remove comments and whitespace around
+        return line.split(';', 1)[0].strip()
+
+    def _read(self, block:bool) -> bool:
+        '''
+        Reads single response. Returns False if there was nothing to read.
+        '''
+        if not block and not self.port.in_waiting: return False
+        response = self.port.readline().decode(errors='replace').strip()
+        if len(response) == 0: return False
+        if response.startswith('ok') or response.startswith('error'):
+            if response.startswith('error'):
+                self.stats.errors += 1
+                log.error(f'Controller responded with {response}')
+            if self._pending:
+                self.stats.lines_acked += 1
+                self._pending.popleft()
+        else:
+            log.info(f'Controller: {response}')
+        return True
+
+    def _wait(self, free:int) -> bool:
+        '''
+        Waits until receive buffer has at least given number of free bytes
+        '''
+        last = time.perf_counter()
+        while self._pending and sum(self._pending) + free > self.rx_buffer:
+            if self._cancel.is_set(): return False
+            if self._read(block=True):
+                last = time.perf_counter()
+            elif time.perf_counter() - last > self.stall_timeout:
+                log.error(f'Controller did not respond for {self.stall_timeout} s')
+                return False
+        return True
+
+    def stream(self, lines:Iterable[str]) -> bool:
+        '''
+        Sends lines to the controller. Blocks until all lines are acknowledged.
+        '''
+        self._cancel.clear()
+        self._pending.clear()
+        self.stats = SenderStats(self.rx_buffer)
+        last_report = time.perf_counter()
+
+        for line in lines:
+            if self._cancel.is_set(): return False
+            line = self._clean(line)
+            if len(line) == 0: continue
+            data = self._encode(line)
+            self.stats.raw_bytes += len(line) + 1
+
+            # Read responses that are already there, then wait for room in the buffer
+            while self._read(block=False): pass
+            if not self._wait(min(len(data), self.rx_buffer)): return False
+
+            # Send
+            self.port.write(data)
+            self._pending.append(len(data))
+            self.stats.lines_sent += 1
+            self.stats.bytes_sent += len(data)
+            self.stats._update(sum(self._pending))
+
+            # Report
+            if time.perf_counter() - last_report > 0.5:
+                last_report = time.perf_counter()
+                self.progress(self.stats)
+
+        # Wait for all lines to be processed
+        if not self._wait(self.rx_buffer): return False
+        self.stats._update(0)
+        self.progress(self.stats)
+        log.info(f'Streaming finished, ' + str(self.stats))
+        return True
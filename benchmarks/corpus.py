@@ -0,0 +1,113 @@
+'''
+Deterministic synthetic images for benchmarks. Every image is built from tiles drawn with seeded
+random generators, so the same kind and size always gives the same pixels and large images
+do not need large temporary arrays.
+'''
+import math
+from pathlib import Path
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+KINDS = ['pcb', 'text', 'halftone', 'solid']
+SIZES = [1, 10, 50, 200] # Megapixels
+TILE = 1024
+
+CORPUS_DIR = Path(__file__).resolve().parent / 'corpus'
+FONT_PATH = Path(__file__).resolve().parent.parent / 'assets' / 'fonts' / 'Montserrat-Regular.ttf' # Bundled, sized fonts work on every Pillow
+
+_WORDS = 'laser gcode slicer outline infill polygon trace raster pcb copper etch anodized aluminium burn'.split()
+
+def image_size(megapixels:float):
+    '''Returns width and height of 4:3 image with given number of megapixels, rounded to whole tiles'''
+    height = math.sqrt(megapixels * 1e6 * 3 / 4)
+    tiles_y = max(1, round(height / TILE))
+    tiles_x = max(1, round(megapixels * 1e6 / (tiles_y * TILE) / TILE))
+    return tiles_x * TILE, tiles_y * TILE
+
+def _pcb(draw:ImageDraw.ImageDraw, rng:np.random.Generator):
+    '''Manhattan traces with 45 degree corners ending at round pads, plus rows of IC pads'''
+    for _ in range(40):
+        x, y = rng.integers(16, TILE - 16, 2)
+        width = int(rng.choice([6, 8, 12, 20]))
+        points = [(int(x), int(y))]
+        for _ in range(rng.integers(2, 6)):
+            dx, dy = rng.choice([-1, 0, 1], 2)
+            if dx == 0 and dy == 0: dx = 1
+            length = rng.integers(20, 200)
+            x = int(np.clip(x + dx * length, 16, TILE - 16))
+            y = int(np.clip(y + dy * length, 16, TILE - 16))
+            points.append((x, y))
+        draw.line(points, fill=0, width=width, joint='curve')
+        for px, py in (points[0], points[-1]):
+            r = width + 4
+            draw.ellipse([px - r, py - r, px + r, py + r], fill=0)
+            draw.ellipse([px - r // 3, py - r // 3, px + r // 3, py + r // 3], fill=255) # Drill hole
+    for _ in range(2):
+        x, y = rng.integers(32, TILE - 256, 2)
+        for k in range(16):
+            draw.rectangle([x + k * 14, y, x + k * 14 + 8, y + 24], fill=0)
+
+def _text(draw:ImageDraw.ImageDraw, rng:np.random.Generator, font):
+    '''Lines of small text filling the whole tile'''
+    for y in range(0, TILE, 18):
+        line = ' '.join(rng.choice(_WORDS, 24))
+        draw.text((int(rng.integers(-40, 0)), y), line, fill=0, font=font)
+
+def _halftone(tile:np.ndarray, tx:int, ty:int, width:int, height:int):
+    '''Dots on a regular grid, radius follows smooth gradient over the whole image'''
+    pitch = 12
+    ys, xs = np.mgrid[0:TILE, 0:TILE]
+    gx, gy = xs + tx * TILE, ys + ty * TILE
+    # Distance to center of the grid cell
+    cx = (gx // pitch) * pitch + pitch / 2
+    cy = (gy // pitch) * pitch + pitch / 2
+    tone = 0.5 + 0.25 * np.sin(cx / width * 6.0) + 0.25 * np.cos(cy / height * 4.0)
+    radius = tone * pitch * 0.6
+    tile[(gx - cx)**2 + (gy - cy)**2 < radius**2] = 0
+
+def _solid(draw:ImageDraw.ImageDraw, rng:np.random.Generator):
+    '''Few large filled shapes, some of them with holes'''
+    for _ in range(3):
+        x, y = rng.integers(0, TILE, 2)
+        r = int(rng.integers(120, 400))
+        shape = rng.integers(0, 3)
+        box = [x - r, y - r, x + r, y + r]
+        if shape == 0: draw.ellipse(box, fill=0)
+        elif shape == 1: draw.rectangle(box, fill=0)
+        else:
+            draw.ellipse(box, fill=0)
+            h = r // 2
+            draw.ellipse([x - h, y - h, x + h, y + h], fill=255)
+
+def generate(kind:str, megapixels:float) -> Image.Image:
+    '''Returns grayscale image of given kind and size, black shapes on white background'''
+    if kind not in KINDS:
+        raise ValueError(f'Unknown corpus kind {kind}, available: {", ".join(KINDS)}')
+    width, height = image_size(megapixels)
+    img = Image.new('L', (width, height), 255)
+    font = ImageFont.truetype(str(FONT_PATH), 14) if kind == 'text' else None
+    for ty in range(height // TILE):
+        for tx in range(width // TILE):
+            rng = np.random.default_rng([KINDS.index(kind), ty, tx])
+            if kind == 'halftone':
+                array = np.full((TILE, TILE), 255, dtype=np.uint8)
+                _halftone(array, tx, ty, width, height)
+                tile = Image.fromarray(array)
+            else:
+                tile = Image.new('L', (TILE, TILE), 255)
+                draw = ImageDraw.Draw(tile)
+                if kind == 'pcb': _pcb(draw, rng)
+                elif kind == 'text': _text(draw, rng, font)
+                else: _solid(draw, rng)
+            img.paste(tile, (tx * TILE, ty * TILE))
+    # Keep border white, so background is detected from the corner
+    ImageDraw.Draw(img).rectangle([0, 0, width - 1, height - 1], outline=255, width=16)
+    return img
+
+def corpus_path(kind:str, megapixels:float) -> Path:
+    '''Returns path to the image, generates it on first use'''
+    path = CORPUS_DIR / f'{kind}_{megapixels:g}mp.png'
+    if not path.exists():
+        CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+        generate(kind, megapixels).save(path, dpi=(508, 508))
+    return path
@@ -0,0 +1,172 @@
+'''
+Equivalence harness. Slices the same images with a reference and a candidate engine (config overrides)
+and checks that the candidate burns the same thing: geometry within tolerance, covered area
+and burn coverage of every scanline. Speed of both engines is reported too.
+
+Usage:
+    python benchmarks/equivalence.py                                  # built-in comparisons on 1 MP corpus
+    python benchmarks/equivalence.py --reference infill.mode=greedy --candidate infill.mode=islands
+    python benchmarks/equivalence.py --sizes 1,10 --images extras/test.png
+Exits with code 1 when any candidate differs from its reference.
+'''
+import sys, time, argparse, logging
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from corpus import KINDS, corpus_path
+from app.utils import Config
+from app.slicer import RasterImage, Gcode, LaserMove, LaserArc
+from app.cli import _parse_value
+
+# Name, reference overrides, candidate overrides
+COMPARISONS = [
+    # Short travels between lines are burned (min_travel), so they depend on order of lines
+    ('infill islands', {'infill.mode': 'greedy', 'machine.min_travel': 0.0}, {'infill.mode': 'islands', 'machine.min_travel': 0.0}),
+    # Fixed thread count, so bands are merged even on single core machines (0 would sweep on one thread there)
+    ('threaded sweep', {'machine.threads': 1}, {'machine.threads': 4}),
+    ('outline arcs', {'outline.arc_tolerance': 0.0}, {'outline.arc_tolerance': 0.01}),
+    ('merged moves', {'machine.resolution': 0.0}, {'machine.resolution': 0.01}),
+]
+
+GRID = 0.025 # mm, size of coverage pixel
+MAX_DEVIATION = 0.5 # mm, deviation is not measured above this
+
+def burn_segments(gcode:Gcode) -> np.ndarray:
+    '''Returns burned segments (x0, y0, x1, y1 in mm) of every outline and infill pass, arcs are split into lines'''
+    job = gcode.job
+    pix2mm = 1 / gcode._img.info_mm2pix
+    segments = []
+    for block in (job.infill, job.outline):
+        if block.passes <= 0: continue
+        x, y = 0.0, 0.0
+        for cmd in block.commands:
+            if not isinstance(cmd, LaserMove) or (cmd.x is None and cmd.y is None): continue
+            if isinstance(cmd, LaserArc): points = cmd.interpolate(x, y, step=np.pi / 64)
+            else: points = [(cmd.x if cmd.x is not None else x, cmd.y if cmd.y is not None else y)]
+            for px, py in points:
+                if not cmd.rapid: segments.append((x, y, px, py))
+                x, y = px, py
+    return np.array(segments, dtype=np.float64).reshape(-1, 4) * pix2mm
+
+def coverage(segments:np.ndarray, shape) -> np.ndarray:
+    '''Rasterizes segments to boolean mask with GRID sized pixels'''
+    mask = np.zeros(shape, dtype=bool)
+    if len(segments) == 0: return mask
+    length = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+    steps = np.maximum(np.ceil(length / (GRID / 2)).astype(np.int64), 1) + 1
+    idx = np.repeat(np.arange(len(segments)), steps)
+    t = (np.arange(len(idx)) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(steps - 1, steps)
+    xs = segments[idx, 0] + t * (segments[idx, 2] - segments[idx, 0])
+    ys = segments[idx, 1] + t * (segments[idx, 3] - segments[idx, 1])
+    cols = np.clip((xs / GRID).astype(np.int64), 0, shape[1] - 1)
+    rows = np.clip((ys / GRID).astype(np.int64), 0, shape[0] - 1)
+    mask[rows, cols] = True
+    return mask
+
+def _dilate(mask:np.ndarray) -> np.ndarray:
+    result = mask.copy()
+    result[1:] |= mask[:-1]
+    result[:-1] |= mask[1:]
+    grown = result.copy()
+    grown[:, 1:] |= result[:, :-1]
+    grown[:, :-1] |= result[:, 1:]
+    return grown
+
+def deviation(a:np.ndarray, b:np.ndarray) -> float:
+    '''Returns (approximate) largest distance in mm from burned pixel of a to the closest burned pixel of b'''
+    if not a.any(): return 0.0
+    if not b.any(): return np.inf
+    grown, steps = b, 0
+    while (a & ~grown).any():
+        steps += 1
+        if steps * GRID > MAX_DEVIATION: return np.inf
+        grown = _dilate(grown)
+    return steps * GRID
+
+def _missing(a:np.ndarray, b:np.ndarray, tolerance:float) -> np.ndarray:
+    '''Returns fraction of burned pixels of every row of a that are further than tolerance from b'''
+    grown = b
+    for _ in range(int(np.ceil(tolerance / GRID))): grown = _dilate(grown)
+    return (a & ~grown).sum(axis=1) / np.maximum(a.sum(axis=1), 1)
+
+def compare(reference:Gcode, candidate:Gcode, tolerance:float) -> dict:
+    '''Compares burned geometry of two results of the same image'''
+    img = reference._img
+    shape = (int(img.info_height / GRID) + 2, int(img.pixels.shape[1] / img.info_mm2pix / GRID) + 2)
+    a = coverage(burn_segments(reference), shape)
+    b = coverage(burn_segments(candidate), shape)
+    area_a, area_b = a.sum(), b.sum()
+    # Scanline is changed when more than 1% of it is burned only by one of the engines
+    changed = (_missing(a, b, tolerance) > 0.01) | (_missing(b, a, tolerance) > 0.01)
+    burned = (a.sum(axis=1) > 0) | (b.sum(axis=1) > 0)
+    return {
+        'deviation': max(deviation(a, b), deviation(b, a)),
+        'area': (area_b - area_a) / max(area_a, 1), # Relative change of covered area
+        'rows': float(changed.sum() / max(burned.sum(), 1)), # Fraction of burned scanlines that changed
+    }
+
+def _config(overrides:dict) -> Config:
+    config = Config()
+    config.set_value('outline.passes', 1)
+    config.set_value('infill.passes', 1)
+    config.set_value('machine.order_time', 0.1)
+    for key, value in overrides.items(): config.set_value(key, value)
+    return config
+
+def _slice(path:Path, overrides:dict):
+    '''Returns generated gcode and time (in seconds) of tracing and generating'''
+    img = RasterImage(path)
+    if not img.load(): raise RuntimeError(f'Failed to load {path}')
+    config = _config(overrides)
+    t = time.perf_counter()
+    img.trace(config)
+    gcode = Gcode(img)
+    gcode.generate(config)
+    return gcode, time.perf_counter() - t
+
+def _overrides(items) -> dict:
+    config = Config()
+    result = {}
+    for item in items:
+        key, _, value = item.partition('=')
+        result[key] = _parse_value(config, key, value)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Checks that alternative engines burn the same geometry')
+    parser.add_argument('--reference', action='append', default=[], metavar='KEY=VALUE', help='Config override of reference engine')
+    parser.add_argument('--candidate', action='append', default=[], metavar='KEY=VALUE', help='Config override of candidate engine')
+    parser.add_argument('--sizes', default='1', help='Comma separated corpus sizes in megapixels')
+    parser.add_argument('--kinds', default=','.join(KINDS), help='Comma separated corpus kinds')
+    parser.add_argument('--images', nargs='*', type=Path, default=[ROOT / 'extras' / 'test.png'], help='Additional images')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='Allowed geometry deviation in mm')
+    parser.add_argument('--area', type=float, default=0.01, help='Allowed relative change of covered area')
+    parser.add_argument('--rows', type=float, default=0.01, help='Allowed fraction of scanlines with changed coverage')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    comparisons = COMPARISONS
+    if args.reference or args.candidate:
+        comparisons = [('custom', _overrides(args.reference), _overrides(args.candidate))]
+    images = [corpus_path(kind, float(size)) for size in args.sizes.split(',') for kind in args.kinds.split(',')] + args.images
+
+    failures = 0
+    print(f'{"comparison":<16} {"image":<18} {"reference":>10} {"candidate":>10} {"speedup":>8} {"deviation":>10} {"area":>8} {"rows":>7}')
+    for name, reference, candidate in comparisons:
+        for path in images:
+            ref, ref_time = _slice(path, reference)
+            cand, cand_time = _slice(path, candidate)
+            result = compare(ref, cand, args.tolerance)
+            ok = result['deviation'] <= args.tolerance and abs(result['area']) <= args.area and result['rows'] <= args.rows
+            failures += not ok
+            print(f'{name:<16} {path.stem:<18} {ref_time:>9.3f}s {cand_time:>9.3f}s {ref_time / max(cand_time, 1e-9):>7.2f}x '\
+                f'{result["deviation"]:>8.3f}mm {result["area"]*100:>7.2f}% {result["rows"]*100:>6.2f}% {"ok" if ok else "FAIL"}')
+    print('FAIL' if failures else 'PASS', f'({failures} differences)' if failures else '')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+'''
+Times infill scanline sweep at several angles. Rotated sweep should cost the same as horizontal one.
+Usage: python benchmarks/infill_angle.py [repeats]
+'''
+import sys, time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.slicer.infill import scan_segments
+
+ANGLES = [0, 15, 30, 45, 90]
+
+def make_polygons(count:int=2000, size:float=4000.0, seed:int=0):
+    '''Random closed polygons (circles with noisy radius) spread over square of given size'''
+    rng = np.random.default_rng(seed)
+    polygons = []
+    for _ in range(count):
+        n = int(rng.integers(8, 64))
+        t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+        r = rng.uniform(5, 60) * rng.uniform(0.7, 1.0, n)
+        points = np.stack([np.cos(t) * r, np.sin(t) * r], axis=1) + rng.uniform(0, size, 2)
+        polygons.append(np.concatenate([points, points[:1]]))
+    return polygons
+
+def scanlines(polygons, angle:float, spacing:float=1.0) -> np.ndarray:
+    c, s = np.cos(angle), np.sin(angle)
+    y = np.concatenate([p[:, 0] * s + p[:, 1] * c for p in polygons])
+    return np.arange(y.min(), y.max(), spacing)
+
+def main(repeats:int=5):
+    polygons = make_polygons()
+    scan_segments(polygons, scanlines(polygons, 0.0), threads=1) # Compile
+    print(f'{"angle":>6} {"lines":>7} {"segments":>9} {"best [ms]":>10} {"per line [us]":>14}')
+    for degrees in ANGLES:
+        angle = np.radians(degrees)
+        ys = scanlines(polygons, angle)
+        times = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            x0, _, _, _ = scan_segments(polygons, ys, threads=1, angle=angle)
+            times.append(time.perf_counter() - t)
+        best = min(times)
+        print(f'{degrees:>6} {len(ys):>7} {len(x0):>9} {best * 1e3:>10.2f} {best / len(ys) * 1e6:>14.2f}')
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,156 @@
+'''
+Slicing benchmark. Times RasterImage.load, trace, Gcode.generate and output serialization
+on synthetic images and compares results with stored baselines.
+
+Usage:
+    python benchmarks/run.py                      # 1 and 10 MP, all kinds
+    python benchmarks/run.py --sizes 1,10,50,200  # full corpus
+    python benchmarks/run.py --update             # store results as new baseline
+    python benchmarks/run.py --jit                # print compile time of every numba kernel
+Exits with code 1 when any stage is slower (or uses more memory) than baseline by more than threshold,
+and with code 2 when a case has no baseline (store it with --update).
+Stage times are measured after a cold run, numba compile time (import and first calls) is reported in jit column
+and stored per kernel in the result.
+'''
+import sys, json, time, argparse, subprocess, logging
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from corpus import KINDS, SIZES, corpus_path
+
+STAGES = ['load', 'trace', 'generate', 'output']
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+try:
+    import resource
+except ImportError:
+    resource = None # Windows, peak memory is not measured
+
+def _peak_memory_mb():
+    if resource is None: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == 'darwin' else 2**10), 1) # Bytes on macOS, KB on Linux
+
+def _config():
+    from app.utils import Config
+    config = Config()
+    config.set_value('outline.passes', 1)
+    config.set_value('infill.passes', 1)
+    return config
+
+def _slice(path:Path, config) -> dict:
+    '''
+    Runs the whole pipeline once, returns time of every stage in seconds
+    '''
+    from app.slicer import RasterImage, Gcode
+    times = {}
+    def measure(stage, func):
+        t = time.perf_counter()
+        result = func()
+        times[stage] = time.perf_counter() - t
+        return result
+
+    img = RasterImage(path)
+    if not measure('load', img.load): raise RuntimeError(f'Failed to load {path}')
+    measure('trace', lambda: img.trace(config))
+    gcode = Gcode(img)
+    measure('generate', lambda: gcode.generate(config))
+    size = measure('output', lambda: sum(len(block) for block in gcode.iter_output()))
+    return {'times': times, 'polygons': img.info_numpolygons, 'bytes': size}
+
+def run_case(kind:str, megapixels:float) -> dict:
+    '''Measures one image, called in a fresh process so peak memory belongs to this case only'''
+    t = time.perf_counter()
+    from app.utils import JitStats
+    import app.slicer # Kernels with signatures are compiled on import
+    startup = time.perf_counter() - t
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = None # Corpus is generated locally, 200 MP is above Pillow's decompression bomb limit
+    config = _config()
+    # Cold run compiles the rest of numba functions, so compilation is not part of measured times
+    cold = _slice(corpus_path('pcb', 1), config)
+    result = _slice(corpus_path(kind, megapixels), config)
+    kernels = {name: {'count': stats.count, 'total': round(stats.total, 2)} for name, stats in JitStats.kernels.items()} # ms
+    result['jit'] = {'startup': startup, 'compile': JitStats.total() / 1000.0, 'cold': cold['times'], 'kernels': kernels}
+    result['memory'] = _peak_memory_mb()
+    return result
+
+def compare(name:str, result:dict, baseline:dict, threshold:float) -> list:
+    '''Returns descriptions of stages that regressed'''
+    failures = []
+    for stage, value in result['times'].items():
+        base = baseline['times'].get(stage)
+        # Very short stages are too noisy to compare
+        if base is None or max(base, value) < 0.05: continue
+        if value > base * (1 + threshold):
+            failures.append(f'{name} {stage}: {value:.3f} s, baseline {base:.3f} s (+{(value / base - 1) * 100:.0f}%)')
+    base, value = baseline.get('jit', {}).get('compile'), result['jit']['compile']
+    if base is not None and value > base * (1 + threshold):
+        failures.append(f'{name} jit compile: {value:.3f} s, baseline {base:.3f} s (+{(value / base - 1) * 100:.0f}%)')
+    if result.get('memory') is not None and baseline.get('memory') is not None:
+        if result['memory'] > baseline['memory'] * (1 + threshold):
+            failures.append(f'{name} memory: {result["memory"]} MB, baseline {baseline["memory"]} MB')
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='FlatSlicer slicing benchmark')
+    parser.add_argument('--sizes', default='1,10', help=f'Comma separated sizes in megapixels, corpus has {",".join(map(str, SIZES))}')
+    parser.add_argument('--kinds', default=','.join(KINDS), help='Comma separated image kinds')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown, 0.25 means 25%%')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update', action='store_true', help='Store results as new baseline')
+    parser.add_argument('--jit', action='store_true', help='Print compile time of every numba kernel')
+    parser.add_argument('--case', help=argparse.SUPPRESS) # kind:megapixels, runs single case and prints json
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.case:
+        kind, megapixels = args.case.split(':')
+        result = run_case(kind, float(megapixels))
+        from app.utils import JitStats
+        print(JitStats.report()) # Shown with --jit, result is the last line
+        print(json.dumps(result))
+        return 0
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    results, failures, missing, errors = {}, [], [], []
+    print(f'{"case":<16} ' + ' '.join(f'{s:>9}' for s in STAGES) + f' {"jit":>9} {"memory":>9} {"polygons":>9} {"bytes":>11}')
+    for megapixels in [float(s) for s in args.sizes.split(',')]:
+        for kind in args.kinds.split(','):
+            name = f'{kind}_{megapixels:g}mp'
+            corpus_path(kind, megapixels) # Generate outside of measured process
+            out = subprocess.run([sys.executable, __file__, '--case', f'{kind}:{megapixels:g}'], capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f'{name:<16} failed\n{out.stderr}')
+                errors.append(name)
+                continue
+            lines = out.stdout.strip().splitlines()
+            result = json.loads(lines[-1])
+            results[name] = result
+            memory = f'{result["memory"]:.0f} MB' if result['memory'] is not None else '-'
+            baseline = baselines.get(name)
+            status = '' if baseline is not None else ' no baseline'
+            print(f'{name:<16} ' + ' '.join(f'{result["times"][s]:>8.3f}s' for s in STAGES) + f' {result["jit"]["compile"]:>8.3f}s {memory:>9} {result["polygons"]:>9} {result["bytes"]:>11}{status}')
+            if args.jit: print('\n'.join(lines[:-1]) + '\n')
+            # Case without baseline is not compared, so it must not look like it passed
+            if baseline is None: missing.append(name)
+            else: failures += compare(name, result, baseline, args.threshold)
+
+    if args.update:
+        baselines.update(results)
+        args.baseline.write_text(json.dumps(baselines, indent=2) + '\n')
+        print(f'Baseline saved to {args.baseline}')
+        for name in errors: print('FAIL', f'{name}: failed, baseline not updated')
+        return 1 if errors else 0
+    for name in errors: print('FAIL', f'{name}: failed')
+    for failure in failures: print('FAIL', failure)
+    for name in missing: print('NO BASELINE', name)
+    status = 'FAIL' if failures or errors else 'NO BASELINE' if missing else 'PASS'
+    print(status, f'({len(results)} cases, {len(missing)} without baseline, threshold {args.threshold * 100:.0f}%)')
+    return 1 if failures or errors else 2 if missing else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
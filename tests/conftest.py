@@ -0,0 +1,78 @@
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.utils import Config, OctoprintUploader
+
+
+class _Handler(BaseHTTPRequestHandler):
+    '''Stand-in for OctoPrint /api/files/local endpoint'''
+    protocol_version = 'HTTP/1.1' # Keep-alive, so connection reuse can be checked
+
+    def _body(self) -> bytes:
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            self.server.chunked.append(True)
+            data = b''
+            while True:
+                line = self.rfile.readline()
+                if not line: return None # Client dropped the request
+                size = int(line.split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return data
+                data += self.rfile.read(size)
+                self.rfile.readline()
+        self.server.chunked.append(False)
+        return self.rfile.read(int(self.headers['Content-Length']))
+
+    def do_POST(self):
+        body = self._body()
+        if body is None:
+            self.server.truncated += 1
+            self.close_connection = True
+            return
+        self.server.ports.append(self.client_address[1])
+        code = 201
+        if self.path != '/api/files/local': code = 404
+        elif self.headers.get('X-Api-Key') != 'key': code = 401
+        elif self.server.failures > 0:
+            self.server.failures -= 1
+            code = 500
+        else:
+            # Parse multipart form
+            message = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n' + body)
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                self.server.fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        self.send_response(code)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.ports, httpd.chunked, httpd.fields, httpd.failures, httpd.truncated = [], [], {}, 0, 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def uploader(server):
+    config = Config()
+    config.set_value('octoprint.url', f'http://127.0.0.1:{server.server_address[1]}')
+    config.set_value('octoprint.key', 'key')
+    config.set_value('octoprint.retries', 3)
+    uploader = OctoprintUploader(config, chunk_size=1000, backoff=0.001)
+    yield uploader
+    uploader.close()
@@ -0,0 +1,18 @@
+from app.slicer.commands import LaserMove, LaserSpeed, LaserUnit
+from app.slicer.compact import CompactEncoder
+
+
+def _moves(points):
+    return [LaserMove(x, y, None, LaserUnit.Milimeters, rapid=False) for x, y in points]
+
+def test_relative_pass_lines():
+    encoder = CompactEncoder(0.01, relative=True)
+    lines = list(encoder.encode([LaserSpeed(10)] + _moves([(1.0, 2.0), (1.5, 2.0), (1.5, 2.25)]), relative=True))
+    assert all('\n' not in line for line in lines)
+    assert lines == ['G1 X1 Y2 F600', 'G91', 'G1 X0.5', 'G1 Y0.25', 'G90']
+    assert encoder.bytes_compact == sum(len(line) + 1 for line in lines)
+
+def test_absolute_pass():
+    encoder = CompactEncoder(0.01)
+    lines = list(encoder.encode(_moves([(1.0, 2.0), (1.504, 2.0)])))
+    assert lines == ['G1 X1 Y2', 'G1 X1.5']
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from app.slicer.export import ExportPipeline
+
+
+class _Gcode:
+    '''Stands in for Gcode, fails after given number of blocks'''
+    def __init__(self, blocks:int, fail:bool):
+        self.blocks = blocks
+        self.fail = fail
+
+    def iter_output(self):
+        for i in range(self.blocks):
+            yield ''.join(f'G1 X{i} Y{k}\n' for k in range(1000))
+        if self.fail: raise RuntimeError('generation failed')
+
+
+@pytest.mark.parametrize('suffix', ['.gcode', '.gcode.gz'])
+def test_export_and_upload(server, uploader, tmp_path, suffix):
+    path = tmp_path / ('job' + suffix)
+    pipeline = ExportPipeline(_Gcode(20, False), path, uploader)
+    assert pipeline.run()
+    assert path.exists()
+    assert len(server.fields['file'][1]) == pipeline.info_bytes
+
+@pytest.mark.parametrize('suffix', ['.gcode', '.gcode.gz'])
+def test_failed_generation_drops_output(server, uploader, tmp_path, suffix):
+    path = tmp_path / ('job' + suffix)
+    pipeline = ExportPipeline(_Gcode(20, True), path, uploader)
+    with pytest.raises(RuntimeError, match='generation failed'):
+        pipeline.run()
+    assert not path.exists()
+    assert 'file' not in server.fields # Upload was never finished
+    deadline = time.monotonic() + 2.0
+    while server.truncated == 0 and time.monotonic() < deadline: time.sleep(0.01) # Server sees closed connection later
+    assert server.truncated == 1
+    assert pipeline.upload_result != pipeline.upload_result.Success
@@ -0,0 +1,76 @@
+import pytest
+
+from app.utils import OctoprintResult
+
+
+CONTENT = b''.join(f'G1 X{i} Y{i}\n'.encode() for i in range(5000))
+
+def _chunks():
+    for i in range(0, len(CONTENT), 4096):
+        yield CONTENT[i:i+4096]
+
+def test_chunked_multipart(server, uploader):
+    assert uploader.upload_stream('job.gcode', _chunks) == OctoprintResult.Success
+    assert server.chunked == [True]
+    assert server.fields['file'] == ('job.gcode', CONTENT)
+    assert server.fields['select'][1] == b'true'
+    assert server.fields['print'][1] == b'false'
+
+def test_sized_file(server, uploader, tmp_path):
+    path = tmp_path / 'job.gcode'
+    path.write_bytes(CONTENT)
+    assert uploader.upload(path) == OctoprintResult.Success
+    assert server.chunked == [False]
+    assert server.fields['file'] == ('job.gcode', CONTENT)
+
+def test_connection_reuse(server, uploader):
+    for _ in range(3):
+        assert uploader.upload_stream('job.gcode', _chunks) == OctoprintResult.Success
+    assert len(server.ports) == 3
+    assert len(set(server.ports)) == 1
+
+def test_retry_backoff(server, uploader, monkeypatch):
+    delays = []
+    monkeypatch.setattr('app.utils.octoprint.time.sleep', delays.append)
+    server.failures = 2
+    assert uploader.upload_stream('job.gcode', _chunks) == OctoprintResult.Success
+    assert len(server.ports) == 3
+    assert delays == [0.001, 0.002]
+    assert server.fields['file'][1] == CONTENT # Content is generated again for the retry
+
+def test_retries_exhausted(server, uploader, monkeypatch):
+    monkeypatch.setattr('app.utils.octoprint.time.sleep', lambda s: None)
+    server.failures = 10
+    finished = []
+    uploader.finished += lambda name, result: finished.append(result)
+    assert uploader.upload_stream('job.gcode', _chunks, retries=1) == OctoprintResult.ConnectionFailed
+    assert len(server.ports) == 2
+    assert finished == [OctoprintResult.ConnectionFailed]
+
+def test_negative_retries(server, uploader):
+    assert uploader.upload_stream('job.gcode', _chunks, retries=-1) == OctoprintResult.Success
+    assert len(server.ports) == 1
+
+def test_unexpected_error_finishes(uploader):
+    def broken():
+        raise RuntimeError('generator failed')
+        yield b''
+    finished = []
+    uploader.finished += lambda name, result: finished.append(result)
+    assert uploader.upload_stream('job.gcode', broken) == OctoprintResult.GenericError
+    assert finished == [OctoprintResult.GenericError]
+
+def test_unauthorized(server, uploader):
+    uploader.config.set_value('octoprint.key', 'wrong')
+    assert uploader.upload_stream('job.gcode', _chunks) == OctoprintResult.Unauthorized
+
+def test_progress(server, uploader, tmp_path):
+    path = tmp_path / 'job.gcode'
+    path.write_bytes(CONTENT)
+    progress = []
+    uploader.progress += lambda name, sent, total: progress.append((sent, total))
+    assert uploader.upload(path) == OctoprintResult.Success
+    sent = [s for s, _ in progress]
+    assert sent == sorted(sent)
+    assert progress[-1][0] == progress[-1][1] # Whole body reported
+    assert progress[-1][1] > len(CONTENT)
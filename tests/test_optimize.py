@@ -0,0 +1,47 @@
+import numpy as np
+
+from app.slicer.job import LaserMove, LaserUnit
+from app.slicer.optimize import merge_moves
+
+
+def _path(points):
+    return [LaserMove(x, y, None, LaserUnit.Pixels, rapid=(i == 0)) for i, (x, y) in enumerate(points)]
+
+def _points(commands):
+    x, y, result = 0.0, 0.0, []
+    for cmd in commands:
+        x = cmd.x if cmd.x is not None else x
+        y = cmd.y if cmd.y is not None else y
+        result.append((x, y))
+    return np.array(result)
+
+def _deviation(original, merged):
+    '''Largest distance of original vertices from merged polyline'''
+    a, c = merged[:-1], merged[1:]
+    ac = c - a
+    worst = 0.0
+    for p in original:
+        ap = p - a
+        t = np.clip((ap * ac).sum(axis=1) / np.maximum((ac * ac).sum(axis=1), 1e-18), 0.0, 1.0)
+        worst = max(worst, np.hypot(*(ap - t[:, None] * ac).T).min())
+    return worst
+
+def test_random_walk_within_tolerance():
+    rng = np.random.default_rng(1)
+    original = np.cumsum(rng.normal(0.0, 1.0, (400, 2)), axis=0)
+    merged, removed = merge_moves(_path(original), 1.0)
+    assert sum(removed) > 0
+    merged = _points(merged)
+    assert np.allclose(merged[0], original[0]) and np.allclose(merged[-1], original[-1])
+    assert _deviation(original, merged) < 1.0
+
+def test_collinear_merged():
+    original = np.array([(x, 0.0) for x in range(100)] + [(99.0, y) for y in range(1, 50)])
+    merged, _ = merge_moves(_path(original), 0.01)
+    assert np.allclose(_points(merged), [(0, 0), (99, 0), (99, 49)])
+
+def test_wiggle_kept():
+    # Every vertex alone is within tolerance of its neighbours, but the wiggle as a whole is not
+    original = np.array([(x, 0.6 * np.sin(x / 10)) for x in range(200)], dtype=np.float64)
+    merged, _ = merge_moves(_path(original), 0.1)
+    assert _deviation(original, _points(merged)) < 0.1
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+from app.utils import Config
+from app.slicer import RasterImage, Gcode
+
+IMAGE = Path(__file__).parent.parent / 'extras' / 'test.png'
+
+
+def _generate(**values):
+    config = Config()
+    for key, value in values.items(): config.set_value(key.replace('__', '.'), value)
+    img = RasterImage(IMAGE)
+    img.load()
+    img.trace(config)
+    gcode = Gcode(img)
+    gcode.generate(config)
+    return gcode
+
+def test_raster_refused_without_inline_power():
+    with pytest.raises(ValueError, match='inline power'):
+        _generate(raster__passes=1, machine__dialect='marlin_fan')
+
+@pytest.mark.parametrize('dialect', ['marlin_inline', 'grbl'])
+def test_raster_has_no_planner_syncs(dialect):
+    gcode = _generate(raster__passes=1, outline__passes=0, infill__passes=0, machine__dialect=dialect)
+    lines = list(gcode.iter_lines())
+    assert 'M400' not in lines
+    assert sum(' S' in line for line in lines if line.startswith('G1')) > 100
+
+def test_overscan_stays_on_machine():
+    gcode = _generate(raster__passes=1, outline__passes=0, machine__dialect='marlin_inline', image__offset__x=0.0)
+    xs = [float(word[1:]) for line in gcode.iter_lines() if line.startswith('G') for word in line.split() if word[0] == 'X']
+    assert min(xs) >= -0.5 / gcode._img.info_mm2pix # Left edge of the first pixel
+
+def test_sweep_time_includes_overscan():
+    gcode = _generate(raster__passes=1, outline__passes=0, machine__dialect='marlin_inline', raster__overscan=0.0)
+    full, trimmed = gcode.info_raster_time
+    gcode = _generate(raster__passes=1, outline__passes=0, machine__dialect='marlin_inline', raster__overscan=5.0)
+    full_overscan, trimmed_overscan = gcode.info_raster_time
+    assert trimmed <= full and trimmed_overscan <= full_overscan
+    assert full_overscan > full
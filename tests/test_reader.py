@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.utils import Config
+from app.utils.compression import zstandard
+from app.slicer import RasterImage, Gcode, ExportPipeline, MotionTable, read_file, to_pixels, origin_pixels
+from app.slicer.job import LaserMove, LaserUnit
+
+IMAGE = Path(__file__).parent.parent / 'extras' / 'test.png'
+
+
+@pytest.fixture(scope='module')
+def generated():
+    config = Config()
+    config.set_value('infill.passes', 1)
+    config.set_value('outline.passes', 1)
+    img = RasterImage(IMAGE)
+    img.load()
+    img.trace(config)
+    gcode = Gcode(img)
+    gcode.generate(config)
+    return config, img, gcode
+
+@pytest.mark.parametrize('suffix', ['.gcode', '.gcode.gz', '.gcode.zst'])
+def test_exported_file_preview(generated, tmp_path, suffix):
+    if suffix.endswith('.zst') and zstandard is None: pytest.skip('zstandard is not installed')
+    config, img, gcode = generated
+    path = tmp_path / ('test' + suffix)
+    assert ExportPipeline(gcode, path).run()
+
+    offset = [config.get_value(f'image.offset.{axis}') for axis in 'xyz']
+    commands = to_pixels(read_file(path), img.info_height, img.info_mm2pix, offset)
+    motion = MotionTable.from_commands(commands, 1 / img.info_mm2pix, start=origin_pixels(img.info_height, img.info_mm2pix, offset))
+    # Burned path is the same, up to rounding of written coordinates.
+    # Footer returns to the origin with G1 after laser is turned off, it is not part of the job.
+    burn = ~motion.rapid[:-1]
+    assert motion.dist[:-1][burn].sum() == pytest.approx(gcode.metrics.burn_length, rel=1e-3)
+    # Preview lands on the image
+    points = motion.points[1:-1][burn]
+    assert np.all(points >= -1) and np.all(points <= np.array(img.pixels.shape[::-1]) + 1)
+
+def test_motion_counts_first_move():
+    commands = [LaserMove(3, 4, None, LaserUnit.Pixels, rapid=True), LaserMove(3, 8, None, LaserUnit.Pixels, rapid=False)]
+    motion = MotionTable.from_commands(commands, 0.5, speed=10, accel=100, start=(0, 0))
+    assert motion.points.tolist() == [[0, 0], [3, 4], [3, 8]]
+    assert motion.rapid.tolist() == [True, False]
+    assert motion.dist.tolist() == [2.5, 2.0] # Travel from the start is counted
+    assert motion.duration > 0
@@ -0,0 +1,123 @@
+import os, threading, time
+
+import pytest
+
+serial = pytest.importorskip('serial')
+pty = pytest.importorskip('pty')
+tty = pytest.importorskip('tty')
+
+from app.utils import SerialSender
+
+
+class FakeGrbl:
+    '''
+    Controller on the master side of pseudo terminal. Executes one line at a time and answers "ok",
+    fails if the receive buffer would overflow.
+    '''
+
+    def __init__(self, fd:int, rx_buffer:int=128, delay:float=0.0005):
+        self.fd = fd
+        self.rx_buffer = rx_buffer
+        self.delay = delay
+        self.lines = []
+        self.received = b''
+        self.buffer_max = 0
+        self.overflow = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buffer = b''
+        os.set_blocking(self.fd, False)
+        while not self._stop.is_set():
+            try:
+                data = os.read(self.fd, 4096)
+                self.received += data
+                buffer += data
+            except (BlockingIOError, OSError):
+                pass
+            self.buffer_max = max(self.buffer_max, len(buffer))
+            if len(buffer) > self.rx_buffer: self.overflow = True
+            if b'\n' not in buffer:
+                time.sleep(0.0002)
+                continue
+            # Execute line, then free its bytes
+            line, buffer = buffer.split(b'\n', 1)
+            time.sleep(self.delay)
+            self.lines.append(line.decode())
+            self._answer(line)
+
+    def _answer(self, line:bytes):
+        os.write(self.fd, b'ok\n')
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+@pytest.fixture
+def link():
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=0.1)
+    yield master, port
+    port.close()
+    os.close(slave)
+    os.close(master)
+
+
+LINES = [f'G1 X{i * 0.125:.3f} Y{i * 0.25:.3f} S{i % 1000} ; move {i}' for i in range(2000)]
+
+def test_stream_respects_rx_buffer(link):
+    master, port = link
+    grbl = FakeGrbl(master)
+    sender = SerialSender(port, rx_buffer=128, stall_timeout=5.0)
+    assert sender.stream(LINES)
+    grbl.stop()
+    assert not grbl.overflow
+    assert grbl.buffer_max <= 128
+    assert grbl.buffer_max > 64 # More than one line is in flight
+    assert grbl.lines == [SerialSender._clean(line) for line in LINES]
+    assert sender.stats.lines_acked == len(LINES)
+    assert sender.stats.errors == 0
+
+def test_stream_counts_errors(link):
+    master, port = link
+    class ErrorGrbl(FakeGrbl):
+        def _answer(self, line):
+            os.write(self.fd, b'error:20\n' if line.startswith(b'M7') else b'ok\n')
+    grbl = ErrorGrbl(master)
+    sender = SerialSender(port, rx_buffer=128, stall_timeout=5.0)
+    assert sender.stream(['G0 X1', 'M7', 'G0 X2', 'M7'])
+    grbl.stop()
+    assert sender.stats.errors == 2
+    assert sender.stats.lines_acked == 4
+
+def test_cancel(link):
+    master, port = link
+    grbl = FakeGrbl(master, delay=0.005)
+    sender = SerialSender(port, rx_buffer=128, stall_timeout=5.0)
+    sender.progress += lambda stats: sender.cancel()
+    assert not sender.stream(iter(LINES))
+    grbl.stop()
+    assert len(grbl.lines) < len(LINES)
+
+def test_stall(link):
+    master, port = link
+    sender = SerialSender(port, rx_buffer=128, stall_timeout=0.3)
+    assert not sender.stream(LINES[:100]) # Nobody answers
+
+@pytest.mark.parametrize('marlin, stop, off', [(True, b'M410\n', b'M107 P1\n'), (False, b'!\x18', b'M5\n')])
+def test_halt_after_cancel(link, marlin, stop, off):
+    master, port = link
+    grbl = FakeGrbl(master, delay=0.005)
+    sender = SerialSender(port, rx_buffer=128, stall_timeout=5.0, marlin=marlin, off_lines=['M107 P1' if marlin else 'M5'])
+    sender.progress += lambda stats: sender.cancel()
+    assert not sender.stream(iter(LINES))
+    sender.halt()
+    time.sleep(0.2)
+    grbl.stop()
+    tail = grbl.received[-len(stop) - len(off):]
+    assert tail == stop + off
@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.utils import Config
+from app.slicer import VectorImage
+from app.slicer.vector import PREVIEW_PIXELS
+
+SVG = '''<svg xmlns="http://www.w3.org/2000/svg" width="400mm" height="300mm" viewBox="0 0 400 300">
+<rect x="0" y="0" width="400" height="300" fill="black"/>
+<circle cx="200" cy="150" r="100" fill="white"/>
+</svg>'''
+
+
+def _load(tmp_path, dpi):
+    path = tmp_path / 'drawing.svg'
+    path.write_text(SVG)
+    config = Config()
+    config.set_value('image.dpi', dpi)
+    img = VectorImage(path)
+    assert img.load(config.get_value('image.tolerance'))
+    img.trace(config)
+    return img
+
+def test_preview_resolution_capped(tmp_path):
+    img = _load(tmp_path, 1000)
+    width, height = img.raster_size
+    assert width * height > 10 * PREVIEW_PIXELS
+    img.render()
+    assert img.image.width * img.image.height <= PREVIEW_PIXELS
+    assert img.image.width == int(width * img.image_scale)
+    # Outline of the circle is on the preview where it is on the drawing
+    preview = np.asarray(img.image)
+    center = int(150 * img.info_mm2pix * img.image_scale)
+    assert preview[center, int(100 * img.info_mm2pix * img.image_scale)] == 0
+
+def test_small_preview_full_resolution(tmp_path):
+    img = _load(tmp_path, 25.4)
+    img.render()
+    assert img.image_scale == 1.0
+    assert img.image.size == img.raster_size